@@ -0,0 +1,133 @@
+import asyncio
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+
+class AdaptiveController:
+    """AIMD control of concurrency and request rate from how the server is responding
+
+    Healthy windows of requests add one slot and `rate_step` requests per minute;
+    a 429/5xx response, an aborted navigation, a timeout or latency well above the
+    best seen so far halves both. The configured values are the ceilings.
+    """
+
+    def __init__(self, max_concurrent, requests_per_minute, enabled=True, min_concurrent=1,
+                 min_requests_per_minute=5, rate_step=5, window=10, backoff=0.5,
+                 latency_factor=2.0, cooldown=10.0, on_change=None, clock=time.monotonic):
+        self.enabled = enabled
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_requests_per_minute = requests_per_minute
+        self.min_concurrent = max(1, min(min_concurrent, self.max_concurrent))
+        self.min_requests_per_minute = min(min_requests_per_minute, requests_per_minute)
+        self.rate_step = rate_step
+        self.window = window
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.cooldown = cooldown
+        self.on_change = on_change
+        self.clock = clock
+        # Start at half the ceilings and climb; a fixed controller starts at the ceilings
+        if enabled:
+            self.concurrency = max(self.min_concurrent, self.max_concurrent // 2)
+            self.requests_per_minute = max(self.min_requests_per_minute, requests_per_minute / 2)
+        else:
+            self.concurrency = self.max_concurrent
+            self.requests_per_minute = requests_per_minute
+        self.in_flight = 0
+        self.latencies = []
+        self.baseline_latency = None
+        self.last_decrease = None
+        self.increases = 0
+        self.decreases = 0
+        self.condition = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one of the `concurrency` slots for the duration of a request"""
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.in_flight < self.concurrency)
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            async with self.condition:
+                self.in_flight -= 1
+                self.condition.notify_all()
+
+    @staticmethod
+    def is_throttle_signal(status=None, error=None):
+        """True for responses and errors that mean the server wants us to slow down"""
+        if status is not None and (status == 429 or status >= 500):
+            return True
+        if error is not None:
+            text = str(error)
+            return "net::ERR_ABORTED" in text or "timeout" in text.lower() or isinstance(error, asyncio.TimeoutError)
+        return False
+
+    def record(self, latency=None, status=None, error=None):
+        """Feed back the outcome of one request and adjust the limits if needed"""
+        if not self.enabled:
+            return
+        if self.is_throttle_signal(status, error):
+            self._decrease(f"HTTP {status}" if status is not None else str(error).splitlines()[0])
+            return
+        if error is not None or latency is None:
+            return
+        self.latencies.append(latency)
+        if len(self.latencies) < self.window:
+            return
+        median = statistics.median(self.latencies)
+        self.latencies = []
+        if self.baseline_latency is None or median < self.baseline_latency:
+            self.baseline_latency = median
+        if median > self.baseline_latency * self.latency_factor:
+            self._decrease(f"latency {median:.1f}s vs {self.baseline_latency:.1f}s baseline")
+        else:
+            self._increase()
+
+    def _increase(self):
+        concurrency = min(self.max_concurrent, self.concurrency + 1)
+        requests_per_minute = min(self.max_requests_per_minute, self.requests_per_minute + self.rate_step)
+        if (concurrency, requests_per_minute) == (self.concurrency, self.requests_per_minute):
+            return
+        self.increases += 1
+        self._apply(concurrency, requests_per_minute, "healthy window")
+
+    def _decrease(self, reason):
+        now = self.clock()
+        # Requests already in flight fail together; count them as one event
+        if self.last_decrease is not None and now - self.last_decrease < self.cooldown:
+            return
+        self.last_decrease = now
+        self.latencies = []
+        self.decreases += 1
+        self._apply(
+            max(self.min_concurrent, int(self.concurrency * self.backoff)),
+            max(self.min_requests_per_minute, self.requests_per_minute * self.backoff),
+            reason
+        )
+
+    def _apply(self, concurrency, requests_per_minute, reason):
+        raised = concurrency > self.concurrency
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        print(f"Adaptive limits ({reason}): {self.concurrency} concurrent, {self.requests_per_minute:.0f} requests/min")
+        if raised:
+            asyncio.get_running_loop().create_task(self._notify_waiters())
+        if self.on_change:
+            self.on_change(self.concurrency, self.requests_per_minute)
+
+    async def _notify_waiters(self):
+        async with self.condition:
+            self.condition.notify_all()
+
+    def set_max_rate(self, requests_per_minute):
+        """Change the rate ceiling (e.g. from the GUI) while a run is in progress"""
+        self.max_requests_per_minute = requests_per_minute
+        self.min_requests_per_minute = min(self.min_requests_per_minute, requests_per_minute)
+        if self.enabled:
+            rate = min(self.requests_per_minute, requests_per_minute)
+        else:
+            rate = requests_per_minute
+        self._apply(self.concurrency, rate, "rate limit changed")
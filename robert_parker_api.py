@@ -0,0 +1,294 @@
+import asyncio
+import json
+import os
+import aiohttp
+from robert_parker_urls import wine_id_from_url
+
+
+def iter_json_strings(data, path=()):
+    """Yield (path, value) for every string (or number) leaf in a JSON document"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            yield from iter_json_strings(value, path + (key,))
+    elif isinstance(data, list):
+        for index, value in enumerate(data):
+            yield from iter_json_strings(value, path + (index,))
+    elif isinstance(data, (str, int, float)) and not isinstance(data, bool):
+        yield path, str(data)
+
+
+def get_json_path(data, path):
+    """Follow a path of keys/indices into a JSON document, or return None"""
+    for key in path:
+        try:
+            data = data[key]
+        except (KeyError, IndexError, TypeError):
+            return None
+    if data is None or isinstance(data, (dict, list)):
+        return None
+    return str(data)
+
+
+# Separators the page uses to join several JSON values into one field, e.g. "France, Burgundy";
+# the region is rendered with none at all ("FranceBurgundyMeursault")
+JOIN_SEPARATORS = [', ', ' - ', ' – ', ' / ', ' | ', ' · ', '; ', '']
+# Longest label the page may put in front of a JSON value, e.g. "Maturity: "
+MAX_PREFIX = 30
+
+
+def index_leaves(data):
+    """{stripped leaf text: [paths]} for one JSON document"""
+    leaves = {}
+    for path, value in iter_json_strings(data):
+        value = value.strip()
+        if value:
+            leaves.setdefault(value, []).append(list(path))
+    return leaves
+
+
+def split_into_leaves(text, leaves, separator, start=0):
+    """The leaf values that, joined by separator, make up text[start:] (longest first), or None"""
+    candidates = sorted((value for value in leaves if len(value) >= 2 and text.startswith(value, start)),
+                        key=len, reverse=True)
+    for value in candidates:
+        end = start + len(value)
+        if end == len(text):
+            return [value]
+        if text.startswith(separator, end):
+            rest = split_into_leaves(text, leaves, separator, end + len(separator))
+            if rest:
+                return [value] + rest
+    return None
+
+
+def match_text(text, leaves):
+    """A spec rebuilding `text` from the leaves of one JSON document, or None
+
+    Tries, in order: the whole text as one leaf; one leaf behind a short label
+    ("Maturity: Youthful"); several leaves joined by a separator ("France, Burgundy"),
+    with or without a "Label: " in front.
+    """
+    if text in leaves:
+        return {'path': leaves[text][0]}
+    candidates = [('', text)]
+    label, colon, rest = text.partition(': ')
+    if colon and rest and len(label) < MAX_PREFIX and not any(c.isdigit() for c in label):
+        candidates.append((label + colon, rest))
+    for prefix, rest in candidates:
+        if prefix and rest in leaves:
+            return {'path': leaves[rest][0], 'prefix': prefix}
+        for separator in JOIN_SEPARATORS:
+            if separator and separator not in rest:
+                continue
+            parts = split_into_leaves(rest, leaves, separator)
+            if not parts or len(parts) < 2:
+                continue
+            paths, used = [], []
+            for part in parts:
+                # The same value twice ("2030 - 2030") should still map to two paths where it can
+                options = leaves[part]
+                path = next((p for p in options if p not in used), options[0])
+                used.append(path)
+                paths.append(path)
+            spec = {'paths': paths, 'separator': separator}
+            if prefix:
+                spec['prefix'] = prefix
+            return spec
+    # A label without a colon ("Certified Organic"); the longest leaf that ends the text wins.
+    # A "label" holding data of its own ("Penfolds " + vintage) is part of the value, not a label.
+    best = None
+    for value, paths in leaves.items():
+        prefix = text[:-len(value)]
+        if (len(value) >= 3 and text.endswith(value) and prefix and len(prefix) <= MAX_PREFIX
+                and not any(c.isdigit() for c in prefix) and (best is None or len(value) > len(best[0]))
+                and not any(len(other) >= 3 and other in prefix for other in leaves)):
+            best = (value, {'path': paths[0], 'prefix': prefix})
+    return best[1] if best else None
+
+
+def field_text(data, spec):
+    """Rebuild one field's page text from a JSON document with a learned spec, or None"""
+    if 'paths' in spec:
+        values = [get_json_path(data, path) for path in spec['paths']]
+        values = [value.strip() for value in values if value and value.strip()]
+        text = spec['separator'].join(values) if values else None
+    else:
+        text = get_json_path(data, spec['path'])
+    if text is not None and spec.get('prefix'):
+        text = spec['prefix'] + text
+    return text
+
+
+class ApiFieldMap:
+    """Learns which XHR endpoint and JSON path(s) carry each field from browser-scraped pages
+
+    Fields are learned one by one. Once the learning pages are done and the
+    `required` fields are known, learned fields are fetched from the API and the
+    page only supplies the rest (see dom_fields).
+    """
+
+    def __init__(self, field_names, map_file="robert_parker_api_endpoints.json", learning_pages=3, max_pending=50,
+                 required=()):
+        self.field_names = list(field_names)
+        self.required = list(required)
+        self.map_file = map_file
+        self.learning_pages = learning_pages
+        # field name -> {'endpoint': template, 'path': [...]} or {'endpoint', 'paths': [[...], ...], 'separator'},
+        # either with an optional 'prefix' the page puts in front
+        self.fields = {}
+        self.seen_fields = set()    # fields that had text on at least one learning page
+        self.pages_observed = 0
+        self.responses = {}         # wine ID -> [(url, json)]
+        # Wines whose page was never observed (it failed) are dropped past this many
+        self.max_pending = max_pending
+        self.load()
+
+    def load(self):
+        if self.map_file and os.path.exists(self.map_file):
+            try:
+                with open(self.map_file, encoding='utf-8') as f:
+                    saved = json.load(f)
+                if sorted(saved.get('field_names', [])) == sorted(self.field_names):
+                    self.fields = saved.get('fields', {})
+                    self.seen_fields = set(saved.get('seen_fields', []))
+                    self.pages_observed = saved.get('pages_observed', 0)
+            except Exception as e:
+                print(f"Could not read API endpoint map {self.map_file}: {e}")
+
+    def save(self):
+        if not self.map_file:
+            return
+        with open(self.map_file, 'w', encoding='utf-8') as f:
+            json.dump({
+                'field_names': self.field_names,
+                'fields': self.fields,
+                'seen_fields': sorted(self.seen_fields),
+                'pages_observed': self.pages_observed
+            }, f, indent=2, ensure_ascii=False)
+
+    @property
+    def ready(self):
+        """True once the learning pages are done and the required fields have endpoints"""
+        return (self.pages_observed >= self.learning_pages
+                and bool(self.fields)
+                and set(self.required).issubset(self.fields))
+
+    def dom_fields(self):
+        """Fields seen on real pages that no endpoint carries; these still come from the page"""
+        return sorted(self.seen_fields - set(self.fields))
+
+    async def on_response(self, response):
+        """BrowserContext 'response' listener: keep JSON XHR/fetch bodies until the endpoints are learned"""
+        if self.ready:
+            return
+        try:
+            request = response.request
+            if request.method != 'GET' or request.resource_type not in ('xhr', 'fetch'):
+                return
+            if 'json' not in response.headers.get('content-type', ''):
+                return
+            wine_id = wine_id_from_url(request.frame.url) if request.frame else None
+            if not wine_id or wine_id not in response.url:
+                return
+            data = await response.json()
+        except Exception:
+            return
+        if wine_id not in self.responses and len(self.responses) >= self.max_pending:
+            del self.responses[next(iter(self.responses))]
+        self.responses.setdefault(wine_id, []).append((response.url, data))
+
+    def observe(self, url, raw_fields):
+        """Match the DOM text of a browser-scraped page against its recorded JSON"""
+        wine_id = wine_id_from_url(url)
+        responses = self.responses.pop(wine_id, []) if wine_id else []
+        if not responses:
+            return
+        texts = {}
+        for name in self.field_names:
+            text = ((raw_fields.get(name) or {}).get('text') or '').strip()
+            if text:
+                texts[name] = text
+                self.seen_fields.add(name)
+        for response_url, data in responses:
+            template = response_url.replace(wine_id, '{wine_id}')
+            # A spec learned on an earlier page that does not rebuild this one matched by coincidence
+            for name, text in texts.items():
+                spec = self.fields.get(name)
+                if spec and spec['endpoint'] == template and (field_text(data, spec) or '').strip() != text:
+                    del self.fields[name]
+            leaves = index_leaves(data)
+            for name, text in texts.items():
+                if name not in self.fields:
+                    spec = match_text(text, leaves)
+                    if spec:
+                        self.fields[name] = dict(spec, endpoint=template)
+        self.pages_observed += 1
+        self.save()
+        if self.ready:
+            self.responses.clear()
+            message = f"Learned API endpoints for {len(self.fields)} fields, switching to direct fetches"
+            if self.dom_fields():
+                message += f" (still read from the page: {', '.join(self.dom_fields())})"
+            print(message)
+        elif self.pages_observed == self.learning_pages:
+            missing = sorted(set(self.required) - set(self.fields)) or self.dom_fields()
+            print(f"API mode unavailable, fields not found in XHR payloads: {', '.join(missing)}")
+
+
+class WineApiClient:
+    """Fetches wines straight from the learned JSON endpoints over pooled connections"""
+
+    def __init__(self, field_map, cookies, user_agent=None, max_connections=10, timeout=30):
+        self.field_map = field_map
+        self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+        self.user_agent = user_agent
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.session = None
+
+    def update_cookies(self, cookies):
+        """Use the browser's cookies again, e.g. after it logged in anew"""
+        self.cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+        if self.session:
+            self.session.cookie_jar.update_cookies(self.cookies)
+
+    async def start(self):
+        headers = {'Accept': 'application/json'}
+        if self.user_agent:
+            headers['User-Agent'] = self.user_agent
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            cookies=self.cookies,
+            headers=headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+        return self
+
+    async def fetch_json(self, endpoint):
+        async with self.session.get(endpoint) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    async def fetch_raw_fields(self, url, return_payloads=False):
+        """Fetch one wine and return the same {name: {'text'}} shape the page script does"""
+        wine_id = wine_id_from_url(url)
+        if not wine_id:
+            raise ValueError(f"No wine ID in URL: {url}")
+        endpoints = sorted({spec['endpoint'] for spec in self.field_map.fields.values()})
+        payloads = await asyncio.gather(*[
+            self.fetch_json(endpoint.replace('{wine_id}', wine_id)) for endpoint in endpoints
+        ])
+        by_endpoint = dict(zip(endpoints, payloads))
+        raw = {}
+        for name in self.field_map.field_names:
+            spec = self.field_map.fields.get(name)
+            text = field_text(by_endpoint[spec['endpoint']], spec) if spec else None
+            raw[name] = {'text': text, 'index': -1}
+        if return_payloads:
+            return raw, by_endpoint
+        return raw
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+            self.session = None
@@ -0,0 +1,379 @@
+import argparse
+import asyncio
+import html
+import json
+import os
+import random
+import socket
+import sys
+import tempfile
+import threading
+import time
+from aiohttp import web
+from robert_parker_fields import WINE_FIELDS
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BENCH_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "benchmark"
+SESSION_COOKIE = "rp_session"
+ROOT_PREFIX = '//*[@id="root"]/'
+
+PRODUCERS = ['Domaine Leflaive', 'Maison Louis Jadot', 'Chateau Margaux', 'Penfolds', 'Ridge Vineyards', 'Bodegas Vega Sicilia']
+LABELS = ['Puligny-Montrachet 1er Cru Les Pucelles', 'Chassagne-Montrachet Morgeot', 'Grand Vin', 'Grange', 'Monte Bello', 'Unico']
+REGIONS = ['FranceBurgundyPuligny-Montrachet', 'FranceBurgundyChassagne-Montrachet', 'FranceBordeauxMargaux',
+           'AustraliaSouth AustraliaBarossa Valley', 'USACaliforniaSanta Cruz Mountains', 'SpainCastilla y LeonRibera del Duero']
+COLORS = ['White', 'White', 'Red', 'Red', 'Red', 'Red']
+VARIETIES = ['Chardonnay', 'Chardonnay', 'Cabernet Sauvignon', 'Shiraz', 'Cabernet Sauvignon', 'Tempranillo']
+REVIEWERS = ['William Kelley', 'Lisa Perrotti-Brown', 'Joe Czerwinski']
+
+
+class _Node:
+    __slots__ = ('tag', 'children', 'text')
+
+    def __init__(self, tag):
+        self.tag = tag
+        self.children = []
+        self.text = None
+
+
+def _insert(root, xpath, text):
+    """Create the elements an absolute '//*[@id="root"]/div[1]/...' XPath walks, padding siblings for [n]"""
+    node = root
+    for step in xpath[len(ROOT_PREFIX):].split('/'):
+        tag, _, index = step.partition('[')
+        index = int(index.rstrip(']')) if index else 1
+        same = [child for child in node.children if child.tag == tag]
+        while len(same) < index:
+            child = _Node(tag)
+            node.children.append(child)
+            same.append(child)
+        node = same[index - 1]
+    node.text = text
+
+
+def _render(node):
+    text = html.escape(node.text) if node.text else ''
+    return f"<{node.tag}>{text}{''.join(_render(child) for child in node.children)}</{node.tag}>"
+
+
+def wine_values(index):
+    """Deterministic synthetic field values for wine number `index`"""
+    i = index % len(PRODUCERS)
+    vintage = 1985 + index % 38
+    return {
+        'Full_Wine_Name': f"{PRODUCERS[i]} {LABELS[i]} {vintage}",
+        'Producer': PRODUCERS[i],
+        'Wine Region': REGIONS[i],
+        'Color': COLORS[i],
+        'Score': str(88 + index % 13),
+        'Drink Window': f"{vintage + 5} - {vintage + 25}",
+        'Reviewed By': REVIEWERS[index % len(REVIEWERS)],
+        'Release Price': f"${40 + (index * 7) % 400}",
+        'Drink Date': f"{vintage + 5} - {vintage + 25}",
+        'Tasting Note': f"Synthetic tasting note {index}. " + "Layered, fresh and long on the finish. " * 8,
+        'Producer Note': f"Synthetic producer note {index}.",
+        'Variety': VARIETIES[i],
+        'Maturity': "Maturity: Youthful",
+        'Certified': "Certified Organic" if index % 4 == 0 else "",
+        'Published Date': f"Jan {1 + index % 28}, 2024",
+    }
+
+
+def wine_page_body(index, logged_in=True):
+    """The #root markup of a wine page, built from the first root-anchored XPath of every field"""
+    root = _Node('div')
+    values = wine_values(index)
+    for spec in WINE_FIELDS:
+        if not logged_in and spec.name in ('Tasting Note', 'Producer Note', 'Score'):
+            continue  # the review is behind the paywall
+        xpath = next((s for s in spec.selectors if s.startswith(ROOT_PREFIX)), None)
+        if xpath and values.get(spec.name):
+            _insert(root, xpath, values[spec.name])
+    inner = ''.join(_render(child) for child in root.children)
+    return f'<div id="root">{inner}</div>'
+
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<link rel="stylesheet" href="/static/site.css"></head>
+<body>{consent}{body}<img src="/static/label.jpg" alt=""></body></html>"""
+
+CONSENT_BANNER = """<div id="didomi-host"><button id="didomi-notice-agree-button"
+onclick="document.cookie='didomi_token=1; path=/'; this.parentNode.remove()">Agree and close</button></div>"""
+
+HOME_LOGGED_OUT = """<div id="root"><header><nav>
+<button id="login-button" onclick="document.getElementById('login-form').style.display='block'">Login</button>
+</nav></header>
+<form id="login-form" method="post" action="/login" style="display:{form_display}">
+<input id="user_login" type="email" name="log">
+<input id="user_pass" type="password" name="pwd">
+<button id="submit-login" type="submit">Log In</button>
+</form>{error}</div>"""
+
+HOME_LOGGED_IN = """<div id="root"><header><nav>
+<a href="/logout" class="account-menu">My Account</a>
+</nav></header></div>"""
+
+
+class MockSite:
+    """Local stand-in for robertparker.com: login form, synthetic wine pages and fault injection
+
+    Wine pages wait latency_ms (+/- jitter_ms) and then, in this order, answer
+    429 when more than max_in_flight are in progress, 429 with probability
+    throttle_rate, or 500 with probability error_rate. Runs its own event loop
+    in a thread so the scraper under test keeps its loop to itself.
+    """
+
+    def __init__(self, latency_ms=50, jitter_ms=20, error_rate=0.0, throttle_rate=0.0, max_in_flight=None,
+                 seed=0, email=BENCH_EMAIL, password=BENCH_PASSWORD):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.max_in_flight = max_in_flight
+        self.random = random.Random(seed)
+        self.email = email
+        self.password = password
+        self.sessions = set()
+        self.in_flight = 0
+        self.stats = {'requests': 0, 'wine_pages': 0, 'throttled': 0, 'errors': 0, 'unauthenticated': 0,
+                      'logins': 0, 'failed_logins': 0, 'assets': 0, 'peak_in_flight': 0}
+        self.base_url = None
+        self.loop = None
+        self.runner = None
+        self.thread = None
+
+    def wine_url(self, index):
+        return f"{self.base_url}wines/bench{index:07d}/synthetic-wine-{index}"
+
+    async def delay(self):
+        latency = max(0.0, self.random.gauss(self.latency_ms, self.jitter_ms)) if self.jitter_ms else self.latency_ms
+        await asyncio.sleep(latency / 1000)
+
+    def logged_in(self, request):
+        return request.cookies.get(SESSION_COOKIE) in self.sessions
+
+    def page(self, request, title, body):
+        consent = '' if request.cookies.get('didomi_token') else CONSENT_BANNER
+        return web.Response(text=PAGE_TEMPLATE.format(title=title, consent=consent, body=body), content_type='text/html')
+
+    @web.middleware
+    async def count_requests(self, request, handler):
+        self.stats['requests'] += 1
+        return await handler(request)
+
+    async def home(self, request):
+        await self.delay()
+        if self.logged_in(request):
+            return self.page(request, "Robert Parker", HOME_LOGGED_IN)
+        return self.page(request, "Robert Parker", HOME_LOGGED_OUT.format(form_display='none', error=''))
+
+    async def login(self, request):
+        await self.delay()
+        form = await request.post()
+        if form.get('log') == self.email and form.get('pwd') == self.password:
+            self.stats['logins'] += 1
+            token = f"{self.random.getrandbits(64):016x}"
+            self.sessions.add(token)
+            response = web.HTTPFound('/')
+            response.set_cookie(SESSION_COOKIE, token, path='/')
+            return response
+        self.stats['failed_logins'] += 1
+        error = '<div class="error">Invalid email or password</div>'
+        return self.page(request, "Robert Parker", HOME_LOGGED_OUT.format(form_display='block', error=error))
+
+    async def wine(self, request):
+        self.in_flight += 1
+        self.stats['peak_in_flight'] = max(self.stats['peak_in_flight'], self.in_flight)
+        try:
+            await self.delay()
+            if (self.max_in_flight and self.in_flight > self.max_in_flight) or self.random.random() < self.throttle_rate:
+                self.stats['throttled'] += 1
+                return web.Response(status=429, text="Too Many Requests", headers={'Retry-After': '1'})
+            if self.random.random() < self.error_rate:
+                self.stats['errors'] += 1
+                return web.Response(status=500, text="Internal Server Error")
+            self.stats['wine_pages'] += 1
+            logged_in = self.logged_in(request)
+            if not logged_in:
+                self.stats['unauthenticated'] += 1
+            index = int(request.match_info['wine_id'][len('bench'):])
+            return self.page(request, wine_values(index)['Full_Wine_Name'], wine_page_body(index, logged_in))
+        finally:
+            self.in_flight -= 1
+
+    async def asset(self, request):
+        await self.delay()
+        self.stats['assets'] += 1
+        if request.match_info['name'].endswith('.css'):
+            return web.Response(text="body { font-family: serif; }", content_type='text/css')
+        return web.Response(body=b'\xff\xd8\xff\xd9', content_type='image/jpeg')
+
+    def start(self):
+        """Serve on a free 127.0.0.1 port; returns the base URL"""
+        app = web.Application(middlewares=[self.count_requests])
+        app.add_routes([
+            web.get('/', self.home),
+            web.post('/login', self.login),
+            web.get('/wines/{wine_id}/{slug}', self.wine),
+            web.get('/static/{name}', self.asset),
+        ])
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.bind(('127.0.0.1', 0))
+        self.base_url = f"http://127.0.0.1:{sock.getsockname()[1]}/"
+        self.loop = asyncio.new_event_loop()
+        self.runner = web.AppRunner(app, access_log=None)
+        self.loop.run_until_complete(self.runner.setup())
+        self.loop.run_until_complete(web.SockSite(self.runner, sock).start())
+        self.thread = threading.Thread(target=self.loop.run_forever, name="mock-robert-parker", daemon=True)
+        self.thread.start()
+        return self.base_url
+
+    def stop(self):
+        if not self.thread:
+            return
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.thread = None
+
+
+class CountingWriter:
+    """Exporter stand-in: counts rows instead of writing a file, so disk speed stays out of the numbers"""
+
+    def __init__(self):
+        self.rows = 0
+
+    def write(self, wine_data):
+        self.rows += 1
+        return True
+
+    def close(self):
+        pass
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of the largest finished child (the browser), in MB"""
+    if resource is None:
+        return None, None
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+            resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale)
+
+
+def run_benchmark(url_count=200, site_options=None, scraper_options=None, metrics_file=None, writer=None):
+    """Scrape url_count synthetic wines from a fresh MockSite; returns the results as a dict
+
+    Rows go to `writer` when given (to compare extraction between runs), otherwise they are only counted.
+    """
+    from robert_parker_scraper import RobertParkerScraper
+
+    site = MockSite(**(site_options or {}))
+    site.start()
+    try:
+        with tempfile.TemporaryDirectory(prefix="robert_parker_bench_") as state_dir:
+            # Fresh journal, session and profile every time, so runs are comparable
+            options = dict(
+                journal_file=os.path.join(state_dir, "journal.db"),
+                session_file=os.path.join(state_dir, "session.json"),
+                selector_stats_file=os.path.join(state_dir, "selector_stats.json"),
+                user_data_dir=os.path.join(state_dir, "browser_data"),
+                cache_dir=None,
+                headless=True,
+            )
+            options.update(scraper_options or {})
+            scraper = RobertParkerScraper(BENCH_EMAIL, BENCH_PASSWORD, home_url=site.base_url,
+                                          metrics_file=metrics_file, **options)
+            writer = writer or CountingWriter()
+            urls = (site.wine_url(index) for index in range(url_count))
+            start = time.perf_counter()
+            summary = asyncio.run(scraper.run_pipeline(urls, result_writer=writer))
+            elapsed = time.perf_counter() - start
+            scraper.journal.close()
+    finally:
+        site.stop()
+
+    stages = scraper.metrics.summary()
+    python_rss, browser_rss = peak_rss_mb()
+    return {
+        'urls': url_count,
+        'rows': summary['rows'],
+        'errors': len(summary['errors']),
+        'elapsed_s': elapsed,
+        'urls_per_s': summary['rows'] / elapsed if elapsed else 0.0,
+        'latency_ms': {stage: {q: stats[q] * 1000 for q in ('p50', 'p95', 'p99')}
+                       for stage, stats in stages.items()},
+        'server': dict(site.stats),
+        'peak_rss_mb': {'python': python_rss, 'browser': browser_rss},
+    }
+
+
+def format_report(result):
+    lines = [
+        f"URLs: {result['rows']}/{result['urls']} ({result['errors']} errors) in {result['elapsed_s']:.1f}s "
+        f"= {result['urls_per_s']:.2f} URLs/sec",
+    ]
+    for stage in ('attempt_total', 'slot_wait', 'rate_limit_wait', 'navigation', 'anchor_wait', 'extract'):
+        stats = result['latency_ms'].get(stage)
+        if stats:
+            lines.append(f"  {stage:<16} p50 {stats['p50']:8.1f} ms   p95 {stats['p95']:8.1f} ms   p99 {stats['p99']:8.1f} ms")
+    server = result['server']
+    lines.append(f"Server: {server['requests']} requests, {server['wine_pages']} wine pages, {server['throttled']} x 429, "
+                 f"{server['errors']} x 500, {server['assets']} assets, peak {server['peak_in_flight']} in flight, "
+                 f"{server['logins']} logins")
+    memory = result['peak_rss_mb']
+    if memory['python'] is not None:
+        lines.append(f"Peak RSS: {memory['python']:.0f} MB Python, {memory['browser']:.0f} MB largest browser process")
+    return lines
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="robert_parker_benchmark",
+        description="Measure scraper throughput against a local mock of the site."
+    )
+    parser.add_argument('-n', '--urls', type=int, default=200, help="synthetic wine pages to scrape (default: 200)")
+    parser.add_argument('-c', '--concurrency', type=int, default=5, help="max concurrent pages (default: 5)")
+    parser.add_argument('-r', '--rate', type=int, default=6000, help="max requests per minute (default: 6000)")
+    parser.add_argument('--burst', type=int, default=5, help="token bucket burst (default: 5)")
+    parser.add_argument('--latency-ms', type=float, default=50, help="mean server latency (default: 50)")
+    parser.add_argument('--jitter-ms', type=float, default=20, help="latency standard deviation (default: 20)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="share of wine pages answered with 500")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="share of wine pages answered with 429")
+    parser.add_argument('--max-in-flight', type=int, help="answer 429 above this many concurrent wine pages")
+    parser.add_argument('--seed', type=int, default=0, help="seed for latency and fault injection (default: 0)")
+    parser.add_argument('--no-adaptive', dest='adaptive', action='store_false')
+    parser.add_argument('--no-block-resources', dest='block_resources', action='store_false')
+    parser.add_argument('--extraction-mode', choices=['browser', 'offline'], default='browser')
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True)
+    parser.add_argument('--metrics', metavar='FILE', help="also write stage spans and percentiles (see robert_parker_cli.py)")
+    parser.add_argument('--json', metavar='FILE', help="append the results as one JSON line, to compare runs")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    site_options = dict(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+                        throttle_rate=args.throttle_rate, max_in_flight=args.max_in_flight, seed=args.seed)
+    scraper_options = dict(max_concurrent=args.concurrency, requests_per_minute=args.rate, burst=args.burst,
+                           adaptive=args.adaptive, block_resources=args.block_resources,
+                           extraction_mode=args.extraction_mode, headless=args.headless)
+    result = run_benchmark(args.urls, site_options, scraper_options, args.metrics)
+    print()
+    for line in format_report(result):
+        print(line)
+    if args.json:
+        record = dict(result, site=site_options, scraper=scraper_options, ts=time.time())
+        with open(args.json, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+    return 0 if result['errors'] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from robert_parker_urls import wine_id_from_url
+
+
+class ResponseCache:
+    """On-disk cache of wine pages (raw body plus extracted record) keyed by wine ID
+
+    Entries are reused until they are ttl_hours old, then scraped again. There is no
+    conditional revalidation: the wine page is a single-page app whose document
+    validators say nothing about the wine data it loads afterwards.
+
+    Scrapers with different record layouts can share a cache_dir: each passes its
+    own `schema`, which is part of the key, and the `required` record keys; an
+    entry missing one of them is treated as a miss.
+    """
+
+    def __init__(self, cache_dir="robert_parker_cache", ttl_hours=24, max_mb=500, schema="", required=()):
+        self.cache_dir = cache_dir
+        self.schema = schema
+        self.required = tuple(required)
+        self.ttl_seconds = ttl_hours * 3600
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        # Bodies are gzip files named by their SHA-256, so identical pages are stored once
+        os.makedirs(os.path.join(cache_dir, "bodies"), exist_ok=True)
+        # WAL and a generous busy timeout let sharded worker processes share the cache
+        self.db = sqlite3.connect(os.path.join(cache_dir, "index.db"), timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT,
+                record TEXT,
+                body_hash TEXT,
+                content_type TEXT,
+                fetched_at REAL,
+                last_access REAL,
+                size INTEGER
+            )
+        """)
+        self.db.commit()
+
+    def key_for(self, url):
+        key = wine_id_from_url(url) or url
+        return f"{self.schema}:{key}" if self.schema else key
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.cache_dir, "bodies", body_hash[:2], body_hash + ".gz")
+
+    def get(self, url):
+        """Cached entry for url if it is younger than the TTL, else None (counted as a miss)"""
+        row = self.db.execute(
+            "SELECT record, body_hash, content_type, fetched_at FROM entries WHERE key = ?",
+            (self.key_for(url),)
+        ).fetchone()
+        if not row:
+            self.misses += 1
+            return None
+        record, body_hash, content_type, fetched_at = row
+        if time.time() - fetched_at >= self.ttl_seconds:
+            self.misses += 1
+            return None
+        try:
+            record = json.loads(record)
+        except ValueError:
+            record = None
+        if not isinstance(record, dict) or any(key not in record for key in self.required):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), self.key_for(url)))
+        self.db.commit()
+        return {
+            'record': record,
+            'body_hash': body_hash,
+            'content_type': content_type,
+            'fetched_at': fetched_at
+        }
+
+    def get_body(self, entry):
+        """Raw HTML/JSON stored for an entry, or None"""
+        if not entry or not entry.get('body_hash'):
+            return None
+        try:
+            with gzip.open(self._body_path(entry['body_hash']), 'rt', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, url, record, body=None, content_type="text/html"):
+        """Store a freshly scraped record and the body it came from"""
+        body_hash = None
+        size = len(json.dumps(record, ensure_ascii=False))
+        if body is not None:
+            data = body.encode('utf-8')
+            body_hash = hashlib.sha256(data).hexdigest()
+            path = self._body_path(body_hash)
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with gzip.open(path, 'wb') as f:
+                    f.write(data)
+            size += os.path.getsize(path)
+        now = time.time()
+        # Columns are named: caches created before the validators were dropped still have them
+        self.db.execute(
+            "INSERT OR REPLACE INTO entries (key, url, record, body_hash, content_type, fetched_at, last_access, size) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.key_for(url), url, json.dumps(record, ensure_ascii=False), body_hash, content_type, now, now, size)
+        )
+        self.db.commit()
+        self.evict()
+
+    def total_size(self):
+        return self.db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits in max_bytes"""
+        total = self.total_size()
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT key, body_hash, size FROM entries ORDER BY last_access ASC").fetchall()
+        for key, body_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            if body_hash:
+                still_used = self.db.execute("SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+                if not still_used:
+                    try:
+                        os.remove(self._body_path(body_hash))
+                    except OSError:
+                        pass
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
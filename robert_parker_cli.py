@@ -0,0 +1,137 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from robert_parker_dedup import staged_exports
+from robert_parker_scraper import RobertParkerScraper
+from robert_parker_export import EXPORTERS, open_exporter
+from robert_parker_shard import run_sharded
+from robert_parker_urls import UrlSource
+
+
+def read_urls(path):
+    """Deduplicated URLs from a txt, csv or xlsx file, streamed lazily; '-' reads stdin"""
+    if path == '-':
+        # stdin can only be read once, so it is kept for the counting and scraping passes
+        return UrlSource.from_lines(sys.stdin.readlines())
+    return UrlSource(path)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="robert_parker_cli",
+        description="Scrape Robert Parker wine pages without the GUI."
+    )
+    parser.add_argument('urls', nargs='?', default='-',
+                        help="txt, csv or xlsx file of wine URLs (default: one URL per line from stdin)")
+    parser.add_argument('-o', '--output', help="output file (default: robert_parker_wines_<timestamp>.<format>)")
+    parser.add_argument('-f', '--format', choices=list(EXPORTERS),
+                        help="output format (default: from the output file's extension, else xlsx)")
+    parser.add_argument('--email', default=os.environ.get('ROBERT_PARKER_EMAIL'),
+                        help="login email (default: $ROBERT_PARKER_EMAIL)")
+    parser.add_argument('--password', default=os.environ.get('ROBERT_PARKER_PASSWORD'),
+                        help="login password (default: $ROBERT_PARKER_PASSWORD)")
+    parser.add_argument('-c', '--concurrency', type=int, default=5, help="max concurrent pages, split across all workers (default: 5)")
+    parser.add_argument('-r', '--rate', type=int, default=30, help="max requests per minute, across all workers (default: 30)")
+    parser.add_argument('--burst', type=int, default=1, help="requests that may be sent back to back (default: 1)")
+    parser.add_argument('--workers', type=int, default=1, help="browser processes to shard the URLs across (default: 1)")
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True,
+                        help="run Chromium without a window (default: on)")
+    parser.add_argument('--resume', action='store_true', help="skip URLs that succeeded in an earlier run")
+    parser.add_argument('--max-attempts', type=int, default=3, help="attempts per URL before it is reported as failed (default: 3)")
+    parser.add_argument('--retry-budget', type=float, default=0.2,
+                        help="retries allowed across the run, as a fraction of the URLs on top of 10 (default: 0.2)")
+    parser.add_argument('--selector-stats', metavar='FILE', default="robert_parker_selector_stats.json",
+                        help="learn which fallback selector matches each field and try it first (default: %(default)s)")
+    parser.add_argument('--incremental', choices=['changed', 'new'],
+                        help="only export wines that are new or changed since earlier incremental runs; "
+                             "'new' also skips URLs of wines already seen")
+    parser.add_argument('--no-cache', dest='cache', action='store_false', help="do not reuse cached pages")
+    parser.add_argument('--no-adaptive', dest='adaptive', action='store_false',
+                        help="keep concurrency and rate fixed instead of adapting to the server")
+    parser.add_argument('--no-block-resources', dest='block_resources', action='store_false',
+                        help="load images, fonts, ads and trackers")
+    parser.add_argument('--fetch-mode', choices=['browser', 'api'], default='browser')
+    parser.add_argument('--extraction-mode', choices=['browser', 'offline'], default='browser')
+    parser.add_argument('--html-archive-dir', help="keep the raw HTML of every page here (offline mode)")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="append per-URL stage timings to FILE (JSONL) and write the run's percentiles to FILE's .prom sibling")
+    parser.add_argument('-q', '--quiet', action='store_true', help="only print the summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if not args.email or not args.password:
+        print("Email and password are required (--email/--password or ROBERT_PARKER_EMAIL/ROBERT_PARKER_PASSWORD)", file=sys.stderr)
+        return 2
+
+    urls = read_urls(args.urls)
+    total = urls.count()
+    if not total:
+        print("No URLs provided", file=sys.stderr)
+        return 1
+
+    export_format = args.format
+    if args.output and not export_format:
+        export_format = os.path.splitext(args.output)[1].lstrip('.').lower() or None
+    export_format = export_format if export_format in EXPORTERS else 'xlsx'
+    filename = args.output or f"robert_parker_wines_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+
+    def progress_callback(message):
+        if not args.quiet:
+            print(message, file=sys.stderr, flush=True)
+
+    progress_callback(urls.summary())
+
+    options = dict(
+        email=args.email,
+        password=args.password,
+        max_concurrent=args.concurrency,
+        requests_per_minute=args.rate,
+        burst=args.burst,
+        headless=args.headless,
+        adaptive=args.adaptive,
+        block_resources=args.block_resources,
+        cache_dir="robert_parker_cache" if args.cache else None,
+        fetch_mode=args.fetch_mode,
+        extraction_mode=args.extraction_mode,
+        html_archive_dir=args.html_archive_dir,
+        metrics_file=args.metrics,
+        max_attempts=args.max_attempts,
+        retry_budget=args.retry_budget,
+        selector_stats_file=args.selector_stats or None,
+        incremental=args.incremental
+    )
+
+    writer = open_exporter(filename, export_format)
+    start_time = time.time()
+    # Incremental runs only mark wines as exported once the file has been saved
+    with staged_exports() if args.incremental else nullcontext() as dedup_run:
+        options['dedup_run'] = dedup_run
+        try:
+            if args.workers > 1:
+                summary = run_sharded(urls, args.workers, writer, options, args.resume, progress_callback)
+            else:
+                scraper = RobertParkerScraper(**options)
+                summary = asyncio.run(scraper.run_pipeline(urls, progress_callback, resume=args.resume, result_writer=writer))
+            rows, failed = summary['rows'], summary['errors']
+            # Sharded runs only: workers that died before finishing their URLs
+            failed_workers = summary.get('failed', {})
+        finally:
+            writer.close()
+    elapsed_time = time.time() - start_time
+
+    for index, reason in sorted(failed_workers.items()):
+        print(f"Worker {index} did not finish: {reason}", file=sys.stderr)
+    workers_note = f", {len(failed_workers)} workers did not finish" if failed_workers else ""
+    print(f"Scraped {rows - len(failed)}/{total} URLs in {elapsed_time:.1f} seconds "
+          f"({len(failed)} failed{workers_note}), saved to {filename}", file=sys.stderr)
+    return 0 if rows and not failed and not failed_workers else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+import hashlib
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from robert_parker_fields import WINE_HEADERS
+from robert_parker_urls import wine_id_from_url
+
+# What DedupIndex.check() found for a row
+NEW = 'new'
+CHANGED = 'changed'
+UNCHANGED = 'unchanged'
+
+DEFAULT_DEDUP_FILE = "robert_parker_seen.db"
+# Staged rows of runs that never published or discarded them (they crashed) are dropped after this
+STALE_STAGED_SECONDS = 7 * 24 * 3600
+
+
+def hash64(text):
+    """Signed 64-bit blake2b of text, so it fits an SQLite INTEGER column"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big', signed=True)
+
+
+def wine_key(url):
+    """Index key for a URL: its wine ID, or the whole URL for other pages"""
+    return hash64(wine_id_from_url(url) or url)
+
+
+def content_hash(values):
+    """Hash of a row's extracted field values, in column order"""
+    return hash64('\x1f'.join('' if value is None else str(value) for value in values))
+
+
+def new_run_id():
+    return uuid.uuid4().hex
+
+
+class DedupIndex:
+    """Wines exported on earlier runs: 64-bit wine key -> 64-bit hash of their fields
+
+    Two integers per wine in an SQLite table, so 100k wines take a few MB on
+    disk and nothing in memory. check() tells new, changed and unchanged wines
+    apart without writing anything; stage() puts a new or changed wine in a
+    staging table under this run's run_id, and publish() moves the run's staged
+    wines into the index once the export file they went to has been saved.
+    Staged rows are committed every commit_rows rows and on close(), so sharded
+    workers' rows can be published by the coordinator.
+    """
+
+    def __init__(self, path=DEFAULT_DEDUP_FILE, commit_rows=500, run_id=None):
+        self.path = path
+        self.commit_rows = commit_rows
+        self.run_id = run_id or new_run_id()
+        self.uncommitted = 0
+        # Sharded workers share the index, so wait for locks instead of failing
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS seen (
+                wine_key INTEGER PRIMARY KEY,
+                content INTEGER NOT NULL,
+                updated_at REAL
+            ) WITHOUT ROWID
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS staged (
+                run_id TEXT NOT NULL,
+                wine_key INTEGER NOT NULL,
+                content INTEGER NOT NULL,
+                staged_at REAL,
+                PRIMARY KEY (run_id, wine_key)
+            ) WITHOUT ROWID
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def key_and_content(record):
+        """(wine key, hash of the fields other than URL) for a WineRecord"""
+        return (wine_key(record.url),
+                content_hash(value for header, value in zip(WINE_HEADERS, record.row()) if header != 'URL'))
+
+    def contains(self, url):
+        """True if the wine at url was exported on an earlier run"""
+        return self.db.execute("SELECT 1 FROM seen WHERE wine_key = ?", (wine_key(url),)).fetchone() is not None
+
+    def check(self, record):
+        """NEW, CHANGED or UNCHANGED for a WineRecord's fields (URL aside), compared to published runs"""
+        key, content = self.key_and_content(record)
+        row = self.db.execute("SELECT content FROM seen WHERE wine_key = ?", (key,)).fetchone()
+        if row is None:
+            return NEW
+        return UNCHANGED if row[0] == content else CHANGED
+
+    def stage(self, record):
+        """Remember a new or changed wine for publish(), once its export has been saved"""
+        key, content = self.key_and_content(record)
+        self.db.execute("INSERT OR REPLACE INTO staged VALUES (?, ?, ?, ?)", (self.run_id, key, content, time.time()))
+        self.uncommitted += 1
+        if self.uncommitted >= self.commit_rows:
+            self.commit()
+
+    def publish(self):
+        """The run's staged wines now count as exported"""
+        self.commit()
+        with self.db:
+            self.db.execute("""
+                INSERT OR REPLACE INTO seen
+                SELECT wine_key, content, staged_at FROM staged WHERE run_id = ?
+            """, (self.run_id,))
+            self.db.execute("DELETE FROM staged WHERE run_id = ?", (self.run_id,))
+            self.db.execute("DELETE FROM staged WHERE staged_at < ?", (time.time() - STALE_STAGED_SECONDS,))
+
+    def discard(self):
+        """Forget the run's staged wines: their export was not saved, so later runs export them again"""
+        self.commit()
+        with self.db:
+            self.db.execute("DELETE FROM staged WHERE run_id = ?", (self.run_id,))
+
+    def commit(self):
+        self.db.commit()
+        self.uncommitted = 0
+
+    def count(self):
+        return self.db.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def clear(self):
+        self.db.execute("DELETE FROM seen")
+        self.db.execute("DELETE FROM staged")
+        self.commit()
+
+    def close(self):
+        self.commit()
+        self.db.close()
+
+
+@contextmanager
+def staged_exports(path=DEFAULT_DEDUP_FILE, run_id=None):
+    """Publish the run's staged wines if the block (scrape and export writer close) completes, else discard them
+
+    Yields the run ID to pass to the scraper(s) as dedup_run.
+    """
+    run_id = run_id or new_run_id()
+    try:
+        yield run_id
+    except BaseException:
+        index = DedupIndex(path, run_id=run_id)
+        try:
+            index.discard()
+        finally:
+            index.close()
+        raise
+    index = DedupIndex(path, run_id=run_id)
+    try:
+        index.publish()
+    finally:
+        index.close()
@@ -0,0 +1,219 @@
+import csv
+import os
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+from robert_parker_dedup import content_hash
+from robert_parker_fields import WINE_HEADERS
+from robert_parker_normalize import normalize_columns
+from robert_parker_record import WineRecord
+
+
+def row_values(wine_data, headers):
+    """Column values of a dict row or WineRecord, in headers order"""
+    if type(wine_data) is WineRecord and headers == WINE_HEADERS:
+        return wine_data.row()
+    return [wine_data.get(header, '') for header in headers]
+
+
+def row_digest(values):
+    """64-bit fingerprint of a row's column values, so deduplication keeps one int per row"""
+    return content_hash(values)
+
+
+class StreamingExporter:
+    """Base for writers that take one result row (dict or WineRecord) at a time and drop duplicates
+
+    Subclasses get each row as its values in headers order.
+    """
+
+    extension = None
+
+    def __init__(self, filename, headers=WINE_HEADERS, dedupe=True):
+        self.filename = filename
+        self.headers = list(headers)
+        self.dedupe = dedupe
+        self.seen = set()
+        self.rows_written = 0
+
+    def write(self, wine_data):
+        """Add one result row; returns False if an identical row was already written"""
+        values = row_values(wine_data, self.headers)
+        if self.dedupe:
+            # The 'Error' column, if exported, does not make a row different
+            digest = row_digest(value for header, value in zip(self.headers, values) if header != 'Error')
+            if digest in self.seen:
+                return False
+            self.seen.add(digest)
+        self.rows_written += 1
+        self.write_row(values)
+        return True
+
+    def write_row(self, values):
+        raise NotImplementedError
+
+    def close(self):
+        raise NotImplementedError
+
+
+class StreamingExcelWriter(StreamingExporter):
+    """Appends rows to a write-only workbook as results arrive, so memory stays flat"""
+
+    extension = ".xlsx"
+
+    def __init__(self, filename, headers=WINE_HEADERS, width_sample_rows=200, max_width=50, dedupe=True):
+        super().__init__(filename, headers, dedupe)
+        self.width_sample_rows = width_sample_rows
+        self.max_width = max_width
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.ws = self.wb.create_sheet("Wine Data")
+        self.widths = [len(header) for header in self.headers]
+        # Write-only sheets need column widths before the first row is written,
+        # so the first rows are held back and used to size the columns
+        self.pending_rows = []
+        self.started = False
+
+    def write_row(self, values):
+        row = list(values)
+        if self.started:
+            self.ws.append(row)
+            return
+        for col, value in enumerate(row):
+            self.widths[col] = max(self.widths[col], len(str(value)))
+        self.pending_rows.append(row)
+        if len(self.pending_rows) >= self.width_sample_rows:
+            self._start()
+
+    def _start(self):
+        for col, width in enumerate(self.widths, 1):
+            self.ws.column_dimensions[get_column_letter(col)].width = min(width + 2, self.max_width)
+        header_row = []
+        for header in self.headers:
+            cell = WriteOnlyCell(self.ws, value=header)
+            cell.font = Font(bold=True)
+            header_row.append(cell)
+        self.ws.append(header_row)
+        for row in self.pending_rows:
+            self.ws.append(row)
+        self.pending_rows = []
+        self.started = True
+
+    def close(self):
+        """Flush any held-back rows and save the workbook"""
+        if not self.started:
+            self._start()
+        self.wb.save(self.filename)
+
+
+class CsvStreamWriter(StreamingExporter):
+    """Writes rows to a UTF-8 CSV file, flushing to disk every chunk_rows rows"""
+
+    extension = ".csv"
+
+    def __init__(self, filename, headers=WINE_HEADERS, chunk_rows=1000, dedupe=True):
+        super().__init__(filename, headers, dedupe)
+        self.chunk_rows = chunk_rows
+        self.file = open(filename, 'w', encoding='utf-8', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(self.headers)
+
+    def write_row(self, values):
+        self.writer.writerow(values)
+        if self.rows_written % self.chunk_rows == 0:
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ArrowStreamWriter(StreamingExporter):
+    """Writes rows in record batches to a Parquet or Arrow IPC file
+
+    Typed columns are parsed a whole batch at a time by normalize_records().
+    """
+
+    extension = ".arrow"
+
+    def __init__(self, filename, headers=WINE_HEADERS, chunk_rows=5000, dedupe=True):
+        super().__init__(filename, headers, dedupe)
+        # pyarrow is only needed for the columnar formats
+        import pyarrow
+        self.pa = pyarrow
+        self.chunk_rows = chunk_rows
+        fields = []
+        for header in self.headers:
+            if header == 'Vintage':
+                fields.append(pyarrow.field(header, pyarrow.int16()))
+            else:
+                fields.append(pyarrow.field(header, pyarrow.string()))
+        fields += [
+            pyarrow.field('Score_Min', pyarrow.float32()),
+            pyarrow.field('Score_Max', pyarrow.float32()),
+            pyarrow.field('Drink_From', pyarrow.int16()),
+            pyarrow.field('Drink_To', pyarrow.int16()),
+            pyarrow.field('Release_Price_Amount', pyarrow.float64()),
+            pyarrow.field('Release_Price_Currency', pyarrow.string()),
+            pyarrow.field('Published_Date', pyarrow.date32()),
+        ]
+        self.schema = pyarrow.schema(fields)
+        self.rows = []
+        self.writer = self.open_writer()
+
+    def open_writer(self):
+        return self.pa.ipc.new_file(self.filename, self.schema)
+
+    def write_row(self, values):
+        self.rows.append(values)
+        if len(self.rows) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        # Rows to columns once per batch, then every column is parsed in one go
+        columns = dict(zip(self.headers, zip(*self.rows)))
+        typed = normalize_columns(columns, len(self.rows))
+        arrays = []
+        for field in self.schema:
+            if field.name in typed:
+                column = typed[field.name]
+                if field.name == 'Published_Date':
+                    column = column.dt.date
+                arrays.append(self.pa.Array.from_pandas(column, type=field.type))
+            else:
+                values = columns[field.name]
+                arrays.append(self.pa.array([value if value is None else str(value) for value in values], field.type))
+        self.writer.write_batch(self.pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+class ParquetStreamWriter(ArrowStreamWriter):
+    """Same typed schema as the Arrow writer, written as Parquet row groups"""
+
+    extension = ".parquet"
+
+    def open_writer(self):
+        import pyarrow.parquet
+        return pyarrow.parquet.ParquetWriter(self.filename, self.schema)
+
+
+EXPORTERS = {
+    'xlsx': StreamingExcelWriter,
+    'csv': CsvStreamWriter,
+    'parquet': ParquetStreamWriter,
+    'arrow': ArrowStreamWriter,
+}
+
+
+def open_exporter(filename, export_format=None, headers=WINE_HEADERS, **kwargs):
+    """Open the writer for export_format (or the filename's extension)"""
+    if export_format is None:
+        export_format = os.path.splitext(filename)[1].lstrip('.').lower() or 'xlsx'
+    if export_format not in EXPORTERS:
+        raise ValueError(f"Unknown export format: {export_format} (choose from {', '.join(EXPORTERS)})")
+    return EXPORTERS[export_format](filename, headers, **kwargs)
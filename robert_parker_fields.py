@@ -0,0 +1,272 @@
+import json
+from robert_parker_normalize import REGION_PART_PATTERN, split_wine_name
+
+# XPaths for each field, in the order they should be tried
+NAME_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[1]/div/header/h1'
+]
+
+PRODUCER_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[1]/div[2]/span/a',
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[1]/div[2]',
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[1]/div[2]'
+]
+
+REGION_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[2]/div[2]',
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[2]'
+]
+
+COLOR_SELECTORS = [
+    # Original XPath
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[4]/div[2]',
+    # Alternative with div instead of ol
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[4]/div[2]',
+    # More flexible - find by position in article
+    '//article//div[4]/div[2]',
+    # Find by text content containing color-related terms
+    '//*[contains(text(), "Red") or contains(text(), "White") or contains(text(), "Rosé") or contains(text(), "Sparkling") or contains(text(), "Dessert")]',
+    # Find by class or data attributes (if available)
+    '//*[@class*="color" or @class*="type"]',
+    # Find by label text and get sibling
+    '//*[contains(text(), "Color") or contains(text(), "Type")]/following-sibling::*[1]',
+    # Generic approach - find any element with color-like text
+    '//*[matches(text(), "(Red|White|Rosé|Sparkling|Dessert|Fortified)", "i")]',
+    # CSS selector approach
+    'article div:nth-child(4) div:nth-child(2)'
+]
+
+SCORE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[1]/div/div[2]'
+]
+
+DRINK_WINDOW_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[3]/dl/dd'
+]
+
+REVIEWED_BY_SELECTORS = [
+    '//dd/a',
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[1]/dl/dd/a'
+]
+
+RELEASE_PRICE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[2]/dl/dl/div'
+]
+
+DRINK_DATE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[3]/dl/dd'
+]
+
+TASTING_NOTE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/p[1]'
+]
+
+PRODUCER_NOTE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/p[2]'
+]
+
+VARIETY_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[3]/div/a'
+]
+
+MATURITY_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[5]'
+]
+
+CERTIFIED_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[6]'
+]
+
+PUBLISHED_DATE_SELECTORS = [
+    '//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/p'
+]
+
+
+# Columns of a scraped wine row, in spreadsheet order
+WINE_HEADERS = [
+    'Full_Wine_Name', 'Wine_Name', 'Vintage', 'Producer', 'Wine Region', 'Variety', 'Color', 'Score', 
+    'Drink Window', 'Reviewed By', 'Release Price', 'Drink Date', 
+    'Tasting Note', 'Producer Note', 'Maturity', 'Certified', 'Published Date', 'URL'
+]
+
+
+def empty_wine_data(url):
+    """A wine row with every column blank except URL"""
+    wine_data = dict.fromkeys(WINE_HEADERS, '')
+    wine_data['URL'] = url
+    return wine_data
+
+
+def text_or_none(text):
+    """Post-processor for required fields: None tells the caller nothing matched"""
+    return text
+
+
+def text_or_empty(text):
+    """Default post-processor: the element text, or '' if nothing matched"""
+    return text or ''
+
+
+def split_region(text):
+    """Split 'FranceBurgundyChassagne-Montrachet' style text into 'France, Burgundy, ...'"""
+    if text is None:
+        return ''
+    # Split before each uppercase letter that starts a word, but keep multi-word and hyphenated regions together
+    # This will match sequences like 'Southern Rhône', 'Châteauneuf-du-Pape', etc.
+    region_parts = REGION_PART_PATTERN.findall(text)
+    return ', '.join([part.strip() for part in region_parts if part.strip()])
+
+
+def maturity_or_zero(text):
+    """Keep the value only if it starts with 'Maturity:', otherwise '0'"""
+    if text is None:
+        return ''
+    if text.strip().startswith("Maturity:"):
+        return text.strip()
+    return "0"
+
+
+def certified_or_zero(text):
+    """Keep the value only if it contains 'Certified', otherwise '0'"""
+    if text is None:
+        return ''
+    if "Certified" in text.strip():
+        return text.strip()
+    return "0"
+
+
+class FieldSpec:
+    """One extracted field: its ordered selector cascade and a post-processor"""
+
+    def __init__(self, name, selectors, post=text_or_empty, require_text=False):
+        self.name = name
+        self.selectors = list(selectors)
+        self.post = post
+        # When set, a match with blank text falls through to the next selector
+        self.require_text = require_text
+
+    def to_json(self):
+        return {'name': self.name, 'selectors': self.selectors, 'requireText': self.require_text}
+
+
+WINE_FIELDS = [
+    FieldSpec('Full_Wine_Name', NAME_SELECTORS, post=text_or_none),
+    FieldSpec('Producer', PRODUCER_SELECTORS),
+    FieldSpec('Wine Region', REGION_SELECTORS, post=split_region),
+    FieldSpec('Color', COLOR_SELECTORS, require_text=True),
+    FieldSpec('Score', SCORE_SELECTORS),
+    FieldSpec('Drink Window', DRINK_WINDOW_SELECTORS),
+    FieldSpec('Reviewed By', REVIEWED_BY_SELECTORS),
+    FieldSpec('Release Price', RELEASE_PRICE_SELECTORS),
+    FieldSpec('Drink Date', DRINK_DATE_SELECTORS),
+    FieldSpec('Tasting Note', TASTING_NOTE_SELECTORS),
+    FieldSpec('Producer Note', PRODUCER_NOTE_SELECTORS),
+    FieldSpec('Variety', VARIETY_SELECTORS),
+    FieldSpec('Maturity', MATURITY_SELECTORS, post=maturity_or_zero),
+    FieldSpec('Certified', CERTIFIED_SELECTORS, post=certified_or_zero),
+    FieldSpec('Published Date', PUBLISHED_DATE_SELECTORS),
+]
+
+# Runs in the page: resolves every field and its fallbacks in a single round trip.
+# Selectors starting with '/' or '(' are XPath, everything else is CSS, the same
+# rule Playwright's query_selector applies. Invalid selectors are skipped.
+_EXTRACT_JS_TEMPLATE = """
+() => {
+    const specs = %s;
+    const find = (selector) => {
+        try {
+            if (selector.startsWith('/') || selector.startsWith('(')) {
+                return document.evaluate(selector, document, null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            }
+            return document.querySelector(selector);
+        } catch (e) {
+            return null;
+        }
+    };
+    const result = {};
+    for (const spec of specs) {
+        const started = performance.now();
+        result[spec.name] = {text: null, index: -1};
+        for (let i = 0; i < spec.selectors.length; i++) {
+            const node = find(spec.selectors[i]);
+            if (!node) continue;
+            const text = node.textContent;
+            if (spec.requireText && !(text && text.trim())) continue;
+            result[spec.name] = {text: text, index: i};
+            break;
+        }
+        result[spec.name].ms = performance.now() - started;
+    }
+    return result;
+}
+"""
+
+
+# Runs in the page: true once any of the selectors matches an element with text
+_ANCHOR_JS_TEMPLATE = """
+() => {
+    const selectors = %s;
+    for (const selector of selectors) {
+        try {
+            const node = (selector.startsWith('/') || selector.startsWith('('))
+                ? document.evaluate(selector, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue
+                : document.querySelector(selector);
+            if (node && node.textContent && node.textContent.trim()) return true;
+        } catch (e) {}
+    }
+    return false;
+}
+"""
+
+# The wine name renders with the page shell; the review block may arrive a little later
+REVIEW_ANCHOR_SELECTORS = SCORE_SELECTORS + TASTING_NOTE_SELECTORS
+
+
+async def wait_for_anchor(page, selectors=NAME_SELECTORS, timeout=15000):
+    """Wait until one of `selectors` has text; returns False if it never appears"""
+    script = _ANCHOR_JS_TEMPLATE % json.dumps(list(selectors), ensure_ascii=False)
+    try:
+        await page.wait_for_function(script, timeout=timeout)
+        return True
+    except Exception:
+        return False
+
+
+def add_name_fields(wine_data):
+    """Derive Vintage and Wine_Name from Full_Wine_Name and Producer"""
+    vintage, wine_name = split_wine_name(wine_data['Full_Wine_Name'], wine_data['Producer'])
+    if vintage:
+        wine_data['Vintage'] = vintage
+    wine_data['Wine_Name'] = wine_name
+    return wine_data
+
+
+def compile_extraction_script(specs):
+    """Build the page.evaluate script that resolves all of `specs` in one call"""
+    return _EXTRACT_JS_TEMPLATE % json.dumps([spec.to_json() for spec in specs], ensure_ascii=False)
+
+
+def apply_post_processors(specs, raw):
+    """Turn the raw {name: {text, index, ms}} result into {name: value}"""
+    values = {}
+    for spec in specs:
+        match = raw.get(spec.name) or {}
+        values[spec.name] = spec.post(match.get('text'))
+    return values
+
+
+WINE_FIELDS_SCRIPT = compile_extraction_script(WINE_FIELDS)
+
+
+async def extract_raw_fields(page, specs=WINE_FIELDS, script=None):
+    """Resolve every field in `specs` with a single page.evaluate, before post-processing"""
+    if script is None:
+        script = WINE_FIELDS_SCRIPT if specs is WINE_FIELDS else compile_extraction_script(specs)
+    return await page.evaluate(script)
+
+
+async def extract_fields(page, specs=WINE_FIELDS, script=None):
+    """Extract every field in `specs` from the page with a single page.evaluate"""
+    raw = await extract_raw_fields(page, specs, script)
+    return apply_post_processors(specs, raw)
@@ -0,0 +1,73 @@
+import json
+import sqlite3
+import time
+
+
+class RunJournal:
+    """Durable per-URL record of results so a crashed or stopped run can be resumed"""
+
+    def __init__(self, path="robert_parker_journal.db"):
+        self.path = path
+        # Sharded workers write to the same journal, so wait for locks instead of failing
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT PRIMARY KEY,
+                status TEXT,
+                record TEXT,
+                updated_at REAL
+            )
+        """)
+        self.db.commit()
+
+    @staticmethod
+    def status_of(wine_data, name_key='Full_Wine_Name'):
+        """OK, ERROR or STOPPED for a result row"""
+        status = getattr(wine_data, 'status', None)
+        if status:
+            return status
+        name = wine_data.get(name_key)
+        if name == 'STOPPED':
+            return 'STOPPED'
+        if name == 'ERROR' or wine_data.get('Error'):
+            return 'ERROR'
+        return 'OK'
+
+    def record(self, url, wine_data, name_key='Full_Wine_Name'):
+        """Commit one result as soon as it is available"""
+        self.db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (url, self.status_of(wine_data, name_key), json.dumps(dict(wine_data), ensure_ascii=False), time.time())
+        )
+        self.db.commit()
+
+    def completed(self, urls):
+        """{url: record} for the URLs in this list that already succeeded"""
+        done = {}
+        wanted = set(urls)
+        for url, record in self.db.execute("SELECT url, record FROM results WHERE status = 'OK'"):
+            if url in wanted:
+                done[url] = json.loads(record)
+        return done
+
+    def count_completed(self, urls):
+        """How many of urls already succeeded, checked one by one so urls can be a lazy source"""
+        query = "SELECT 1 FROM results WHERE url = ? AND status = 'OK'"
+        return sum(1 for url in urls if self.db.execute(query, (url,)).fetchone())
+
+    def lookup(self, url):
+        """The record for url if it already succeeded, else None"""
+        row = self.db.execute("SELECT record FROM results WHERE url = ? AND status = 'OK'", (url,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def counts(self):
+        """Number of journaled URLs per status"""
+        return dict(self.db.execute("SELECT status, COUNT(*) FROM results GROUP BY status").fetchall())
+
+    def clear(self):
+        self.db.execute("DELETE FROM results")
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
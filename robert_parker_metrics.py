@@ -0,0 +1,142 @@
+import json
+import math
+import os
+import time
+from array import array
+from contextlib import contextmanager
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageHistogram:
+    """Span durations of one stage in fixed log-spaced buckets
+
+    BUCKETS_PER_DECADE buckets per power of ten between MIN_SECONDS and
+    MAX_SECONDS, so a percentile is within about 6% of the exact value and
+    memory stays the same however many spans are recorded.
+    """
+
+    MIN_SECONDS = 1e-4
+    MAX_SECONDS = 1e4
+    BUCKETS_PER_DECADE = 20
+
+    def __init__(self):
+        decades = math.log10(self.MAX_SECONDS / self.MIN_SECONDS)
+        # One bucket below MIN_SECONDS and one above MAX_SECONDS
+        self.counts = array('L', [0]) * (round(decades * self.BUCKETS_PER_DECADE) + 2)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def bucket(self, seconds):
+        if seconds < self.MIN_SECONDS:
+            return 0
+        index = int(math.log10(seconds / self.MIN_SECONDS) * self.BUCKETS_PER_DECADE) + 1
+        return min(index, len(self.counts) - 1)
+
+    def add(self, seconds):
+        self.counts[self.bucket(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Nearest-rank quantile: the geometric middle of its bucket, clamped to the observed range"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank:
+                break
+        if index == 0:
+            return self.min
+        if index == len(self.counts) - 1:
+            return self.max
+        middle = self.MIN_SECONDS * 10 ** ((index - 0.5) / self.BUCKETS_PER_DECADE)
+        return min(max(middle, self.min), self.max)
+
+
+class RunMetrics:
+    """Per-URL timing spans for each scraping stage, with percentile summaries
+
+    Each stage's spans are counted in a StageHistogram for the end-of-run
+    percentiles. With `path`, each span is also appended to a JSONL file as it
+    happens, and write_prometheus() exports the summary in Prometheus text format.
+    """
+
+    def __init__(self, path=None, clock=time.perf_counter):
+        self.path = path
+        self.clock = clock
+        self.stages = {}
+        self.file = open(path, 'a', encoding='utf-8') if path else None
+
+    @contextmanager
+    def span(self, url, stage):
+        """Time the body of a with-block as one `stage` span for `url`"""
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.record(url, stage, self.clock() - start)
+
+    def record(self, url, stage, seconds):
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            histogram = self.stages[stage] = StageHistogram()
+        histogram.add(seconds)
+        if self.file:
+            self.file.write(json.dumps({
+                'ts': round(time.time(), 3), 'url': url, 'stage': stage, 'ms': round(seconds * 1000, 3)
+            }) + '\n')
+
+    def record_fields(self, url, raw_fields):
+        """Spans for each field of an in-page extraction result that carries its own 'ms'"""
+        for name, match in raw_fields.items():
+            if isinstance(match, dict) and match.get('ms') is not None:
+                self.record(url, f"field:{name}", match['ms'] / 1000)
+
+    def summary(self):
+        """{stage: {'count', 'total', 'mean', 'p50', 'p95', 'p99'}} in seconds"""
+        result = {}
+        for stage, histogram in self.stages.items():
+            stats = {'count': histogram.count, 'total': histogram.total, 'mean': histogram.total / histogram.count}
+            for q in QUANTILES:
+                stats[f"p{int(q * 100)}"] = histogram.quantile(q)
+            result[stage] = stats
+        return result
+
+    def report(self):
+        """Summary lines for the log, stages sorted by total time spent"""
+        summary = self.summary()
+        lines = [f"{'stage':<28} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'total s':>9}"]
+        for stage, stats in sorted(summary.items(), key=lambda item: -item[1]['total']):
+            lines.append(f"{stage:<28} {stats['count']:>7} {stats['p50'] * 1000:>9.1f} {stats['p95'] * 1000:>9.1f} "
+                         f"{stats['p99'] * 1000:>9.1f} {stats['total']:>9.1f}")
+        return lines
+
+    def prometheus_text(self, name="robert_parker_stage_seconds"):
+        """The summary as a Prometheus summary metric, one series per stage"""
+        lines = [f"# HELP {name} Time spent per URL in each scraping stage.", f"# TYPE {name} summary"]
+        for stage, stats in sorted(self.summary().items()):
+            label = stage.replace('\\', '\\\\').replace('"', '\\"')
+            for q in QUANTILES:
+                lines.append(f'{name}{{stage="{label}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'{name}_sum{{stage="{label}"}} {stats["total"]:.6f}')
+            lines.append(f'{name}_count{{stage="{label}"}} {stats["count"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        """Write prometheus_text() atomically, e.g. for node_exporter's textfile collector"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.file = None
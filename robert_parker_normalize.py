@@ -0,0 +1,99 @@
+import re
+
+# Compiled once; per-row code below never builds a pattern from row data
+VINTAGE_PATTERN = re.compile(r'(19|20)\d{2}')
+REGION_PART_PATTERN = re.compile(r'(?:[A-Z][^A-Z\s-]*(?:[\s-][A-Z][^A-Z\s-]*)*)')
+# '93', '93+', '(93-95)', '93 - 95'
+SCORE_RANGE_PATTERN = r'(?P<low>\d+(?:\.\d+)?)\+?(?:\s*[-–]\s*(?P<high>\d+(?:\.\d+)?))?'
+# '2025 - 2045', '2030', 'Drink 2025-2040'
+YEAR_RANGE_PATTERN = r'(?P<low>(?:19|20)\d{2})(?:\s*[-–]\s*(?P<high>(?:19|20)\d{2}))?'
+# '$85', 'US$ 1,250', '€120.50', 'GBP 45', '45 EUR'
+PRICE_PATTERN = (r'(?P<before>US\$|[$€£¥]|[A-Z]{3}\b)?\s*(?P<amount>\d[\d,]*(?:\.\d+)?)'
+                 r'(?:\s*(?P<after>[A-Z]{3}\b|[€£]))?')
+PUBLISHED_PREFIX_PATTERN = r'^\s*(?:published|reviewed)(?:\s+on)?\s*:?\s*'
+
+CURRENCY_SYMBOLS = {'$': 'USD', 'US$': 'USD', '€': 'EUR', '£': 'GBP', '¥': 'JPY'}
+
+# Typed columns normalize_records() adds next to the text ones
+TYPED_COLUMNS = ['Score_Min', 'Score_Max', 'Drink_From', 'Drink_To', 'Release_Price_Amount',
+                 'Release_Price_Currency', 'Published_Date']
+
+
+# Text columns the typed ones are parsed from
+SOURCE_COLUMNS = ['Vintage', 'Score', 'Drink Window', 'Release Price', 'Published Date']
+
+
+def split_wine_name(full_name, producer=''):
+    """('Producer Label 2015', 'Producer') -> ('2015', 'Label'); vintage is '' if there is none"""
+    full_name = full_name or ''
+    match = VINTAGE_PATTERN.search(full_name)
+    vintage = match.group(0) if match else ''
+    name = full_name
+    # Producer prefix (case-insensitive) and trailing vintage are sliced off, not matched with a per-row regex
+    if producer and name[:len(producer)].lower() == producer.lower():
+        name = name[len(producer):]
+    name = name.strip()
+    if vintage and name.endswith(vintage):
+        name = name[:-len(vintage)]
+    return vintage, name.strip()
+
+
+def strip_values(wine_data):
+    """Strip whitespace from every text value in place, turning None into ''"""
+    for key, value in wine_data.items():
+        if value is None or isinstance(value, str):
+            wine_data[key] = value.strip() if value else ''
+    return wine_data
+
+
+def _numbers(frame, low, high, dtype):
+    """Range columns from an extract() frame; a single value is both ends of its range"""
+    import pandas as pd
+    low_values = pd.to_numeric(frame['low'], errors='coerce')
+    high_values = pd.to_numeric(frame['high'], errors='coerce').fillna(low_values)
+    return {low: low_values.astype(dtype), high: high_values.astype(dtype)}
+
+
+def normalize_records(rows):
+    """Typed columns for a batch of wine rows (dicts or WineRecords), parsed with vectorised pandas string ops
+
+    Returns a DataFrame with one row per input row and the TYPED_COLUMNS, plus
+    Vintage as an integer. Text that does not parse becomes a missing value.
+    """
+    rows = list(rows)
+    return normalize_columns({column: [row.get(column) for row in rows] for column in SOURCE_COLUMNS}, len(rows))
+
+
+def normalize_columns(columns, length):
+    """normalize_records() for a batch already split into {header: values}; missing columns parse as blank"""
+    import pandas as pd
+    text = {}
+    for column in SOURCE_COLUMNS:
+        values = columns.get(column)
+        series = pd.Series([None] * length if values is None else list(values), dtype='object')
+        text[column] = series.astype('string').str.strip()
+
+    typed = pd.DataFrame(index=range(length))
+    vintage = text['Vintage'].where(text['Vintage'].str.fullmatch(r'\d{4}', na=False))
+    typed['Vintage'] = pd.to_numeric(vintage, errors='coerce').astype('Int16')
+    for column, value in _numbers(text['Score'].str.extract(SCORE_RANGE_PATTERN),
+                                  'Score_Min', 'Score_Max', 'Float32').items():
+        typed[column] = value
+    for column, value in _numbers(text['Drink Window'].str.extract(YEAR_RANGE_PATTERN),
+                                  'Drink_From', 'Drink_To', 'Int16').items():
+        typed[column] = value
+
+    price = text['Release Price'].str.extract(PRICE_PATTERN)
+    typed['Release_Price_Amount'] = pd.to_numeric(price['amount'].str.replace(',', '', regex=False),
+                                                  errors='coerce').astype('Float64')
+    currency = price['before'].fillna(price['after'])
+    typed['Release_Price_Currency'] = currency.replace(CURRENCY_SYMBOLS).astype('string')
+
+    published = text['Published Date'].str.replace(PUBLISHED_PREFIX_PATTERN, '', regex=True, flags=re.IGNORECASE)
+    # The format is inferred once from the first date; only rows in another format are parsed one by one
+    dates = pd.to_datetime(published, errors='coerce')
+    other_format = dates.isna() & published.str.len().gt(0).fillna(False)
+    if other_format.any():
+        dates[other_format] = pd.to_datetime(published[other_format], format='mixed', errors='coerce')
+    typed['Published_Date'] = dates
+    return typed
@@ -0,0 +1,160 @@
+import asyncio
+import hashlib
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree, html as lxml_html
+from lxml.cssselect import CSSSelector
+from robert_parker_fields import WINE_FIELDS, add_name_fields, apply_post_processors, empty_wine_data
+from robert_parker_normalize import strip_values
+from robert_parker_record import WineRecord
+from robert_parker_urls import wine_id_from_url
+
+# Compiled selectors, cached per worker process (None = selector is invalid here)
+_compiled_selectors = {}
+
+
+def _compile(selector):
+    if selector not in _compiled_selectors:
+        try:
+            if selector.startswith('/') or selector.startswith('('):
+                _compiled_selectors[selector] = etree.XPath(selector)
+            else:
+                _compiled_selectors[selector] = CSSSelector(selector)
+        except Exception:
+            _compiled_selectors[selector] = None
+    return _compiled_selectors[selector]
+
+
+def _first_text(tree, selector):
+    """textContent of the first node matching selector, or None"""
+    compiled = _compile(selector)
+    if compiled is None:
+        return None
+    try:
+        nodes = compiled(tree)
+    except Exception:
+        return None
+    if not nodes:
+        return None
+    node = nodes[0]
+    return node.text_content() if hasattr(node, 'text_content') else str(node)
+
+
+def resolve_fields_html(tree, specs):
+    """Offline twin of the in-page script: {name: {'text', 'index'}} for each spec"""
+    result = {}
+    for spec in specs:
+        result[spec.name] = {'text': None, 'index': -1}
+        for index, selector in enumerate(spec.selectors):
+            text = _first_text(tree, selector)
+            if text is None:
+                continue
+            if spec.require_text and not text.strip():
+                continue
+            result[spec.name] = {'text': text, 'index': index}
+            break
+    return result
+
+
+def extract_fields_from_html(page_html, specs=WINE_FIELDS):
+    """Run the field specs against raw HTML with lxml"""
+    tree = lxml_html.document_fromstring(page_html)
+    return apply_post_processors(specs, resolve_fields_html(tree, specs))
+
+
+def extract_wine_html(page_html, url):
+    """Build a full wine row from a captured page, the same way scrape_wine_data does"""
+    wine_data = empty_wine_data(url)
+    wine_data.update(extract_fields_from_html(page_html))
+    if wine_data['Full_Wine_Name'] is None:
+        raise Exception("Wine name element not found")
+    add_name_fields(wine_data)
+
+    # Clean up data (remove extra whitespace)
+    strip_values(wine_data)
+    return wine_data
+
+
+class HtmlExtractor:
+    """Process pool that parses captured pages while the browser keeps navigating"""
+
+    def __init__(self, max_workers=None, extract_func=extract_wine_html):
+        self.max_workers = max_workers
+        self.extract_func = extract_func
+        self.executor = None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self
+
+    async def extract(self, page_html, url):
+        """Parse one page in a worker process without blocking the event loop"""
+        self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.extract_func, page_html, url)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+def archive_path(archive_dir, url):
+    """File name for a captured page: the wine ID, or a hash of the URL"""
+    name = wine_id_from_url(url) or hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(archive_dir, f"{name}.html")
+
+
+def archive_html(archive_dir, url, page_html):
+    """Save a captured page so it can be re-extracted later without logging in"""
+    os.makedirs(archive_dir, exist_ok=True)
+    with open(archive_path(archive_dir, url), 'w', encoding='utf-8') as f:
+        # First line records where the page came from
+        f.write(f"<!-- source: {url} -->\n")
+        f.write(page_html)
+
+
+def read_archive(archive_dir):
+    """Yield (url, html) for every page in an archive directory"""
+    for name in sorted(os.listdir(archive_dir)):
+        if not name.endswith('.html'):
+            continue
+        with open(os.path.join(archive_dir, name), encoding='utf-8') as f:
+            first_line = f.readline()
+            page_html = f.read()
+        url = ''
+        if first_line.startswith('<!-- source: '):
+            url = first_line[len('<!-- source: '):].rstrip().removesuffix('-->').strip()
+        else:
+            page_html = first_line + page_html
+        yield url, page_html
+
+
+def extract_archive(archive_dir, max_workers=None, extract_func=extract_wine_html):
+    """Re-extract every archived page across a process pool; failures become ERROR rows
+
+    Pages are read as they are submitted, with at most two per worker in flight,
+    so only those pages' HTML is held in memory. Rows keep the archive's order.
+    """
+    max_in_flight = 2 * (max_workers or os.cpu_count() or 1)
+    in_flight = deque()
+    wine_data_list = []
+
+    def collect():
+        url, future = in_flight.popleft()
+        try:
+            wine_data_list.append(WineRecord.from_dict(future.result()))
+        except Exception as e:
+            print(f"Error extracting archived page {url}: {e}")
+            wine_data_list.append(WineRecord.failed(url, str(e)))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for url, page_html in read_archive(archive_dir):
+            if len(in_flight) >= max_in_flight:
+                collect()
+            in_flight.append((url, executor.submit(extract_func, page_html, url)))
+        while in_flight:
+            collect()
+    return wine_data_list
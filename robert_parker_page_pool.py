@@ -0,0 +1,105 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class PagePool:
+    """Pool of pages on one browser context, checked out one per URL"""
+
+    def __init__(self, context, size, setup_page=None, pages=None):
+        self.context = context
+        self.size = max(1, size)
+        self.setup_page = setup_page
+        self.initial_pages = list(pages or [])
+        self.idle = asyncio.Queue()
+        self.all_pages = set()
+        self.crashed = set()
+        self.replaced_count = 0
+
+    async def start(self):
+        """Open pages until the pool holds `size` of them"""
+        for page in self.initial_pages[:self.size]:
+            self._track(page)
+            await self.idle.put(page)
+        while len(self.all_pages) < self.size:
+            page = await self._new_page()
+            await self.idle.put(page)
+        print(f"Page pool ready with {len(self.all_pages)} pages")
+
+    def _track(self, page):
+        self.all_pages.add(page)
+        page.on("crash", lambda: self.crashed.add(page))
+
+    async def _new_page(self):
+        page = await self.context.new_page()
+        if self.setup_page:
+            await self.setup_page(page)
+        self._track(page)
+        return page
+
+    async def is_healthy(self, page):
+        """Check that a page is still open and its renderer responds"""
+        if page in self.crashed or page.is_closed():
+            return False
+        try:
+            await asyncio.wait_for(page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _replace(self, page):
+        """Close a broken page and open a fresh one in its place"""
+        self.all_pages.discard(page)
+        self.crashed.discard(page)
+        try:
+            if not page.is_closed():
+                await page.close()
+        except Exception:
+            pass
+        self.replaced_count += 1
+        print(f"Replacing unhealthy page (total replaced: {self.replaced_count})")
+        return await self._new_page()
+
+    async def acquire(self):
+        """Check out a healthy page, waiting until one is free"""
+        page = await self.idle.get()
+        if not await self.is_healthy(page):
+            try:
+                page = await self._replace(page)
+            except Exception:
+                # Keep the pool size stable even if the context refused a new page
+                await self.idle.put(page)
+                raise
+        return page
+
+    async def release(self, page, healthy=True):
+        """Return a page to the pool, replacing it if it is known to be broken"""
+        if not healthy or not await self.is_healthy(page):
+            try:
+                page = await self._replace(page)
+            except Exception as e:
+                print(f"Could not replace page: {e}")
+        await self.idle.put(page)
+
+    @asynccontextmanager
+    async def page(self):
+        """Context manager that checks a page out and always returns it"""
+        page = await self.acquire()
+        healthy = True
+        try:
+            yield page
+        except Exception as e:
+            if "crash" in str(e).lower() or "closed" in str(e).lower():
+                healthy = False
+            raise
+        finally:
+            await self.release(page, healthy)
+
+    async def close(self):
+        """Close every page owned by the pool"""
+        for page in list(self.all_pages):
+            try:
+                if not page.is_closed():
+                    await page.close()
+            except Exception:
+                pass
+        self.all_pages.clear()
@@ -0,0 +1,74 @@
+import asyncio
+
+_DONE = object()
+
+
+async def iterate(items):
+    """Async generator over any iterable, so lists and lazy sources plug into the same stages"""
+    iterator = iter(items)
+    try:
+        for item in iterator:
+            yield item
+    finally:
+        # A generator source (e.g. a URL file being read) is closed as soon as this one is
+        if hasattr(iterator, 'close'):
+            iterator.close()
+
+
+async def map_stage(source, func, workers=1, maxsize=None):
+    """Pipeline stage: run `func` over an async source with `workers` calls in flight
+
+    Yields (item, result) as each call completes; a call that raises yields its
+    exception as the result. Both queues are bounded, so the source is only read
+    as fast as results are consumed and memory stays flat however long it is.
+    """
+    maxsize = maxsize or workers * 2
+    inbox = asyncio.Queue(maxsize)
+    outbox = asyncio.Queue(maxsize)
+    source_error = []
+
+    async def feed():
+        try:
+            async for item in source:
+                await inbox.put(item)
+        except Exception as e:
+            source_error.append(e)
+        # Not in a finally: once cancelled, nobody is left to take these off a full queue
+        for _ in range(workers):
+            await inbox.put(_DONE)
+
+    async def work():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await outbox.put(_DONE)
+                return
+            try:
+                result = await func(item)
+            except Exception as e:
+                result = e
+            await outbox.put((item, result))
+
+    tasks = [asyncio.create_task(feed())] + [asyncio.create_task(work()) for _ in range(workers)]
+    try:
+        finished = 0
+        while finished < workers:
+            output = await outbox.get()
+            if output is _DONE:
+                finished += 1
+                continue
+            yield output
+        if source_error:
+            raise source_error[0]
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def is_error_row(wine_data, name_key='Full_Wine_Name'):
+    """True for ERROR and STOPPED rows and rows with an error message"""
+    status = getattr(wine_data, 'status', None)
+    if status:
+        return status != 'OK'
+    return wine_data.get(name_key) in ('ERROR', 'STOPPED') or bool(wine_data.get('Error'))
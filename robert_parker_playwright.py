@@ -1,32 +1,120 @@
+import argparse
 import asyncio
+import itertools
 import json
 import os
+import sys
 from datetime import datetime
 from playwright.async_api import async_playwright
-import openpyxl
-from openpyxl.styles import Font
 import time
-import aiohttp
-from asyncio import Semaphore
+from robert_parker_page_pool import PagePool
+from robert_parker_rate_limit import FileTokenBucket, TokenBucket
+from robert_parker_adaptive import AdaptiveController
+from robert_parker_resources import apply_profile, load_profiles
+from robert_parker_session import SessionStore
+from robert_parker_waits import (
+    CONSENT_SELECTORS, EMAIL_INPUT_SELECTORS, LOGGED_IN_SELECTORS, LOGIN_BUTTON_SELECTORS,
+    LOGIN_ERROR_SELECTORS, LOGIN_ERROR_WAIT_SELECTORS, dismiss_popups, wait_for_any
+)
+from robert_parker_fields import (
+    FieldSpec, NAME_SELECTORS, PRODUCER_SELECTORS, REGION_SELECTORS, COLOR_SELECTORS,
+    SCORE_SELECTORS, DRINK_WINDOW_SELECTORS, REVIEWED_BY_SELECTORS, RELEASE_PRICE_SELECTORS,
+    DRINK_DATE_SELECTORS, TASTING_NOTE_SELECTORS, PRODUCER_NOTE_SELECTORS,
+    REVIEW_ANCHOR_SELECTORS, apply_post_processors, compile_extraction_script, extract_raw_fields,
+    wait_for_anchor
+)
+from robert_parker_api import ApiFieldMap, WineApiClient
+from robert_parker_cache import ResponseCache
+from robert_parker_journal import RunJournal
+from robert_parker_export import open_exporter
+from robert_parker_normalize import strip_values
+from robert_parker_pipeline import iterate
+from robert_parker_retry import NOT_FOUND, THROTTLED, RetryScheduler, ScrapeError, map_with_retries
+from robert_parker_urls import UrlSource
+
+# Fields written by this script, in spreadsheet order
+FIELDS = [
+    FieldSpec('Wine Name', NAME_SELECTORS),
+    FieldSpec('Producer', PRODUCER_SELECTORS),
+    FieldSpec('Wine Region', REGION_SELECTORS),
+    FieldSpec('Color', COLOR_SELECTORS, require_text=True),
+    FieldSpec('Score', SCORE_SELECTORS),
+    FieldSpec('Drink Window', DRINK_WINDOW_SELECTORS),
+    FieldSpec('Reviewed By', REVIEWED_BY_SELECTORS),
+    FieldSpec('Release Price', RELEASE_PRICE_SELECTORS),
+    FieldSpec('Drink Date', DRINK_DATE_SELECTORS),
+    FieldSpec('Tasting Note', TASTING_NOTE_SELECTORS),
+    FieldSpec('Producer Note', PRODUCER_NOTE_SELECTORS),
+]
+FIELDS_SCRIPT = compile_extraction_script(FIELDS)
+HEADERS = [spec.name for spec in FIELDS] + ['URL']
+
+
+def empty_row(url):
+    """A row of this script's columns, blank except URL"""
+    row = dict.fromkeys(HEADERS, '')
+    row['URL'] = url
+    return row
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
 
 class RobertParkerScraper:
-    def __init__(self, email, password, max_concurrent=5, requests_per_minute=30):
+    def __init__(self, email, password, max_concurrent=5, requests_per_minute=30, fetch_mode="browser",
+                 cache_dir=None, cache_ttl_hours=24, cache_max_mb=500,
+                 journal_file="robert_parker_journal_playwright.db", burst=1, rate_limit_file=None, adaptive=True,
+                 block_resources=True, resource_profile_file=None, session_file="robert_parker_session.json",
+                 headless=False, max_attempts=3, retry_budget=0.2):
         self.email = email
         self.password = password
-        self.cookies_file = "robert_parker_cookies.json"
+        # Cookies saved after a successful login; later runs (and workers) reuse them
+        # and only log in again when the saved session no longer works
+        self.session_store = SessionStore(session_file) if session_file else None
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
         self.max_concurrent = max_concurrent
+        # Failed URLs are requeued with backoff, up to max_attempts each and, across
+        # the run, 10 + retry_budget x URLs retries in total
+        self.max_attempts = max_attempts
+        self.retry_budget = retry_budget
         self.requests_per_minute = requests_per_minute
-        self.semaphore = Semaphore(max_concurrent)
-        self.rate_limit_delay = 60.0 / requests_per_minute
-        self.last_request_time = 0
+        # Concurrency and rate start below the configured values and follow the
+        # server's responses (AIMD); with adaptive=False they stay fixed
+        self.controller = AdaptiveController(max_concurrent, requests_per_minute, enabled=adaptive,
+                                             on_change=self.on_limits_changed)
+        # page.route profiles per page type ('login', 'wine') that abort images, fonts,
+        # trackers and other requests extraction never reads; None loads everything
+        self.resource_profiles = load_profiles(resource_profile_file) if block_resources else None
+        # One token bucket shared by every tab (and, with rate_limit_file, every process)
+        if rate_limit_file:
+            self.rate_limiter = FileTokenBucket(rate_limit_file, self.controller.requests_per_minute, burst)
+        else:
+            self.rate_limiter = TokenBucket(self.controller.requests_per_minute, burst)
+        # "api" fetches wines from the JSON endpoints learned during browser loads
+        self.fetch_mode = fetch_mode
+        self.api_field_map = None
+        self.api_client = None
+        # Pages scraped on earlier runs are served from here until their TTL runs out
+        self.response_cache = ResponseCache(
+            cache_dir, cache_ttl_hours, cache_max_mb, schema="playwright", required=("Wine Name",)
+        ) if cache_dir else None
+        # Every result is committed here as it completes so long runs can be resumed
+        self.journal = RunJournal(journal_file) if journal_file else None
+        # Set once the consent banner has been dealt with; later pages skip waiting for it
+        self.consent_handled = False
         
     async def rate_limit(self):
         """Ensure we don't exceed the rate limit"""
-        current_time = time.time()
-        time_since_last = current_time - self.last_request_time
-        if time_since_last < self.rate_limit_delay:
-            await asyncio.sleep(self.rate_limit_delay - time_since_last)
-        self.last_request_time = time.time()
+        await self.rate_limiter.acquire()
+
+    def set_requests_per_minute(self, requests_per_minute):
+        """Change the rate limit while a run is in progress"""
+        self.requests_per_minute = requests_per_minute
+        self.controller.set_max_rate(requests_per_minute)
+
+    def on_limits_changed(self, concurrency, requests_per_minute):
+        """Controller callback: the token bucket follows the current rate"""
+        self.rate_limiter.set_rate(requests_per_minute)
 
     async def setup_browser(self):
         """Set up Playwright browser with persistent context"""
@@ -36,7 +124,7 @@ class RobertParkerScraper:
         user_data_dir = os.path.join(os.getcwd(), "browser_data")
         self.browser = await self.playwright.chromium.launch_persistent_context(
             user_data_dir=user_data_dir,
-            headless=False,  # Set to True for production
+            headless=self.headless,
             args=[
                 '--no-sandbox',
                 '--disable-dev-shm-usage',
@@ -47,106 +135,157 @@ class RobertParkerScraper:
         )
         
         self.page = self.browser.pages[0] if self.browser.pages else await self.browser.new_page()
-        
-        # Set viewport and user agent
-        await self.page.set_viewport_size({"width": 1920, "height": 1080})
-        await self.page.set_extra_http_headers({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        await self.configure_page(self.page)
+        await self.apply_resource_profile(self.page, 'login')
+
+    async def configure_page(self, page):
+        """Set viewport and user agent on a page opened on the shared context"""
+        await page.set_viewport_size({"width": 1920, "height": 1080})
+        await page.set_extra_http_headers({
+            'User-Agent': USER_AGENT
         })
+        await self.apply_resource_profile(page, 'wine')
+
+    async def apply_resource_profile(self, page, page_type):
+        """Block the requests a page of this type does not need"""
+        if self.resource_profiles:
+            await apply_profile(page, self.resource_profiles.get(page_type))
+
+    async def setup_page_pool(self):
+        """Open one tab per concurrent slot on the logged-in context"""
+        await self.apply_resource_profile(self.page, 'wine')
+        self.page_pool = PagePool(self.browser, self.max_concurrent, self.configure_page, pages=[self.page])
+        await self.page_pool.start()
 
-    async def handle_popups(self):
-        """Handle cookie consent and other popups"""
+    async def setup_api_client(self):
+        """Start recording XHR endpoints and open the HTTP client used once they are learned"""
+        self.api_field_map = ApiFieldMap([spec.name for spec in FIELDS], map_file="robert_parker_api_endpoints_playwright.json",
+                                          required=('Wine Name',))
+        if not self.api_field_map.ready:
+            self.browser.on("response", self.api_field_map.on_response)
+        self.api_client = WineApiClient(
+            self.api_field_map,
+            await self.browser.cookies(),
+            user_agent=USER_AGENT,
+            max_connections=self.max_concurrent
+        )
+        await self.api_client.start()
+
+    async def fetch_api_fields(self, url):
+        """Raw fields of one wine from the learned JSON endpoints, or None if the fetch failed"""
+        fetch_start = time.monotonic()
         try:
-            # Wait for page to load
-            await self.page.wait_for_load_state('networkidle', timeout=10000)
-            
-            # Handle cookie consent popup with the specific XPath
-            cookie_button = await self.page.query_selector('//*[@id="didomi-notice-agree-button"]')
-            if cookie_button:
-                await cookie_button.click()
+            raw_fields = await self.api_client.fetch_raw_fields(url)
+        except Exception as e:
+            self.controller.record(status=getattr(e, 'status', None), error=e)
+            print(f"API fetch failed for {url}, falling back to browser: {e}")
+            return None
+        self.controller.record(time.monotonic() - fetch_start)
+        return raw_fields
+
+    async def scrape_wine_api(self, url):
+        """Fetch one wine from the learned JSON endpoints; None means use the browser"""
+        fetch_start = time.monotonic()
+        try:
+            raw_fields, payloads = await self.api_client.fetch_raw_fields(url, return_payloads=True)
+        except Exception as e:
+            self.controller.record(status=getattr(e, 'status', None), error=e)
+            print(f"API fetch failed for {url}, falling back to browser: {e}")
+            return None
+        self.controller.record(time.monotonic() - fetch_start)
+        wine_data = apply_post_processors(FIELDS, raw_fields)
+        if not wine_data['Wine Name']:
+            return None
+        wine_data['URL'] = url
+        for key in wine_data:
+            if isinstance(wine_data[key], str):
+                wine_data[key] = wine_data[key].strip() if wine_data[key] else ''
+        if self.response_cache:
+            self.response_cache.put(url, wine_data, json.dumps(payloads, ensure_ascii=False), "application/json")
+        print(f"Successfully scraped: {wine_data['Wine Name']}")
+        return wine_data
+
+    def cached_wine_data(self, url):
+        """Return the cached record if it is younger than the cache TTL"""
+        entry = self.response_cache.get(url)
+        if not entry:
+            return None
+        print(f"Successfully scraped: {entry['record']['Wine Name']} (cached)")
+        return entry['record']
+
+    async def handle_popups(self, page=None, consent_timeout=3000):
+        """Dismiss the consent banner and any open popups in one round trip"""
+        page = page or self.page
+        try:
+            # Until consent has been handled this session, give the banner a moment to appear
+            consent = not self.consent_handled
+            if consent and not await wait_for_any(page, CONSENT_SELECTORS, timeout=consent_timeout):
+                consent = False
+            result = await dismiss_popups(page, consent=consent)
+            if result['consent']:
                 print("Cookie consent popup handled")
-                await asyncio.sleep(1)
-            
-            # Handle other potential popups
-            popup_selectors = [
-                'button[data-testid="close-button"]',
-                '.modal-close',
-                '.popup-close',
-                '[aria-label="Close"]',
-                '.close-button'
-            ]
-            
-            for selector in popup_selectors:
-                try:
-                    popup = await self.page.query_selector(selector)
-                    if popup and await popup.is_visible():
-                        await popup.click()
-                        print(f"Closed popup with selector: {selector}")
-                        await asyncio.sleep(0.5)
-                except:
-                    continue
-                    
+            for closed in result['closed']:
+                print(f"Closed popup with {closed}")
+            self.consent_handled = True
         except Exception as e:
             print(f"Popup handling error: {e}")
 
+    async def ensure_logged_in(self):
+        """Reuse the saved session if it still works, otherwise log in and save the new one"""
+        if self.session_store and await self.session_store.restore(self.browser):
+            if await self.session_is_valid():
+                print("Reusing saved login session")
+                return True
+            print("Saved login session is no longer valid, logging in again")
+        if not await self.login():
+            return False
+        if self.session_store:
+            try:
+                await self.session_store.save(self.browser)
+            except Exception as e:
+                print(f"Could not save login session: {e}")
+        return True
+
+    async def session_is_valid(self):
+        """One lean homepage load: logged in if the user menu renders"""
+        try:
+            await self.page.goto("https://www.robertparker.com/", wait_until='domcontentloaded', timeout=15000)
+        except Exception as e:
+            print(f"Session check failed: {e}")
+            return False
+        return await wait_for_any(self.page, LOGGED_IN_SELECTORS, timeout=8000) is not None
+
     async def login(self):
         """Login to Robert Parker website"""
         try:
             print("Starting login process...")
             
-            # Check if we're already logged in
-            await self.page.goto("https://www.robertparker.com/", wait_until='networkidle', timeout=15000)
+            # Check if we're already logged in once the header has rendered
+            await self.page.goto("https://www.robertparker.com/", wait_until='domcontentloaded', timeout=15000)
+            await wait_for_any(self.page, LOGGED_IN_SELECTORS + LOGIN_BUTTON_SELECTORS + CONSENT_SELECTORS, timeout=15000)
             await self.handle_popups()
             
-            # Check if already logged in by looking for logout button or user menu
-            logout_indicators = [
-                'a[href*="logout"]',
-                '.user-menu',
-                '.account-menu',
-                '[data-testid="user-menu"]',
-                '[data-testid="account-menu"]',
-                '.user-account'
-            ]
-            
-            for indicator in logout_indicators:
-                if await self.page.query_selector(indicator):
-                    print("Already logged in!")
-                    return True
+            if await self.page.query_selector(", ".join(LOGGED_IN_SELECTORS)):
+                print("Already logged in!")
+                return True
             
             print("Not logged in, attempting to login...")
             
-            # Try multiple login button selectors
-            login_button_selectors = [
-                '//*[@id="root"]/header/div[1]/div/div/div[3]/div',
-                '//button[contains(text(), "Login")]',
-                '//a[contains(text(), "Login")]',
-                '//*[contains(@class, "login")]',
-                '//*[contains(@class, "signin")]'
-            ]
-            
             login_button = None
-            for selector in login_button_selectors:
-                try:
-                    login_button = await self.page.query_selector(selector)
-                    if login_button:
-                        print(f"Found login button with selector: {selector}")
-                        break
-                except:
-                    continue
+            selector = await wait_for_any(self.page, LOGIN_BUTTON_SELECTORS, timeout=5000, visible=False)
+            if selector:
+                login_button = await self.page.query_selector(selector)
+                print(f"Found login button with selector: {selector}")
             
             if login_button:
                 print("Clicking login button...")
                 await login_button.click()
-                await asyncio.sleep(3)
                 
                 # Wait for login form to appear
-                try:
-                    await self.page.wait_for_selector('//*[@id="user_login"]', timeout=10000)
+                if await wait_for_any(self.page, EMAIL_INPUT_SELECTORS, timeout=10000):
                     print("Login form appeared")
-                except:
+                else:
                     print("Login form did not appear, trying alternative approach...")
-                    # Try to find login form on current page
-                    pass
                 
                 # Fill in login form
                 email_input = await self.page.query_selector('//*[@id="user_login"]')
@@ -173,35 +312,14 @@ class RobertParkerScraper:
                     print("Submitting login form...")
                     await submit_button.click()
                     
-                    # Wait for login to complete
-                    await asyncio.sleep(5)
-                    
-                    # Verify login success with multiple indicators
-                    success_indicators = [
-                        'a[href*="logout"]',
-                        '.user-menu',
-                        '.account-menu',
-                        '[data-testid="user-menu"]',
-                        '[data-testid="account-menu"]',
-                        '.user-account',
-                        '.user-profile'
-                    ]
-                    
-                    for indicator in success_indicators:
-                        if await self.page.query_selector(indicator):
-                            print("Login successful!")
-                            return True
+                    # Wait for the user menu (success) or an error message, whichever shows first
+                    outcome = await wait_for_any(self.page, LOGGED_IN_SELECTORS + LOGIN_ERROR_WAIT_SELECTORS, timeout=15000)
+                    if outcome in LOGGED_IN_SELECTORS or await self.page.query_selector(", ".join(LOGGED_IN_SELECTORS)):
+                        print("Login successful!")
+                        return True
                     
                     # Check for error messages
-                    error_selectors = [
-                        '.error',
-                        '.alert',
-                        '.message',
-                        '[class*="error"]',
-                        '[class*="alert"]'
-                    ]
-                    
-                    for error_selector in error_selectors:
+                    for error_selector in LOGIN_ERROR_SELECTORS:
                         error_element = await self.page.query_selector(error_selector)
                         if error_element:
                             error_text = await error_element.text_content()
@@ -210,7 +328,7 @@ class RobertParkerScraper:
                     print("Login failed - could not find success indicators")
                     return False
                 else:
-                    print(f"Could not find login form elements:")
+                    print("Could not find login form elements:")
                     print(f"  Email input: {'Found' if email_input else 'Not found'}")
                     print(f"  Password input: {'Found' if password_input else 'Not found'}")
                     print(f"  Submit button: {'Found' if submit_button else 'Not found'}")
@@ -225,216 +343,171 @@ class RobertParkerScraper:
 
     async def scrape_wine_data(self, url):
         """Scrape wine data from a single URL"""
-        async with self.semaphore:  # Limit concurrent requests
+        if self.response_cache:
+            wine_data = self.cached_wine_data(url)
+            if wine_data:
+                return wine_data
+        
+        async with self.controller.slot():  # Limit concurrent requests
             await self.rate_limit()  # Rate limiting
             
-            try:
+            api_fields = None
+            if self.api_client and self.api_field_map.ready:
+                if self.api_field_map.dom_fields():
+                    # Only some fields have endpoints; the page supplies the rest below
+                    api_fields = await self.fetch_api_fields(url)
+                else:
+                    wine_data = await self.scrape_wine_api(url)
+                    if wine_data:
+                        return wine_data
+            
+            async with self.page_pool.page() as page:  # Each task drives its own tab
                 print(f"Scraping: {url}")
-                
-                # Navigate to the wine page
-                await self.page.goto(url, wait_until='networkidle', timeout=10000)
-                await self.handle_popups()
-                
+
+                # Navigate to the wine page; failures go back to the retry scheduler
+                nav_start = time.monotonic()
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=10000)
+                except Exception as nav_error:
+                    self.controller.record(error=nav_error)
+                    raise
+                status = response.status if response else None
+                self.controller.record(time.monotonic() - nav_start, status)
+                if status in (404, 410):
+                    raise ScrapeError(NOT_FOUND, f"HTTP {status}")
+                if status is not None and (status == 429 or status >= 500):
+                    raise ScrapeError(THROTTLED, f"HTTP {status}")
+                # Wait for the elements we extract instead of for the network to go idle
+                if await wait_for_anchor(page, NAME_SELECTORS, timeout=10000):
+                    await wait_for_anchor(page, REVIEW_ANCHOR_SELECTORS, timeout=3000)
+                await self.handle_popups(page)
+
                 # Initialize wine data dictionary
-                wine_data = {
-                    'Wine Name': '',
-                    'Producer': '',
-                    'Wine Region': '',
-                    'Color': '',
-                    'Score': '',
-                    'Drink Window': '',
-                    'Reviewed By': '',
-                    'Release Price': '',
-                    'Drink Date': '',
-                    'Tasting Note': '',
-                    'Producer Note': '',
-                    'URL': url
-                }
-                
-                # Extract data using XPath selectors
+                wine_data = empty_row(url)
+
+                # Extract every field (with all fallbacks) in one round trip to the page
                 try:
-                    # Wine Name
-                    wine_name_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[1]/div/header/h1')
-                    if wine_name_element:
-                        wine_data['Wine Name'] = await wine_name_element.text_content()
-                    
-                    # Producer (with fallback)
-                    producer_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[1]/div[2]/span/a')
-                    if not producer_element:
-                        producer_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[1]/div[2]')
-                    if not producer_element:
-                        producer_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[1]/div[2]')
-                    if producer_element:
-                        wine_data['Producer'] = await producer_element.text_content()
-                    
-                    # Wine Region (with fallback)
-                    region_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[2]/div[2]')
-                    if not region_element:
-                        region_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[2]')
-                    if region_element:
-                        wine_data['Wine Region'] = await region_element.text_content()
-                    
-                    # Color (with multiple fallback options)
-                    color_element = None
-                    
-                    # Try multiple XPath alternatives for color
-                    color_xpaths = [
-                        # Original XPath
-                        '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/ol/li/article/div/div/div/div[4]/div[2]',
-                        # Alternative with div instead of ol
-                        '//*[@id="root"]/div[1]/div/div[2]/div/div/div[1]/div/div/ol/li/article/div/div/div/div[4]/div[2]',
-                        # More flexible - find by position in article
-                        '//article//div[4]/div[2]',
-                        # Find by text content containing color-related terms
-                        '//*[contains(text(), "Red") or contains(text(), "White") or contains(text(), "Rosé") or contains(text(), "Sparkling") or contains(text(), "Dessert")]',
-                        # Find by class or data attributes (if available)
-                        '//*[@class*="color" or @class*="type"]',
-                        # Find by label text and get sibling
-                        '//*[contains(text(), "Color") or contains(text(), "Type")]/following-sibling::*[1]',
-                        # Generic approach - find any element with color-like text
-                        '//*[matches(text(), "(Red|White|Rosé|Sparkling|Dessert|Fortified)", "i")]'
-                    ]
-                    
-                    for xpath in color_xpaths:
-                        try:
-                            color_element = await self.page.query_selector(xpath)
-                            if color_element:
-                                color_text = await color_element.text_content()
-                                if color_text and color_text.strip():
-                                    wine_data['Color'] = color_text.strip()
-                                    break
-                        except Exception:
-                            continue
-                    
-                    # If no color found, try CSS selector approach
-                    if not wine_data.get('Color'):
-                        try:
-                            color_element = await self.page.query_selector('article div:nth-child(4) div:nth-child(2)')
-                            if color_element:
-                                wine_data['Color'] = await color_element.text_content()
-                        except Exception:
-                            pass
-                    
-                    # Score
-                    score_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[1]/div/div[2]')
-                    if score_element:
-                        wine_data['Score'] = await score_element.text_content()
-                    
-                    # Drink Window
-                    drink_window_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[3]/dl/dd')
-                    if drink_window_element:
-                        wine_data['Drink Window'] = await drink_window_element.text_content()
-                    
-                    # Reviewed By (with fallback)
-                    reviewed_by_element = await self.page.query_selector('//dd/a')
-                    if not reviewed_by_element:
-                        reviewed_by_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[1]/dl/dd/a')
-                    if reviewed_by_element:
-                        wine_data['Reviewed By'] = await reviewed_by_element.text_content()
-                    
-                    # Release Price
-                    price_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[2]/dl/dl/div')
-                    if price_element:
-                        wine_data['Release Price'] = await price_element.text_content()
-                    
-                    # Drink Date
-                    drink_date_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/div/div[3]/dl/dd')
-                    if drink_date_element:
-                        wine_data['Drink Date'] = await drink_date_element.text_content()
-                    
-                    # Tasting Note
-                    tasting_note_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/p[1]')
-                    if tasting_note_element:
-                        wine_data['Tasting Note'] = await tasting_note_element.text_content()
-                    
-                    # Producer Note
-                    producer_note_element = await self.page.query_selector('//*[@id="root"]/div[1]/div/div[2]/div/div/div[2]/article/div[2]/div/div/div/div[2]/p[2]')
-                    if producer_note_element:
-                        wine_data['Producer Note'] = await producer_note_element.text_content()
-                    
+                    if api_fields:
+                        page_specs = [spec for spec in FIELDS if spec.name not in self.api_field_map.fields]
+                        raw_fields = dict(api_fields, **await extract_raw_fields(page, page_specs))
+                    else:
+                        raw_fields = await extract_raw_fields(page, FIELDS, FIELDS_SCRIPT)
+                    if self.api_field_map and not self.api_field_map.ready:
+                        self.api_field_map.observe(url, raw_fields)
+                        if self.api_field_map.ready:
+                            self.browser.remove_listener("response", self.api_field_map.on_response)
+                    wine_data.update(apply_post_processors(FIELDS, raw_fields))
                 except Exception as e:
                     print(f"Error extracting data from {url}: {e}")
-                
+
                 # Clean up data (remove extra whitespace)
-                for key in wine_data:
-                    if isinstance(wine_data[key], str):
-                        wine_data[key] = wine_data[key].strip() if wine_data[key] else ''
-                
+                strip_values(wine_data)
+
+                if self.response_cache and wine_data['Wine Name']:
+                    self.response_cache.put(url, wine_data, await page.content())
+
                 print(f"Successfully scraped: {wine_data['Wine Name']}")
                 return wine_data
-                
-            except Exception as e:
-                print(f"Error scraping {url}: {e}")
-                return {
-                    'Wine Name': 'ERROR',
-                    'Producer': '',
-                    'Wine Region': '',
-                    'Color': '',
-                    'Score': '',
-                    'Drink Window': '',
-                    'Reviewed By': '',
-                    'Release Price': '',
-                    'Drink Date': '',
-                    'Tasting Note': '',
-                    'Producer Note': '',
-                    'URL': url,
-                    'Error': str(e)
-                }
-
-    async def scrape_all_wines(self, urls):
-        """Scrape multiple wine URLs concurrently"""
-        if not urls:
-            print("No URLs provided")
-            return []
-        
-        # Setup browser and login
-        await self.setup_browser()
-        login_success = await self.login()
-        
-        if not login_success:
-            print("Failed to login. Exiting.")
-            await self.browser.close()
-            await self.playwright.stop()
-            return []
-        
+
+    async def stream_wines(self, urls, resume=False):
+        """Scrape urls (any iterable, read lazily), yielding (url, row) as each completes
+
+        With resume, URLs that already succeeded are answered from the journal. The
+        browser is only started once a URL needs it.
+        """
+        source = iterate(urls)
+        resumed = 0
         try:
-            print(f"Starting concurrent scraping of {len(urls)} URLs with max {self.max_concurrent} concurrent requests")
+            # Rows answered by the journal before the first URL that needs a browser
+            first = None
+            async for url in source:
+                record = self.journal.lookup(url) if self.journal and resume else None
+                if record is None:
+                    first = url
+                    break
+                resumed += 1
+                yield url, record
+            if first is None:
+                if resumed:
+                    print(f"Resuming: all {resumed} URLs already completed")
+                return
+            
+            # Setup browser and login
+            await self.setup_browser()
+            if not await self.ensure_logged_in():
+                print("Failed to login. Exiting.")
+                return
+            
+            await self.setup_page_pool()
+            if self.fetch_mode == "api":
+                await self.setup_api_client()
+            
+            if resumed:
+                print(f"Resuming: {resumed} URLs already completed")
+            print(f"Starting concurrent scraping with max {self.max_concurrent} concurrent requests")
             print(f"Rate limit: {self.requests_per_minute} requests per minute")
+            if self.controller.enabled:
+                print(f"Adaptive limits start at {self.controller.concurrency} concurrent, "
+                      f"{self.controller.requests_per_minute:.0f} requests/min")
             
-            # Create tasks for concurrent scraping
-            tasks = [self.scrape_wine_data(url) for url in urls]
+            async def pending():
+                yield first, None
+                async for url in source:
+                    yield url, self.journal.lookup(url) if self.journal and resume else None
             
-            # Execute all tasks concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Results arrive as each URL completes, with at most max_concurrent in flight;
+            # failed URLs are requeued with backoff instead of holding a slot
+            retries = RetryScheduler(max_attempts=self.max_attempts, budget_ratio=self.retry_budget)
             
-            # Filter out exceptions and get valid results
-            wine_data_list = []
-            for i, result in enumerate(results):
+            async def scrape(item, attempt):
+                url, record = item
+                if record is not None:
+                    return record
+                return await self.scrape_wine_data(url)
+            
+            async def on_retry(item, kind, attempt, delay, error):
+                print(f"Retrying {item[0]} in {delay:.1f}s after {kind} (attempt {attempt}/{retries.max_attempts}): {error}")
+            
+            async for (url, record), result in map_with_retries(pending(), scrape, retries, self.max_concurrent,
+                                                                key=lambda item: item[0], on_retry=on_retry,
+                                                                dispatched=lambda item: item[1] is None):
                 if isinstance(result, Exception):
-                    print(f"Exception for URL {urls[i]}: {result}")
-                    wine_data_list.append({
-                        'Wine Name': 'ERROR',
-                        'Producer': '',
-                        'Wine Region': '',
-                        'Color': '',
-                        'Score': '',
-                        'Drink Window': '',
-                        'Reviewed By': '',
-                        'Release Price': '',
-                        'Drink Date': '',
-                        'Tasting Note': '',
-                        'Producer Note': '',
-                        'URL': urls[i],
-                        'Error': str(result)
-                    })
-                else:
-                    wine_data_list.append(result)
+                    print(f"Error scraping {url}: {result}")
+                    error = f"{result} ({result.kind} after {result.attempts} attempts)"
+                    result = empty_row(url)
+                    result.update({'Wine Name': 'ERROR', 'Error': error})
+                if self.journal and record is None:
+                    # Committed as soon as it completes so a crashed run can be resumed
+                    self.journal.record(url, result, name_key='Wine Name')
+                yield url, result
             
-            return wine_data_list
+            print(retries.summary())
             
         finally:
-            await self.browser.close()
-            await self.playwright.stop()
+            await source.aclose()
+            if self.api_client:
+                await self.api_client.close()
+                self.api_client = None
+            if self.resource_profiles:
+                blocked = sum(profile.blocked for profile in self.resource_profiles.values())
+                print(f"Resource blocking: {blocked} requests blocked")
+            if self.browser:
+                await self.browser.close()
+                self.browser = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+
+    async def scrape_all_wines(self, urls, resume=False):
+        """Scrape multiple wine URLs concurrently; returns the rows in input order"""
+        urls = list(urls)
+        if not urls:
+            print("No URLs provided")
+            return []
+        results = {}
+        async for url, wine_data in self.stream_wines(urls, resume):
+            results[url] = wine_data
+        return [results[url] for url in urls if url in results]
 
     def save_to_excel(self, wine_data_list, filename="robert_parker_wines.xlsx"):
         """Save scraped data to Excel file"""
@@ -443,72 +516,46 @@ class RobertParkerScraper:
             return
         
         try:
-            # Create workbook and worksheet
-            wb = openpyxl.Workbook()
-            ws = wb.active
-            ws.title = "Wine Data"
-            
-            # Define headers
-            headers = [
-                'Wine Name', 'Producer', 'Wine Region', 'Color', 'Score', 
-                'Drink Window', 'Reviewed By', 'Release Price', 'Drink Date', 
-                'Tasting Note', 'Producer Note', 'URL'
-            ]
-            
-            # Write headers
-            for col, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col, value=header)
-                cell.font = Font(bold=True)
-            
-            # Write data
-            for row, wine_data in enumerate(wine_data_list, 2):
-                for col, header in enumerate(headers, 1):
-                    ws.cell(row=row, column=col, value=wine_data.get(header, ''))
-            
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
-            
-            # Save file
-            wb.save(filename)
+            # Rows stream through a write-only workbook, widths sized from the first rows
+            writer = open_exporter(filename, "xlsx", HEADERS, dedupe=False)
+            for wine_data in wine_data_list:
+                writer.write(wine_data)
+            writer.close()
             print(f"Data saved to {filename}")
             
         except Exception as e:
             print(f"Error saving to Excel: {e}")
 
-async def main():
+async def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape Robert Parker wine pages (12-column variant).")
+    parser.add_argument('urls', nargs='?', default='-', help="txt, csv or xlsx file of wine URLs (default: one per line from stdin)")
+    parser.add_argument('-c', '--concurrency', type=int, default=5)
+    parser.add_argument('-r', '--rate', type=int, default=30, help="requests per minute")
+    parser.add_argument('--headless', action=argparse.BooleanOptionalAction, default=True)
+    args = parser.parse_args(argv)
+    
     # Configuration
-    email = "david@domaine.com.tw"
-    password = "Dwc123"
+    email = os.environ.get('ROBERT_PARKER_EMAIL')
+    password = os.environ.get('ROBERT_PARKER_PASSWORD')
+    if not email or not password:
+        print("Set ROBERT_PARKER_EMAIL and ROBERT_PARKER_PASSWORD")
+        return
     
     # Performance settings
-    max_concurrent = 5  # Number of concurrent requests
-    requests_per_minute = 30  # Rate limit
-    
-    # Sample URLs - replace with your actual URLs
-    urls = [
-        "https://www.robertparker.com/wines/xiPRuQod7Qy2rC5bv/louis-jadot-chassagne-montrachet-1er-cru-morgeot-maison-louis-jadot-1985"
-    ]
+    max_concurrent = args.concurrency  # Number of concurrent requests
+    requests_per_minute = args.rate  # Rate limit
     
-    # Add more URLs here for testing
-    # urls.extend([
-    #     "https://www.robertparker.com/wines/another-wine-url",
-    #     "https://www.robertparker.com/wines/another-wine-url-2"
-    # ])
+    source = UrlSource.from_lines(sys.stdin) if args.urls == '-' else UrlSource(args.urls)
+    # Read lazily: only the first URL is looked at before scraping starts
+    urls = iter(source)
+    first = next(urls, None)
+    if first is None:
+        print("No URLs provided")
+        return
     
     print("=== Robert Parker Wine Scraper (Concurrent Version) ===")
     print(f"Max concurrent requests: {max_concurrent}")
     print(f"Rate limit: {requests_per_minute} requests per minute")
-    print(f"Total URLs to scrape: {len(urls)}")
     print()
     
     # Create scraper instance
@@ -516,35 +563,43 @@ async def main():
         email=email, 
         password=password,
         max_concurrent=max_concurrent,
-        requests_per_minute=requests_per_minute
+        requests_per_minute=requests_per_minute,
+        headless=args.headless
     )
     
     # Start timing
     start_time = time.time()
     
-    # Scrape all wines
-    wine_data_list = await scraper.scrape_all_wines(urls)
+    # Scrape all wines, writing each row as it completes
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f"robert_parker_wines_{timestamp}.xlsx"
+    writer = open_exporter(filename, "xlsx", HEADERS, dedupe=False)
+    processed = successful = 0
+    try:
+        async for url, wine_data in scraper.stream_wines(itertools.chain([first], urls)):
+            writer.write(wine_data)
+            processed += 1
+            if wine_data.get('Wine Name') != 'ERROR':
+                successful += 1
+    finally:
+        writer.close()
     
     # End timing
     end_time = time.time()
     elapsed_time = end_time - start_time
     
     print(f"\nScraping completed in {elapsed_time:.2f} seconds")
-    print(f"Average time per URL: {elapsed_time/len(urls):.2f} seconds")
-    
-    # Save results
-    if wine_data_list:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"robert_parker_wines_{timestamp}.xlsx"
-        scraper.save_to_excel(wine_data_list, filename)
+    if processed:
+        print(f"Average time per URL: {elapsed_time/processed:.2f} seconds")
         
         # Print summary
-        successful = sum(1 for wine in wine_data_list if wine.get('Wine Name') != 'ERROR')
-        print(f"\nSummary:")
-        print(f"Total URLs processed: {len(urls)}")
+        print("\nSummary:")
+        print(f"Total URLs processed: {processed}")
         print(f"Successful scrapes: {successful}")
-        print(f"Failed scrapes: {len(urls) - successful}")
+        print(f"Failed scrapes: {processed - successful}")
         print(f"Results saved to: {filename}")
+    else:
+        print("No data was scraped")
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(main()) 
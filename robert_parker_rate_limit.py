@@ -0,0 +1,206 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Rounding slack: a refill that lands a hair under one token still grants it
+EPSILON = 1e-9
+
+
+class TokenBucket:
+    """Async token bucket: requests_per_minute steady rate with up to `burst` banked requests"""
+
+    def __init__(self, requests_per_minute, burst=1, clock=time.monotonic, sleep=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.sleep = sleep
+        self.last_refill = clock()
+        # asyncio.Lock wakes waiters in arrival order, so the lock gives FIFO fairness
+        self.lock = asyncio.Lock()
+        self.rate_changed = asyncio.Event()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    async def _wait(self, delay):
+        # Wake early if the rate is changed while we wait
+        self.rate_changed.clear()
+        if not self.sleep:
+            try:
+                await asyncio.wait_for(self.rate_changed.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            return
+        sleeper = asyncio.ensure_future(self.sleep(delay))
+        changed = asyncio.ensure_future(self.rate_changed.wait())
+        try:
+            await asyncio.wait([sleeper, changed], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in (sleeper, changed):
+                task.cancel()
+            await asyncio.gather(sleeper, changed, return_exceptions=True)
+
+    async def acquire(self):
+        """Wait for a token; concurrent callers are served strictly in order"""
+        async with self.lock:
+            while True:
+                self._refill()
+                if self.tokens >= 1 - EPSILON:
+                    self.tokens = max(0.0, self.tokens - 1)
+                    return
+                await self._wait((1 - self.tokens) / self.rate)
+
+    def set_rate(self, requests_per_minute, burst=None):
+        """Change the rate (and optionally burst) while requests are in flight"""
+        self._refill()
+        self.rate = requests_per_minute / 60.0
+        if burst is not None:
+            self.capacity = max(1, burst)
+            self.tokens = min(self.tokens, self.capacity)
+        self.rate_changed.set()
+
+    @property
+    def requests_per_minute(self):
+        return self.rate * 60.0
+
+
+class _FileLock:
+    """Exclusive OS-level lock on an open file (fcntl on POSIX, msvcrt on Windows)
+
+    With blocking=False, entering raises OSError at once if another process holds the lock.
+    """
+
+    def __init__(self, f, blocking=True):
+        self.f = f
+        self.blocking = blocking
+
+    def __enter__(self):
+        if os.name == 'nt':
+            self.f.seek(0)
+            if not self.blocking:
+                msvcrt.locking(self.f.fileno(), msvcrt.LK_NBLCK, 1)
+                return self
+            while True:
+                try:
+                    msvcrt.locking(self.f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+        else:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_EX if self.blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return self
+
+    def __exit__(self, *exc):
+        if os.name == 'nt':
+            self.f.seek(0)
+            msvcrt.locking(self.f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            fcntl.flock(self.f.fileno(), fcntl.LOCK_UN)
+
+
+class FileTokenBucket(TokenBucket):
+    """Token bucket whose state lives in a locked file so several processes share one budget
+
+    Each bucket registers the rate it wants (its process's adaptive controller
+    lowers it on errors) and all of them refill at the lowest rate registered in
+    the last rate_ttl seconds, so one struggling worker slows every worker down
+    and a worker that exited stops counting. acquire() reads the file in a
+    thread and set_rate() never waits for the lock, so a process contending for
+    it does not stall its event loop.
+    """
+
+    def __init__(self, path, requests_per_minute, burst=1, clock=time.time, sleep=None, rate_ttl=60.0):
+        # Wall-clock time by default: the file is shared with other processes
+        super().__init__(requests_per_minute, burst, clock=clock, sleep=sleep)
+        self.path = path
+        self.rate_ttl = rate_ttl
+        self.owner = uuid.uuid4().hex
+        # This bucket's own rate (and burst), written to the file on the next take
+        self.wanted_rate = self.rate
+        self.wanted_capacity = self.capacity
+        with open(path, 'a+', encoding='utf-8') as f:
+            with _FileLock(f):
+                state = self._load(f) or {'capacity': self.capacity, 'tokens': self.tokens,
+                                          'last_refill': self.last_refill}
+                self._register(state, self.clock())
+                self._save(f, state)
+
+    def _load(self, f):
+        f.seek(0)
+        text = f.read().strip()
+        return json.loads(text) if text else None
+
+    def _save(self, f, state):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(state))
+        f.flush()
+
+    def _register(self, state, now):
+        """Record this bucket's wanted rate in state and apply the lowest live one"""
+        rates = state.setdefault('rates', {})
+        rates[self.owner] = [self.wanted_rate, now]
+        for owner, (_, updated) in list(rates.items()):
+            if now - updated > self.rate_ttl:
+                del rates[owner]
+        if self.wanted_capacity != state.get('capacity'):
+            state['capacity'] = self.wanted_capacity
+            state['tokens'] = min(state.get('tokens', 0.0), self.wanted_capacity)
+        self.rate = min(rate for rate, _ in rates.values())
+        self.capacity = state['capacity']
+
+    def _update(self, f, now):
+        """Shared state refilled up to now at the rate in force until now, with this bucket's rate registered"""
+        state = self._load(f) or {'capacity': self.capacity, 'tokens': self.capacity, 'last_refill': now}
+        previous = min((rate for rate, _ in state.get('rates', {}).values()), default=self.rate)
+        state['tokens'] = min(state['capacity'], state['tokens'] + max(0.0, now - state['last_refill']) * previous)
+        state['last_refill'] = now
+        self._register(state, now)
+        return state
+
+    def _take(self):
+        """Take a token from the shared file; returns seconds to wait, or 0 if granted"""
+        with open(self.path, 'r+', encoding='utf-8') as f:
+            with _FileLock(f):
+                now = self.clock()
+                state = self._update(f, now)
+                tokens = min(self.capacity, state['tokens'])
+                wait = 0
+                if tokens >= 1 - EPSILON:
+                    tokens = max(0.0, tokens - 1)
+                else:
+                    wait = (1 - tokens) / self.rate
+                state['tokens'] = tokens
+                self._save(f, state)
+                return wait
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                wait = await asyncio.to_thread(self._take)
+                if not wait:
+                    return
+                await self._wait(wait)
+
+    def set_rate(self, requests_per_minute, burst=None):
+        """Change this process's wanted rate; if the file is busy it is written on the next acquire()"""
+        self.wanted_rate = requests_per_minute / 60.0
+        if burst is not None:
+            self.wanted_capacity = max(1, burst)
+        try:
+            with open(self.path, 'r+', encoding='utf-8') as f:
+                with _FileLock(f, blocking=False):
+                    self._save(f, self._update(f, self.clock()))
+        except OSError:
+            pass
+        self.rate_changed.set()
@@ -0,0 +1,102 @@
+import json
+import os
+from urllib.parse import urlparse
+
+# Analytics, advertising and consent hosts that never carry wine data
+BLOCKED_DOMAINS = [
+    'google-analytics.com', 'googletagmanager.com', 'doubleclick.net', 'googlesyndication.com',
+    'googleadservices.com', 'adservice.google.com', 'facebook.net', 'facebook.com', 'hotjar.com',
+    'segment.io', 'segment.com', 'newrelic.com', 'nr-data.net', 'clarity.ms', 'bat.bing.com',
+    'linkedin.com', 'licdn.com', 'twitter.com', 'ads-twitter.com', 'tiktok.com', 'pinterest.com',
+    'quantserve.com', 'scorecardresearch.com', 'taboola.com', 'outbrain.com', 'criteo.com',
+    'intercom.io', 'fullstory.com', 'sentry.io', 'privacy-center.org', 'didomi.io'
+]
+
+# Didomi serves its consent banner from these; the login page still needs them
+CONSENT_DOMAINS = ['privacy-center.org', 'didomi.io']
+
+FIRST_PARTY_DOMAINS = ['robertparker.com']
+
+
+def host_matches(host, domains):
+    """True if host is one of domains or a subdomain of one"""
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+class ResourceProfile:
+    """Which requests a page of one type may make; everything else is aborted in page.route"""
+
+    def __init__(self, name, block_types=(), blocked_domains=BLOCKED_DOMAINS, allow_domains=(),
+                 first_party_only=False, first_party_domains=FIRST_PARTY_DOMAINS):
+        self.name = name
+        self.block_types = set(block_types)
+        self.blocked_domains = list(blocked_domains)
+        # Allowed domains win over both the type and the domain rules
+        self.allow_domains = list(allow_domains)
+        self.first_party_only = first_party_only
+        self.first_party_domains = list(first_party_domains)
+        self.blocked = 0
+        self.allowed = 0
+
+    def should_block(self, url, resource_type):
+        host = (urlparse(url).hostname or '').lower()
+        if not host or host_matches(host, self.allow_domains):
+            return False
+        if resource_type in self.block_types:
+            return True
+        if host_matches(host, self.blocked_domains):
+            return True
+        return self.first_party_only and not host_matches(host, self.first_party_domains)
+
+    async def handle(self, route):
+        """page.route handler"""
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked += 1
+            await route.abort("blockedbyclient")
+        else:
+            self.allowed += 1
+            await route.continue_()
+
+    @classmethod
+    def from_json(cls, name, data):
+        return cls(
+            name,
+            block_types=data.get('block_types', ()),
+            blocked_domains=data.get('blocked_domains', BLOCKED_DOMAINS),
+            allow_domains=data.get('allow_domains', ()),
+            first_party_only=data.get('first_party_only', False),
+            first_party_domains=data.get('first_party_domains', FIRST_PARTY_DOMAINS)
+        )
+
+
+def default_profiles():
+    """Lean profiles: wine pages only need the document, styles, scripts and their XHR/fetch data
+
+    Stylesheets stay on: the popup check in robert_parker_waits tests computed
+    visibility, and without CSS hidden close buttons and off-screen modals look visible.
+    """
+    return {
+        'login': ResourceProfile('login', block_types={'image', 'media', 'font'}, allow_domains=CONSENT_DOMAINS),
+        'wine': ResourceProfile('wine', block_types={'image', 'media', 'font', 'texttrack', 'manifest'}),
+    }
+
+
+def load_profiles(path=None):
+    """Default profiles, with any page types defined in the JSON file at `path` replacing them"""
+    profiles = default_profiles()
+    if path and os.path.exists(path):
+        try:
+            with open(path, encoding='utf-8') as f:
+                for name, data in json.load(f).items():
+                    profiles[name] = ResourceProfile.from_json(name, data)
+        except Exception as e:
+            print(f"Could not read resource profile file {path}: {e}")
+    return profiles
+
+
+async def apply_profile(page, profile):
+    """Route every request from page through profile (None removes the routing)"""
+    await page.unroute("**/*")
+    if profile:
+        await page.route("**/*", profile.handle)
@@ -0,0 +1,199 @@
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import Counter
+from robert_parker_pipeline import map_stage
+
+# Failure kinds, from classify_error
+NAVIGATION_TIMEOUT = 'navigation_timeout'
+FRAME_DETACHED = 'frame_detached'
+EXTRACTION_MISS = 'extraction_miss'
+AUTH_LOST = 'auth_lost'
+THROTTLED = 'throttled'
+NOT_FOUND = 'not_found'
+OTHER = 'other'
+
+RETRYABLE = {NAVIGATION_TIMEOUT, FRAME_DETACHED, EXTRACTION_MISS, AUTH_LOST, THROTTLED, OTHER}
+# Backoff multipliers: a throttled server gets longer to recover, a re-login is retried soon
+DELAY_FACTORS = {THROTTLED: 2.0, AUTH_LOST: 0.5}
+
+_RETRYING = object()
+
+
+class ScrapeError(Exception):
+    """A failed attempt at one URL, tagged with its failure kind"""
+
+    def __init__(self, kind, message, attempts=None):
+        super().__init__(message)
+        self.kind = kind
+        self.attempts = attempts
+
+
+def classify_error(error):
+    """Failure kind of an exception raised while scraping one URL"""
+    if isinstance(error, ScrapeError):
+        return error.kind
+    text = str(error).lower()
+    if "frame was detached" in text or "target closed" in text or "has been closed" in text:
+        return FRAME_DETACHED
+    if "timeout" in text or "net::err_aborted" in text or isinstance(error, asyncio.TimeoutError):
+        return NAVIGATION_TIMEOUT
+    return OTHER
+
+
+class RetryScheduler:
+    """Delayed requeue of failed URLs with exponential backoff, jitter and a global retry budget
+
+    A failed attempt is not retried in place: its slot and tab are released and the
+    item waits here until its backoff has passed, while other URLs keep moving.
+    Retries are capped per URL (max_attempts) and across the run: at most
+    min_budget + budget_ratio x URLs dispatched, so a failing site cannot double the run.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=2.0, max_delay=60.0, jitter=0.5, budget_ratio=0.2,
+                 min_budget=10, clock=time.monotonic, rng=random.random):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.budget_ratio = budget_ratio
+        self.min_budget = min_budget
+        self.clock = clock
+        self.rng = rng
+        self.delayed = []  # heap of (due, seq, item)
+        self.sequence = itertools.count()
+        self.attempts = {}  # attempts made so far, only for keys that have failed
+        self.outstanding = 0  # items started and not yet finished, including delayed ones
+        self.started_count = 0
+        self.retries = 0
+        self.over_budget = 0
+        self.failures = Counter()
+        self.wakeup = asyncio.Event()
+
+    def started(self, dispatched=True):
+        """An item entered the pipeline; only dispatched ones (not e.g. answered from a journal) grow the budget"""
+        self.outstanding += 1
+        if dispatched:
+            self.started_count += 1
+
+    def finished(self, key):
+        self.outstanding -= 1
+        self.attempts.pop(key, None)
+        self.wakeup.set()
+
+    def next_attempt(self, key):
+        return self.attempts.get(key, 0) + 1
+
+    def budget_left(self):
+        return self.min_budget + self.budget_ratio * self.started_count - self.retries
+
+    def backoff(self, attempt, kind=OTHER):
+        """Exponential delay for the given failed attempt, spread by +/- jitter"""
+        delay = min(self.max_delay, self.base_delay * DELAY_FACTORS.get(kind, 1.0) * 2 ** (attempt - 1))
+        return delay * (1 - self.jitter + 2 * self.jitter * self.rng())
+
+    def schedule(self, item, key, kind, attempt):
+        """Requeue item after a failed attempt; returns the delay, or None if it gets no more retries"""
+        self.failures[kind] += 1
+        if kind not in RETRYABLE or attempt >= self.max_attempts:
+            return None
+        if self.budget_left() < 1:
+            self.over_budget += 1
+            return None
+        self.retries += 1
+        self.attempts[key] = attempt
+        delay = self.backoff(attempt, kind)
+        heapq.heappush(self.delayed, (self.clock() + delay, next(self.sequence), item))
+        self.wakeup.set()
+        return delay
+
+    def due(self, flush=False):
+        """Delayed items whose backoff has passed (all of them with flush)"""
+        now = self.clock()
+        items = []
+        while self.delayed and (flush or self.delayed[0][0] <= now):
+            items.append(heapq.heappop(self.delayed)[2])
+        return items
+
+    async def next_due(self, stop_flag=None):
+        """Wait for the next delayed item; None once nothing is delayed or in flight"""
+        while True:
+            self.wakeup.clear()
+            stopping = bool(stop_flag and stop_flag())
+            if self.delayed:
+                wait = self.delayed[0][0] - self.clock()
+                if wait <= 0 or stopping:
+                    return heapq.heappop(self.delayed)[2]
+            elif self.outstanding <= 0:
+                return None
+            else:
+                wait = None
+            if stop_flag:
+                # Poll so a stop request flushes the queue instead of sitting out the backoff
+                wait = 1.0 if wait is None else min(wait, 1.0)
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self):
+        kinds = ', '.join(f"{count} {kind}" for kind, count in self.failures.most_common())
+        text = f"Retries: {self.retries} scheduled"
+        if kinds:
+            text += f" for {sum(self.failures.values())} failed attempts ({kinds})"
+        if self.over_budget:
+            text += f", {self.over_budget} refused by the retry budget"
+        return text
+
+
+async def map_with_retries(source, func, scheduler, workers=1, key=lambda item: item, stop_flag=None, on_retry=None,
+                           dispatched=lambda item: True):
+    """map_stage where failed calls go back on the scheduler instead of retrying in place
+
+    func(item, attempt) is awaited with the 1-based attempt number. Yields
+    (item, result) once per item: the result, or a ScrapeError carrying the kind and
+    attempt count of the last failure. on_retry(item, kind, attempt, delay, error)
+    is awaited when an item is requeued. Only items for which dispatched(item) is
+    true count towards the retry budget.
+    """
+
+    async def feed():
+        async for item in source:
+            # Retries that have come due go ahead of new items
+            for retry in scheduler.due(flush=bool(stop_flag and stop_flag())):
+                yield retry
+            scheduler.started(dispatched(item))
+            yield item
+        while True:
+            retry = await scheduler.next_due(stop_flag)
+            if retry is None:
+                return
+            yield retry
+
+    async def attempt(item):
+        number = scheduler.next_attempt(key(item))
+        try:
+            return await func(item, number)
+        except Exception as e:
+            kind = classify_error(e)
+            stopped = stop_flag and stop_flag()
+            delay = None if stopped else scheduler.schedule(item, key(item), kind, number)
+            if delay is None:
+                if isinstance(e, ScrapeError):
+                    e.attempts = number
+                    return e
+                return ScrapeError(kind, str(e), number)
+            if on_retry:
+                try:
+                    await on_retry(item, kind, number, delay, e)
+                except Exception as hook_error:
+                    print(f"Retry hook failed: {hook_error}")
+            return _RETRYING
+
+    async for item, result in map_stage(feed(), attempt, workers=workers):
+        if result is _RETRYING:
+            continue
+        scheduler.finished(key(item))
+        yield item, result
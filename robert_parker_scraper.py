@@ -0,0 +1,937 @@
+import asyncio
+import json
+from collections import Counter
+import os
+import time
+from playwright.async_api import async_playwright
+from robert_parker_page_pool import PagePool
+from robert_parker_rate_limit import FileTokenBucket, TokenBucket
+from robert_parker_adaptive import AdaptiveController
+from robert_parker_resources import apply_profile, load_profiles
+from robert_parker_session import SessionStore
+from robert_parker_waits import (
+    CONSENT_SELECTORS, EMAIL_INPUT_SELECTORS, LOGGED_IN_SELECTORS, LOGIN_BUTTON_SELECTORS,
+    LOGIN_ERROR_SELECTORS, LOGIN_ERROR_WAIT_SELECTORS, LOGIN_FALLBACK_SUCCESS_SELECTORS,
+    PASSWORD_INPUT_SELECTORS, SUBMIT_BUTTON_SELECTORS, dismiss_popups, wait_for_any
+)
+from robert_parker_fields import (
+    NAME_SELECTORS, REVIEW_ANCHOR_SELECTORS, WINE_FIELDS, add_name_fields, apply_post_processors,
+    compile_extraction_script, empty_wine_data, extract_raw_fields, wait_for_anchor
+)
+from robert_parker_offline import HtmlExtractor, archive_html
+from robert_parker_api import ApiFieldMap, WineApiClient
+from robert_parker_cache import ResponseCache
+from robert_parker_journal import RunJournal
+from robert_parker_export import open_exporter
+from robert_parker_pipeline import is_error_row, iterate
+from robert_parker_retry import AUTH_LOST, EXTRACTION_MISS, NOT_FOUND, OTHER, THROTTLED, RetryScheduler, ScrapeError, map_with_retries
+from robert_parker_urls import is_login_redirect
+from robert_parker_metrics import RunMetrics
+from robert_parker_normalize import strip_values
+from robert_parker_record import ERROR, OK, STOPPED, WineRecord
+from robert_parker_dedup import DEFAULT_DEDUP_FILE, UNCHANGED, DedupIndex
+from robert_parker_selectors import SelectorStats
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+HOME_URL = "https://www.robertparker.com/"
+
+class RobertParkerScraper:
+    def __init__(self, email, password, max_concurrent=5, requests_per_minute=30,
+                 extraction_mode="browser", html_archive_dir=None, extraction_workers=None,
+                 fetch_mode="browser", cache_dir=None, cache_ttl_hours=24, cache_max_mb=500,
+                 journal_file="robert_parker_journal.db", burst=1, rate_limit_file=None, adaptive=True,
+                 block_resources=True, resource_profile_file=None, session_file="robert_parker_session.json",
+                 user_data_dir=None, headless=False, metrics_file=None, home_url=HOME_URL,
+                 max_attempts=3, retry_budget=0.2, selector_stats_file="robert_parker_selector_stats.json",
+                 incremental=None, dedup_file=DEFAULT_DEDUP_FILE, dedup_run=None, on_login=None):
+        self.email = email
+        self.password = password
+        # Where login and the session check start; the benchmark points this at its mock site
+        self.home_url = home_url
+        # Cookies saved after a successful login; later runs (and workers) reuse them
+        # and only log in again when the saved session no longer works
+        self.session_store = SessionStore(session_file) if session_file else None
+        # Called once the browser is logged in; sharded runs use it to let the other workers start
+        self.on_login = on_login
+        # Browser profile directory; sharded workers each get their own copy
+        self.user_data_dir = user_data_dir or os.path.join(os.getcwd(), "browser_data")
+        self.headless = headless
+        self.playwright = None
+        self.browser = None
+        self.max_concurrent = max_concurrent
+        self.requests_per_minute = requests_per_minute
+        # Concurrency and rate start below the configured values and follow the
+        # server's responses (AIMD); with adaptive=False they stay fixed
+        self.controller = AdaptiveController(max_concurrent, requests_per_minute, enabled=adaptive,
+                                             on_change=self.on_limits_changed)
+        # page.route profiles per page type ('login', 'wine') that abort images, fonts,
+        # trackers and other requests extraction never reads; None loads everything
+        self.resource_profiles = load_profiles(resource_profile_file) if block_resources else None
+        # One token bucket shared by every tab (and, with rate_limit_file, every process)
+        if rate_limit_file:
+            self.rate_limiter = FileTokenBucket(rate_limit_file, self.controller.requests_per_minute, burst)
+        else:
+            self.rate_limiter = TokenBucket(self.controller.requests_per_minute, burst)
+        # "browser" extracts in the page; "offline" only captures page.content()
+        # and parses it with lxml in a process pool
+        self.extraction_mode = extraction_mode
+        self.html_archive_dir = html_archive_dir
+        self.extraction_workers = extraction_workers
+        self.html_extractor = None
+        # "api" learns the site's JSON endpoints from browser loads, then fetches
+        # wines over HTTP and only falls back to the browser when that fails
+        self.fetch_mode = fetch_mode
+        self.api_field_map = None
+        self.api_client = None
+        # Pages scraped on earlier runs are served from here until their TTL runs out
+        self.response_cache = ResponseCache(
+            cache_dir, cache_ttl_hours, cache_max_mb, schema="wine", required=("Full_Wine_Name",)
+        ) if cache_dir else None
+        # Every result is committed here as it completes so long runs can be resumed
+        self.journal = RunJournal(journal_file) if journal_file else None
+        self.result_writer = None
+        # Timing spans per URL and stage; with metrics_file they are also appended there
+        # as JSONL and the run's percentiles are written next to it in Prometheus format
+        self.metrics_file = metrics_file
+        self.metrics = RunMetrics(metrics_file)
+        # Set once the consent banner has been dealt with; later pages skip waiting for it
+        self.consent_handled = False
+        # Failed URLs are requeued with backoff, up to max_attempts each and, across
+        # the run, 10 + retry_budget x URLs retries in total
+        self.max_attempts = max_attempts
+        self.retry_budget = retry_budget
+        self.retries = None
+        self.login_lock = None
+        # Which fallback selector matched each field, saved across runs; the cascades
+        # are reordered so the usual winner is tried first and dead selectors dropped
+        self.selector_stats = SelectorStats(selector_stats_file) if selector_stats_file else None
+        self.field_specs = WINE_FIELDS
+        self.fields_script = None
+        # Incremental runs keep a hash of every exported wine's fields across runs:
+        # "changed" scrapes every URL but only exports new or changed wines, "new"
+        # also skips URLs whose wine is already in the index. Exported wines are
+        # staged under dedup_run and published by the caller's staged_exports()
+        # block once the export file is saved; without a dedup_run they are
+        # published when a run finishes without an error
+        if incremental and not dedup_file:
+            raise ValueError(f"Incremental mode {incremental!r} needs a dedup_file")
+        self.incremental = incremental
+        self.dedup_file = dedup_file
+        self.dedup_run = dedup_run
+        self.dedup_index = None
+        self.dedup_counts = Counter()
+        # Rows of the last run answered from the journal instead of scraped
+        self.resumed = 0
+        self.last_login = 0.0
+        
+    async def rate_limit(self):
+        """Ensure we don't exceed the rate limit"""
+        await self.rate_limiter.acquire()
+
+    def set_requests_per_minute(self, requests_per_minute):
+        """Change the rate limit while a run is in progress"""
+        self.requests_per_minute = requests_per_minute
+        self.controller.set_max_rate(requests_per_minute)
+
+    def on_limits_changed(self, concurrency, requests_per_minute):
+        """Controller callback: the token bucket follows the current rate"""
+        self.rate_limiter.set_rate(requests_per_minute)
+
+    async def setup_browser(self):
+        """Set up Playwright browser with persistent context and improved configuration"""
+        self.playwright = await async_playwright().start()
+        
+        # Use persistent context for better performance and cookie management
+        self.browser = await self.playwright.chromium.launch_persistent_context(
+            user_data_dir=self.user_data_dir,
+            headless=self.headless,
+            args=[
+                '--no-sandbox',
+                '--disable-dev-shm-usage',
+                '--disable-gpu',
+                '--disable-web-security',
+                '--disable-features=VizDisplayCompositor',
+                '--disable-background-timer-throttling',
+                '--disable-backgrounding-occluded-windows',
+                '--disable-renderer-backgrounding',
+                '--disable-ipc-flooding-protection',
+                '--disable-default-apps',
+                '--disable-extensions',
+                '--disable-plugins',
+                '--disable-sync',
+                '--disable-translate',
+                '--no-first-run',
+                '--no-default-browser-check',
+                '--disable-background-networking',
+                '--disable-component-extensions-with-background-pages',
+                '--disable-client-side-phishing-detection',
+                '--disable-hang-monitor',
+                '--disable-prompt-on-repost',
+                '--disable-domain-reliability',
+                '--disable-features=TranslateUI',
+                '--disable-print-preview',
+                '--disable-save-password-bubble',
+                '--disable-single-click-autofill',
+                '--disable-spellcheck-api',
+                '--disable-threaded-animation',
+                '--disable-threaded-scrolling',
+                '--disable-web-resources',
+                '--disable-web-security',
+                '--disable-xss-auditor',
+                '--no-zygote',
+                '--memory-pressure-off',
+                '--max_old_space_size=4096'
+            ],
+            ignore_default_args=['--enable-automation'],
+            viewport={'width': 1920, 'height': 1080},
+            user_agent=USER_AGENT
+        )
+        
+        self.page = self.browser.pages[0] if self.browser.pages else await self.browser.new_page()
+        await self.configure_page(self.page)
+        await self.apply_resource_profile(self.page, 'login')
+
+    async def configure_page(self, page):
+        """Apply headers and timeouts to a page opened on the shared context"""
+        # Set additional page configurations
+        await page.set_extra_http_headers({
+            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+            'Accept-Language': 'en-US,en;q=0.5',
+            'Accept-Encoding': 'gzip, deflate, br',
+            'Connection': 'keep-alive',
+            'Upgrade-Insecure-Requests': '1',
+        })
+        
+        # Set longer timeouts
+        page.set_default_timeout(30000)
+        page.set_default_navigation_timeout(30000)
+        await self.apply_resource_profile(page, 'wine')
+
+    async def apply_resource_profile(self, page, page_type):
+        """Block the requests a page of this type does not need"""
+        if self.resource_profiles:
+            await apply_profile(page, self.resource_profiles.get(page_type))
+
+    async def setup_page_pool(self):
+        """Open one tab per concurrent slot on the logged-in context"""
+        await self.apply_resource_profile(self.page, 'wine')
+        self.page_pool = PagePool(self.browser, self.max_concurrent, self.configure_page, pages=[self.page])
+        await self.page_pool.start()
+
+    async def setup_api_client(self):
+        """Start recording XHR endpoints and open the HTTP client used once they are learned"""
+        self.api_field_map = ApiFieldMap([spec.name for spec in WINE_FIELDS], required=('Full_Wine_Name',))
+        if not self.api_field_map.ready:
+            self.browser.on("response", self.api_field_map.on_response)
+        self.api_client = WineApiClient(
+            self.api_field_map,
+            await self.browser.cookies(),
+            user_agent=USER_AGENT,
+            max_connections=self.max_concurrent
+        )
+        await self.api_client.start()
+        if self.api_field_map.ready:
+            print(f"Using saved API endpoints from {self.api_field_map.map_file}")
+
+    async def fetch_api_fields(self, url):
+        """Raw fields of one wine from the learned JSON endpoints, or None if the fetch failed"""
+        fetch_start = time.monotonic()
+        try:
+            raw_fields = await self.api_client.fetch_raw_fields(url)
+        except Exception as e:
+            self.controller.record(status=getattr(e, 'status', None), error=e)
+            print(f"API fetch failed for {url}, falling back to browser: {e}")
+            return None
+        self.controller.record(time.monotonic() - fetch_start)
+        return raw_fields
+
+    async def scrape_wine_api(self, url, progress_callback=None):
+        """Fetch one wine from the learned JSON endpoints; None means use the browser"""
+        fetch_start = time.monotonic()
+        try:
+            raw_fields, payloads = await self.api_client.fetch_raw_fields(url, return_payloads=True)
+            self.controller.record(time.monotonic() - fetch_start)
+            wine_data = empty_wine_data(url)
+            wine_data.update(apply_post_processors(WINE_FIELDS, raw_fields))
+            if wine_data['Full_Wine_Name'] is None:
+                print(f"API response for {url} has no wine name, falling back to browser")
+                return None
+            add_name_fields(wine_data)
+        except Exception as e:
+            self.controller.record(status=getattr(e, 'status', None), error=e)
+            print(f"API fetch failed for {url}, falling back to browser: {e}")
+            return None
+        
+        # Clean up data (remove extra whitespace)
+        strip_values(wine_data)
+        
+        if self.response_cache:
+            self.cache_wine_data(url, wine_data, json.dumps(payloads, ensure_ascii=False), content_type="application/json")
+        
+        print(f"Successfully scraped: {wine_data['Full_Wine_Name']}")
+        if progress_callback:
+            progress_callback(f"Successfully scraped: {wine_data['Full_Wine_Name']}")
+        return wine_data
+
+    async def handle_popups(self, page=None, consent_timeout=3000):
+        """Dismiss the consent banner and any open popups in one round trip"""
+        page = page or self.page
+        try:
+            # Until consent has been handled this session, give the banner a moment to appear
+            consent = not self.consent_handled
+            if consent and not await wait_for_any(page, CONSENT_SELECTORS, timeout=consent_timeout):
+                consent = False
+            result = await dismiss_popups(page, consent=consent)
+            if result['consent']:
+                print(f"Cookie consent popup handled with {result['consent']}")
+            for closed in result['closed']:
+                print(f"Closed popup with {closed}")
+            self.consent_handled = True
+        except Exception as e:
+            print(f"Popup handling error: {e}")
+            # Continue anyway, don't let popup handling stop the process
+
+    async def ensure_logged_in(self):
+        """Reuse the saved session if it still works, otherwise log in and save the new one"""
+        if self.session_store and await self.session_store.restore(self.browser):
+            if await self.session_is_valid():
+                print("Reusing saved login session")
+                return True
+            print("Saved login session is no longer valid, logging in again")
+        if not await self.login():
+            return False
+        self.last_login = time.monotonic()
+        if self.session_store:
+            try:
+                await self.session_store.save(self.browser)
+            except Exception as e:
+                print(f"Could not save login session: {e}")
+        return True
+
+    async def session_is_valid(self):
+        """One lean homepage load: logged in if the user menu renders"""
+        try:
+            await self.page.goto(self.home_url, wait_until='domcontentloaded', timeout=15000)
+        except Exception as e:
+            print(f"Session check failed: {e}")
+            return False
+        return await wait_for_any(self.page, LOGGED_IN_SELECTORS, timeout=8000) is not None
+
+    async def login(self):
+        """Login to Robert Parker website with improved error handling and retry logic"""
+        max_retries = 3
+        retry_count = 0
+        
+        while retry_count < max_retries:
+            try:
+                print(f"Starting login process (attempt {retry_count + 1}/{max_retries})...")
+                
+                # Navigate to the homepage with better error handling
+                try:
+                    print("Navigating to homepage...")
+                    await self.page.goto(self.home_url, 
+                                       wait_until='domcontentloaded', 
+                                       timeout=30000)
+                    print("Homepage loaded successfully")
+                except Exception as nav_error:
+                    print(f"Navigation error: {nav_error}")
+                    if "net::ERR_ABORTED" in str(nav_error) or "frame was detached" in str(nav_error):
+                        print("Network error detected, retrying...")
+                        retry_count += 1
+                        await asyncio.sleep(2)
+                        continue
+                    else:
+                        raise nav_error
+                
+                # Wait until the header shows either the user menu, the login button or the consent banner
+                ready = await wait_for_any(self.page, LOGGED_IN_SELECTORS + LOGIN_BUTTON_SELECTORS + CONSENT_SELECTORS, timeout=15000)
+                if not ready:
+                    print("Header did not render, continuing anyway...")
+                
+                # Handle popups
+                await self.handle_popups()
+                
+                # Check if already logged in by looking for logout button or user menu
+                if await self.page.query_selector(", ".join(LOGGED_IN_SELECTORS)):
+                    print("Already logged in!")
+                    return True
+                
+                print("Not logged in, attempting to login...")
+                
+                # Try multiple login button selectors with better error handling
+                login_button = None
+                selector = await wait_for_any(self.page, LOGIN_BUTTON_SELECTORS, timeout=5000)
+                if selector:
+                    login_button = await self.page.query_selector(selector)
+                    print(f"Found login button with selector: {selector}")
+                
+                if login_button:
+                    print("Clicking login button...")
+                    try:
+                        await login_button.click()
+                    except Exception as click_error:
+                        print(f"Error clicking login button: {click_error}")
+                        retry_count += 1
+                        await asyncio.sleep(2)
+                        continue
+                    
+                    # Wait for any of the login form's email inputs to appear
+                    selector = await wait_for_any(self.page, EMAIL_INPUT_SELECTORS, timeout=10000)
+                    if selector:
+                        print(f"Login form appeared with selector: {selector}")
+                    else:
+                        print("Login form did not appear, trying alternative approach...")
+                    
+                    # Fill in login form with multiple selector attempts
+                    email_input = await self.first_visible(EMAIL_INPUT_SELECTORS, "email input")
+                    password_input = await self.first_visible(PASSWORD_INPUT_SELECTORS, "password input")
+                    submit_button = await self.first_visible(SUBMIT_BUTTON_SELECTORS, "submit button")
+                    
+                    if email_input and password_input and submit_button:
+                        print("Filling login form...")
+                        try:
+                            await email_input.fill(self.email)
+                            await password_input.fill(self.password)
+                            
+                            print("Submitting login form...")
+                            await submit_button.click()
+                            
+                            # Wait for the user menu (success) or an error message, whichever shows first
+                            outcome = await wait_for_any(self.page, LOGGED_IN_SELECTORS + LOGIN_ERROR_WAIT_SELECTORS, timeout=15000)
+                            if outcome in LOGGED_IN_SELECTORS or await self.page.query_selector(
+                                    ", ".join(LOGGED_IN_SELECTORS + LOGIN_FALLBACK_SUCCESS_SELECTORS)):
+                                print("Login successful!")
+                                return True
+                            
+                            # Check for error messages
+                            for error_selector in LOGIN_ERROR_SELECTORS:
+                                try:
+                                    error_element = await self.page.query_selector(error_selector)
+                                    if error_element:
+                                        error_text = await error_element.text_content()
+                                        print(f"Login error message: {error_text}")
+                                except:
+                                    continue
+                            
+                            print("Login failed - could not find success indicators")
+                            retry_count += 1
+                            await asyncio.sleep(2)
+                            continue
+                            
+                        except Exception as form_error:
+                            print(f"Error filling login form: {form_error}")
+                            retry_count += 1
+                            await asyncio.sleep(2)
+                            continue
+                    else:
+                        print("Could not find login form elements:")
+                        print(f"  Email input: {'Found' if email_input else 'Not found'}")
+                        print(f"  Password input: {'Found' if password_input else 'Not found'}")
+                        print(f"  Submit button: {'Found' if submit_button else 'Not found'}")
+                        retry_count += 1
+                        await asyncio.sleep(2)
+                        continue
+                else:
+                    print("Could not find login button with any selector")
+                    retry_count += 1
+                    await asyncio.sleep(2)
+                    continue
+                    
+            except Exception as e:
+                print(f"Login error (attempt {retry_count + 1}): {e}")
+                retry_count += 1
+                if retry_count < max_retries:
+                    print("Retrying in 2 seconds...")
+                    await asyncio.sleep(2)
+                else:
+                    print("Max retries reached, login failed")
+                    return False
+        
+        print("Login failed after all retry attempts")
+        return False
+
+    async def first_visible(self, selectors, label):
+        """First visible element matching one of selectors on the main page, or None"""
+        for selector in selectors:
+            try:
+                element = await self.page.query_selector(selector)
+                if element and await element.is_visible():
+                    print(f"Found {label} with selector: {selector}")
+                    return element
+            except:
+                continue
+        return None
+
+    def cached_wine_data(self, url, progress_callback=None):
+        """Return the cached record if it is younger than the cache TTL"""
+        entry = self.response_cache.get(url)
+        if not entry:
+            return None
+        wine_data = entry['record']
+        print(f"Successfully scraped: {wine_data['Full_Wine_Name']} (cached)")
+        if progress_callback:
+            progress_callback(f"Successfully scraped: {wine_data['Full_Wine_Name']} (cached)")
+        return wine_data
+
+    def cache_wine_data(self, url, wine_data, body, content_type="text/html"):
+        """Store a scraped record with its raw body"""
+        try:
+            self.response_cache.put(url, wine_data, body, content_type)
+        except Exception as e:
+            print(f"Could not cache {url}: {e}")
+
+    async def scrape_wine_data(self, url, progress_callback=None, stop_flag=None, attempt=1):
+        """One attempt at a single URL; a failure raises for the retry scheduler to classify"""
+        metrics = self.metrics
+        if self.response_cache:
+            with metrics.span(url, 'cache_lookup'):
+                wine_data = self.cached_wine_data(url, progress_callback)
+            if wine_data:
+                return wine_data
+        
+        wait_start = time.perf_counter()
+        async with self.controller.slot():  # Limit concurrent requests
+            metrics.record(url, 'slot_wait', time.perf_counter() - wait_start)
+            with metrics.span(url, 'rate_limit_wait'):
+                await self.rate_limit()  # Rate limiting
+            
+            api_fields = None
+            if self.api_client and self.api_field_map.ready:
+                with metrics.span(url, 'api_fetch'):
+                    if self.api_field_map.dom_fields():
+                        # Only some fields have endpoints; the page supplies the rest below
+                        api_fields = await self.fetch_api_fields(url)
+                    else:
+                        wine_data = await self.scrape_wine_api(url, progress_callback)
+                        if wine_data:
+                            return wine_data
+            
+            wait_start = time.perf_counter()
+            async with self.page_pool.page() as page:  # Each task drives its own tab
+                metrics.record(url, 'page_wait', time.perf_counter() - wait_start)
+                if stop_flag and stop_flag():
+                    if progress_callback:
+                        progress_callback(f"Scraping stopped by user during: {url}")
+                    return WineRecord.failed(url, 'Scraping stopped by user', STOPPED)
+                
+                max_attempts = self.max_attempts
+                print(f"Scraping: {url} (attempt {attempt}/{max_attempts})")
+                if progress_callback:
+                    progress_callback(f"Scraping: {url} (attempt {attempt}/{max_attempts})")
+                
+                # Navigate to the wine page; failures are retried later by the scheduler, not here
+                nav_start = time.monotonic()
+                try:
+                    response = await page.goto(url, wait_until='domcontentloaded', timeout=30000)
+                except Exception as nav_error:
+                    self.controller.record(error=nav_error)
+                    metrics.record(url, 'navigation_failed', time.monotonic() - nav_start)
+                    print(f"Navigation error for {url}: {nav_error}")
+                    raise
+                nav_time = time.monotonic() - nav_start
+                status = response.status if response else None
+                self.controller.record(nav_time, status)
+                metrics.record(url, 'navigation', nav_time)
+                
+                # Fail fast on responses that will not have the wine on them
+                if status in (401, 403) or is_login_redirect(url, page.url):
+                    raise ScrapeError(AUTH_LOST, f"Session lost (HTTP {status}, at {page.url})")
+                if status in (404, 410):
+                    raise ScrapeError(NOT_FOUND, f"HTTP {status}")
+                if status is not None and (status == 429 or status >= 500):
+                    raise ScrapeError(THROTTLED, f"HTTP {status}")
+                print(f"Successfully navigated to {url}")
+                
+                # Wait for the elements we extract instead of for the network to go idle
+                with metrics.span(url, 'anchor_wait'):
+                    if await wait_for_anchor(page, NAME_SELECTORS, timeout=15000):
+                        await wait_for_anchor(page, REVIEW_ANCHOR_SELECTORS, timeout=3000)
+                    else:
+                        print("Wine name did not render, continuing anyway...")
+                
+                # Handle popups
+                with metrics.span(url, 'popups'):
+                    await self.handle_popups(page)
+                
+                # Initialize wine data dictionary
+                wine_data = empty_wine_data(url)
+                page_html = None
+                
+                # Extract every field (with all fallbacks) in one round trip to the page
+                extract_start = time.perf_counter()
+                try:
+                    if self.html_extractor:
+                        # Offline mode: hand the rendered DOM to the worker pool
+                        page_html = await page.content()
+                        if self.html_archive_dir:
+                            archive_html(self.html_archive_dir, url, page_html)
+                        wine_data = await self.html_extractor.extract(page_html, url)
+                    else:
+                        # Held locally: drift can swap in new cascades while this page is evaluated
+                        specs, script = self.field_specs, self.fields_script
+                        page_specs = specs
+                        if api_fields:
+                            page_specs = [spec for spec in specs if spec.name not in self.api_field_map.fields]
+                            script = compile_extraction_script(page_specs)
+                        raw_fields = await extract_raw_fields(page, page_specs, script)
+                        metrics.record_fields(url, raw_fields)
+                        if self.selector_stats:
+                            self.record_selectors(page_specs, raw_fields, progress_callback)
+                        if api_fields:
+                            raw_fields = dict(api_fields, **raw_fields)
+                        if self.api_field_map and not self.api_field_map.ready:
+                            self.api_field_map.observe(url, raw_fields)
+                            if self.api_field_map.ready:
+                                self.browser.remove_listener("response", self.api_field_map.on_response)
+                        wine_data.update(apply_post_processors(specs, raw_fields))
+                        wine_name_text = wine_data['Full_Wine_Name']
+                        if wine_name_text is None:
+                            raise Exception("Wine name element not found")
+                        
+                        add_name_fields(wine_data)
+                    metrics.record(url, 'extract', time.perf_counter() - extract_start)
+                
+                except Exception as e:
+                    print(f"Error extracting data from {url}: {e}")
+                    raise ScrapeError(EXTRACTION_MISS, f"Data extraction failed: {e}")
+                
+                # Clean up data (remove extra whitespace)
+                strip_values(wine_data)
+                
+                if self.response_cache:
+                    with metrics.span(url, 'cache_store'):
+                        self.cache_wine_data(url, wine_data, page_html or await page.content())
+                
+                print(f"Successfully scraped: {wine_data['Full_Wine_Name']}")
+                if progress_callback:
+                    progress_callback(f"Successfully scraped: {wine_data['Full_Wine_Name']}")
+                return wine_data
+
+    def setup_field_specs(self, progress_callback=None):
+        """Reorder the selector cascades by what matched on earlier runs"""
+        if not self.selector_stats:
+            return
+        self.field_specs = self.selector_stats.ordered_specs(WINE_FIELDS)
+        self.fields_script = compile_extraction_script(self.field_specs)
+        before = sum(len(spec.selectors) for spec in WINE_FIELDS)
+        after = sum(len(spec.selectors) for spec in self.field_specs)
+        if not progress_callback:
+            return
+        if self.selector_stats.exploring:
+            progress_callback("Selector stats: keeping the full cascades this run to re-check skipped selectors")
+        elif before != after:
+            progress_callback(f"Selector stats: {before - after} of {before} selectors never matched and are skipped")
+
+    def record_selectors(self, specs, raw_fields, progress_callback=None):
+        """Count the winning selectors; a field that stops matching as often as it used to gets its full cascade back"""
+        self.selector_stats.record(specs, raw_fields)
+        drifted = self.selector_stats.new_drift()
+        if not drifted:
+            return
+        names = {name for name, _, _ in drifted}
+        self.field_specs = [self.selector_stats.ordered(original, prune=False) if original.name in names else spec
+                            for original, spec in zip(WINE_FIELDS, self.field_specs)]
+        self.fields_script = compile_extraction_script(self.field_specs)
+        for name, before, now in drifted:
+            message = (f"Warning: {name} matched on {now:.0%} of pages this run, down from {before:.0%}; "
+                       f"the page markup may have changed, trying all of its selectors again")
+            print(message)
+            if progress_callback:
+                progress_callback(message)
+
+    async def recover_login(self):
+        """Log in again on a spare tab after a page showed the session had expired"""
+        async with self.login_lock:
+            # Several URLs usually notice at once; the first one logs in for all of them
+            if time.monotonic() - self.last_login < 30:
+                return
+            print("Session lost, logging in again...")
+            page, self.page = self.page, await self.browser.new_page()
+            try:
+                await self.apply_resource_profile(self.page, 'login')
+                if await self.login():
+                    if self.session_store:
+                        await self.session_store.save(self.browser)
+                    # The API client copied the old session's cookies when it started
+                    if self.api_client:
+                        self.api_client.update_cookies(await self.browser.cookies())
+            except Exception as e:
+                print(f"Could not log in again: {e}")
+            finally:
+                await self.page.close()
+                self.page = page
+                self.last_login = time.monotonic()
+
+    async def url_source(self, urls, resume=False, stop_flag=None):
+        """Pipeline source: (url, journaled record or None) for each URL, read lazily"""
+        pending = iterate(urls)
+        try:
+            async for url in pending:
+                if stop_flag and stop_flag():
+                    return
+                # With resume, URLs that already succeeded are taken from the journal;
+                # ERROR and STOPPED ones are scraped again
+                record = self.journal.lookup(url) if self.journal and resume else None
+                if record is None and self.dedup_index and self.incremental == "new" and self.dedup_index.contains(url):
+                    self.dedup_counts['skipped'] += 1
+                    continue
+                yield url, WineRecord.from_dict(record) if record is not None else None
+        finally:
+            await pending.aclose()
+
+    async def stream_wines(self, urls, progress_callback=None, stop_flag=None, resume=False, result_writer=None):
+        """Scrape URLs through a bounded pipeline, yielding each row as it completes
+
+        source (lazy, resumed URLs answered from the journal) -> scrape with up to
+        max_concurrent in flight -> a WineRecord per URL (an ERROR one for
+        exceptions) -> journal and result_writer. Rows come out in completion order and none are kept, so a
+        list of any length runs in constant memory.
+        """
+        if self.incremental:
+            self.dedup_index = DedupIndex(self.dedup_file, run_id=self.dedup_run)
+            self.dedup_counts = Counter()
+        source = self.url_source(urls, resume, stop_flag)
+        self.resumed = 0
+        completed = False
+        
+        try:
+            # Rows answered by the journal before the first URL that needs a browser
+            first = None
+            async for url, record in source:
+                if record is None:
+                    first = url
+                    break
+                self.resumed += 1
+                if result_writer:
+                    result_writer.write(record)
+                yield record
+            if first is None:
+                if self.resumed and progress_callback:
+                    progress_callback(f"Resuming: all {self.resumed} URLs already completed")
+                completed = True
+                return
+            
+            # Setup browser and login
+            if progress_callback:
+                progress_callback("Setting up browser...")
+            await self.setup_browser()
+            
+            if progress_callback:
+                progress_callback("Logging in...")
+            login_success = await self.ensure_logged_in()
+            
+            if not login_success:
+                if progress_callback:
+                    progress_callback("Failed to login. Exiting.")
+                return
+            if self.on_login:
+                self.on_login()
+            
+            await self.setup_page_pool()
+            if self.extraction_mode == "offline":
+                self.html_extractor = HtmlExtractor(self.extraction_workers).start()
+            else:
+                self.setup_field_specs(progress_callback)
+            if self.fetch_mode == "api":
+                await self.setup_api_client()
+            
+            if progress_callback:
+                if self.resumed:
+                    progress_callback(f"Resuming: {self.resumed} URLs already completed")
+                progress_callback(f"Starting concurrent scraping with max {self.max_concurrent} concurrent requests")
+                progress_callback(f"Rate limit: {self.requests_per_minute} requests per minute")
+                if self.controller.enabled:
+                    progress_callback(f"Adaptive limits start at {self.controller.concurrency} concurrent, "
+                                      f"{self.controller.requests_per_minute:.0f} requests/min")
+            
+            async def pending():
+                yield first, None
+                async for item in source:
+                    yield item
+            
+            async def scrape(item, attempt):
+                url, record = item
+                if record is not None:
+                    return record
+                with self.metrics.span(url, 'attempt_total'):
+                    return await self.scrape_wine_data(url, progress_callback, stop_flag, attempt)
+            
+            async def on_retry(item, kind, attempt, delay, error):
+                url = item[0]
+                message = f"Retrying {url} in {delay:.1f}s after {kind} (attempt {attempt}/{self.max_attempts}): {error}"
+                print(message)
+                if progress_callback:
+                    progress_callback(message)
+                if kind == AUTH_LOST:
+                    await self.recover_login()
+            
+            # Failed attempts free their slot and tab at once and come back after a backoff
+            self.retries = RetryScheduler(self.max_attempts, budget_ratio=self.retry_budget)
+            self.login_lock = asyncio.Lock()
+            async for (url, record), result in map_with_retries(pending(), scrape, self.retries, self.max_concurrent,
+                                                                key=lambda item: item[0], stop_flag=stop_flag,
+                                                                on_retry=on_retry,
+                                                                dispatched=lambda item: item[1] is None):
+                if isinstance(result, Exception):
+                    print(f"Giving up on {url}: {result}")
+                    if progress_callback:
+                        progress_callback(f"Error scraping {url}: {result}")
+                    result = WineRecord.failed(
+                        url, f"{result} ({getattr(result, 'kind', OTHER)} after {getattr(result, 'attempts', 1)} attempts)", ERROR)
+                else:
+                    result = WineRecord.from_dict(result)
+                if record is not None:
+                    self.resumed += 1
+                if self.journal and record is None:
+                    # Committed as soon as it completes so a crashed run can be resumed
+                    with self.metrics.span(url, 'journal'):
+                        self.journal.record(url, result)
+                change = None
+                if self.dedup_index and record is None and result.status == OK:
+                    # Journaled rows are exported again: their run may have died before its export was saved
+                    with self.metrics.span(url, 'dedup'):
+                        change = self.dedup_index.check(result)
+                    self.dedup_counts[change] += 1
+                if result_writer and change != UNCHANGED:
+                    with self.metrics.span(url, 'export'):
+                        result_writer.write(result)
+                if change and change != UNCHANGED:
+                    # Only counts as exported once the caller has saved the export file
+                    self.dedup_index.stage(result)
+                yield result
+            completed = True
+            
+        finally:
+            # Closes the URL file when the run ends early
+            await source.aclose()
+            if self.html_extractor:
+                self.html_extractor.shutdown()
+                self.html_extractor = None
+            if self.api_client:
+                await self.api_client.close()
+                self.api_client = None
+            if self.response_cache:
+                print(f"Cache: {self.response_cache.hits} hits, {self.response_cache.misses} misses")
+            if self.resource_profiles:
+                blocked = sum(profile.blocked for profile in self.resource_profiles.values())
+                allowed = sum(profile.allowed for profile in self.resource_profiles.values())
+                print(f"Resource blocking: {blocked} requests blocked, {allowed} allowed")
+            if self.retries:
+                print(self.retries.summary())
+            self.report_dedup(progress_callback)
+            if self.dedup_index:
+                self.close_dedup_index(completed)
+            if self.selector_stats:
+                for line in self.selector_stats.report(WINE_FIELDS):
+                    print(f"Selectors: {line}")
+                try:
+                    self.selector_stats.save()
+                except Exception as e:
+                    print(f"Could not save selector stats: {e}")
+            self.report_metrics(progress_callback)
+            self.metrics.close()
+            if self.browser:
+                await self.browser.close()
+                self.browser = None
+            if self.playwright:
+                await self.playwright.stop()
+                self.playwright = None
+
+    def report_dedup(self, progress_callback=None):
+        """Log what the incremental dedup index did this run"""
+        if not self.dedup_index:
+            return
+        counts = self.dedup_counts
+        message = (f"Incremental: {counts['new']} new and {counts['changed']} changed wines exported, "
+                   f"{counts['unchanged']} unchanged left out")
+        if self.incremental == "new":
+            message += f", {counts['skipped']} URLs already known skipped"
+        print(message)
+        if progress_callback:
+            progress_callback(message)
+
+    def close_dedup_index(self, completed):
+        """Commit the staged wines for the caller to publish, or publish/discard them here without a dedup_run"""
+        try:
+            if self.dedup_run:
+                self.dedup_index.commit()
+            elif completed:
+                self.dedup_index.publish()
+            else:
+                self.dedup_index.discard()
+        except Exception as e:
+            print(f"Could not update the incremental index: {e}")
+        finally:
+            self.dedup_index.close()
+            self.dedup_index = None
+
+    def report_metrics(self, progress_callback=None):
+        """Log the per-stage percentiles and write the Prometheus file (with metrics_file)"""
+        if not self.metrics.stages:
+            return
+        for line in ["Stage timings:"] + self.metrics.report():
+            print(line)
+            if progress_callback:
+                progress_callback(line)
+        if self.metrics_file:
+            prometheus_file = os.path.splitext(self.metrics_file)[0] + ".prom"
+            self.metrics.write_prometheus(prometheus_file)
+            print(f"Metrics: spans in {self.metrics_file}, summary in {prometheus_file}")
+
+    async def run_pipeline(self, urls, progress_callback=None, stop_flag=None, resume=False, result_writer=None):
+        """Stream every row to result_writer; returns {'rows': count, 'errors': [error rows]}
+
+        Also counts the rows answered from the journal ('resumed') and the URLs
+        incremental mode left out without a row ('skipped'), so callers can tell
+        how many URLs were actually scraped.
+        """
+        summary = {'rows': 0, 'errors': []}
+        async for wine_data in self.stream_wines(urls, progress_callback, stop_flag, resume, result_writer):
+            summary['rows'] += 1
+            if is_error_row(wine_data):
+                summary['errors'].append(wine_data)
+        summary['resumed'] = self.resumed
+        summary['skipped'] = self.dedup_counts['skipped']
+        self.error_rows = summary['errors']
+        return summary
+
+    async def scrape_all_wines(self, urls, progress_callback=None, stop_flag=None, resume=False, result_writer=None):
+        """Scrape multiple wine URLs concurrently; rows also stream to result_writer as they complete
+
+        Returns every row in input order, so memory grows with the list; use
+        run_pipeline or stream_wines for very long lists.
+        """
+        urls = list(urls)
+        if not urls:
+            if progress_callback:
+                progress_callback("No URLs provided")
+            return []
+        results = {}
+        async for wine_data in self.stream_wines(urls, progress_callback, stop_flag, resume, result_writer):
+            results[wine_data.get('URL')] = wine_data
+        if not results:
+            return []
+        wine_data_list = [results[url] for url in urls if url in results]
+        
+        # Track all failed/errored/STOPPED rows for export
+        self.error_rows = [row for row in wine_data_list if is_error_row(row)]
+        return wine_data_list
+
+    def save_results(self, wine_data_list, filename, export_format=None):
+        """Save scraped data with the exporter for export_format (default: from the file extension)"""
+        if not wine_data_list:
+            print("No data to save")
+            return
+        try:
+            # Duplicate rows (ignoring the 'Error' field) are dropped by the writer
+            writer = open_exporter(filename, export_format)
+            for wine_data in wine_data_list:
+                writer.write(wine_data)
+            writer.close()
+            print(f"Data saved to {filename}")
+        except Exception as e:
+            print(f"Error saving to {filename}: {e}")
+
+    def save_to_excel(self, wine_data_list, filename="robert_parker_wines.xlsx"):
+        """Save scraped data to Excel, streaming rows through a write-only workbook"""
+        self.save_results(wine_data_list, filename, "xlsx")
@@ -0,0 +1,138 @@
+import json
+import os
+import random
+from robert_parker_fields import FieldSpec
+from robert_parker_rate_limit import _FileLock
+
+
+class SelectorStats:
+    """Which selector of each field's cascade actually matched, learned across runs
+
+    Counts are kept per selector string (indexes shift once cascades are reordered)
+    and saved to a JSON file. ordered_specs() puts each field's most successful
+    selector first and, once a field has been seen on min_pages pages, drops the
+    selectors that never matched. About one run in 1/explore_rate keeps them
+    (last, so they are only tried when the others miss) to find out whether
+    they match again. A field whose hit rate in this run falls well below its
+    history is reported as markup drift, and should get its full cascade back
+    (ordered(spec, prune=False)).
+    """
+
+    def __init__(self, path="robert_parker_selector_stats.json", min_pages=20, max_pages=1000, drift_drop=0.25,
+                 explore_rate=0.1, rng=random.random):
+        self.path = path
+        self.min_pages = min_pages
+        # History is scaled down past this many pages so new markup can overtake old winners
+        self.max_pages = max_pages
+        self.drift_drop = drift_drop
+        self.exploring = rng() < explore_rate
+        self.history = self.load()
+        self.run = {}
+        self.warned = set()
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f).get('fields', {})
+        except Exception as e:
+            print(f"Could not read selector stats {self.path}: {e}")
+            return {}
+
+    def ordered_specs(self, specs):
+        """Copies of specs with each cascade reordered by past hits"""
+        return [self.ordered(spec) for spec in specs]
+
+    def ordered(self, spec, prune=True):
+        field = self.history.get(spec.name)
+        if not field:
+            return spec
+        hits = field.get('hits', {})
+        # Stable sort: selectors with equal hits keep their hand-written order
+        selectors = sorted(spec.selectors, key=lambda selector: -hits.get(selector, 0))
+        if prune and not self.exploring and field.get('pages', 0) >= self.min_pages:
+            matched = [selector for selector in selectors if hits.get(selector, 0)]
+            # A field that never matched keeps its whole cascade
+            selectors = matched or selectors
+        if selectors == spec.selectors:
+            return spec
+        return FieldSpec(spec.name, selectors, post=spec.post, require_text=spec.require_text)
+
+    def record(self, specs, raw_fields):
+        """Count which selector matched each field in one extraction result (from specs)"""
+        for spec in specs:
+            match = raw_fields.get(spec.name) or {}
+            field = self.run.setdefault(spec.name, {'pages': 0, 'misses': 0, 'hits': {}})
+            field['pages'] += 1
+            index = match.get('index', -1)
+            if index is None or not 0 <= index < len(spec.selectors):
+                field['misses'] += 1
+                continue
+            selector = spec.selectors[index]
+            field['hits'][selector] = field['hits'].get(selector, 0) + 1
+
+    @staticmethod
+    def hit_rate(field):
+        pages = field.get('pages', 0)
+        return (pages - field.get('misses', 0)) / pages if pages else 0.0
+
+    def drift(self):
+        """(field, past hit rate, hit rate this run) for fields matching noticeably less often"""
+        drifted = []
+        for name, field in self.run.items():
+            past = self.history.get(name)
+            if not past or past.get('pages', 0) < self.min_pages or field['pages'] < self.min_pages:
+                continue
+            before, now = self.hit_rate(past), self.hit_rate(field)
+            if before - now >= self.drift_drop:
+                drifted.append((name, before, now))
+        return drifted
+
+    def new_drift(self):
+        """drift() entries not reported yet in this run"""
+        drifted = [entry for entry in self.drift() if entry[0] not in self.warned]
+        self.warned.update(name for name, _, _ in drifted)
+        return drifted
+
+    def report(self, specs):
+        """One line per field of specs seen this run: hit rate and which selectors of its cascade matched"""
+        lines = []
+        for spec in specs:
+            field = self.run.get(spec.name)
+            if not field:
+                continue
+            used = sorted(((spec.selectors.index(selector) + 1 if selector in spec.selectors else 0, count)
+                           for selector, count in field['hits'].items()), key=lambda item: -item[1])
+            matched = ', '.join(f"#{position} {count}x" for position, count in used) or "none"
+            lines.append(f"{spec.name}: {self.hit_rate(field):.0%} of {field['pages']} pages, "
+                         f"{len(spec.selectors)} selectors, matches: {matched}")
+        return lines
+
+    def save(self):
+        """Add this run's counts to the file, re-reading it under a lock so parallel workers don't overwrite each other"""
+        if not self.path or not self.run:
+            return
+        with open(self.path + ".lock", 'a+', encoding='utf-8') as lock_file, _FileLock(lock_file):
+            self._merge_and_write()
+        self.run = {}
+
+    def _merge_and_write(self):
+        fields = self.load()
+        for name, field in self.run.items():
+            merged = fields.setdefault(name, {'pages': 0, 'misses': 0, 'hits': {}})
+            merged['pages'] += field['pages']
+            merged['misses'] += field['misses']
+            for selector, count in field['hits'].items():
+                merged['hits'][selector] = merged['hits'].get(selector, 0) + count
+            if merged['pages'] > self.max_pages:
+                scale = self.max_pages / merged['pages']
+                merged['pages'] = self.max_pages
+                merged['misses'] = round(merged['misses'] * scale)
+                # Keep selectors that matched at all, however rarely, so they are not pruned
+                merged['hits'] = {selector: max(1, round(count * scale)) for selector, count in merged['hits'].items()}
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'fields': fields}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        self.history = fields
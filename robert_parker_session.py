@@ -0,0 +1,63 @@
+import json
+import os
+import tempfile
+import time
+
+
+class SessionStore:
+    """Login state saved with Playwright's storage_state and restored into later runs and workers"""
+
+    def __init__(self, path="robert_parker_session.json"):
+        self.path = path
+
+    def load(self):
+        """The saved storage state, or None if there is none or it cannot be read"""
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Could not read saved session {self.path}: {e}")
+            return None
+
+    @staticmethod
+    def live_cookies(state):
+        """Cookies from a storage state that have not expired (-1 marks a session cookie)"""
+        now = time.time()
+        return [cookie for cookie in state.get('cookies', [])
+                if cookie.get('expires', -1) == -1 or cookie['expires'] > now]
+
+    async def restore(self, context):
+        """Add the saved cookies to a context; False if there is nothing usable to restore"""
+        state = self.load()
+        if not state:
+            return False
+        cookies = self.live_cookies(state)
+        if not cookies:
+            print("Saved session has expired")
+            return False
+        await context.add_cookies(cookies)
+        return True
+
+    async def save(self, context):
+        """Write the context's cookies and local storage, atomically so workers never read half a file"""
+        if not self.path:
+            return
+        state = await context.storage_state()
+        # A temp file of its own: two workers saving at once must not write into the same one
+        f = tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=os.path.dirname(os.path.abspath(self.path)),
+                                        prefix=os.path.basename(self.path) + ".", suffix=".tmp", delete=False)
+        try:
+            with f:
+                json.dump(state, f)
+            os.replace(f.name, self.path)
+        except Exception:
+            os.remove(f.name)
+            raise
+
+    def clear(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
@@ -0,0 +1,181 @@
+import asyncio
+import multiprocessing
+import os
+import queue
+import shutil
+import zlib
+from robert_parker_urls import UrlSource, wine_id_from_url
+
+
+def shard_index(url, shards):
+    """Stable shard for a URL (by wine ID), so a resumed run sends it to the same worker"""
+    key = wine_id_from_url(url) or url
+    return zlib.crc32(key.encode('utf-8')) % shards
+
+
+def shard_urls(urls, index, shards):
+    """The URLs of shard `index` out of `shards`, read lazily in input order"""
+    for url in urls:
+        if shard_index(url, shards) == index:
+            yield url
+
+
+def shard_concurrency(max_concurrent, index, shards):
+    """Worker `index`'s part of max_concurrent, so all workers together keep to it"""
+    return max_concurrent // shards + (1 if index < max_concurrent % shards else 0)
+
+
+def prepare_user_data_dir(index, base_dir="browser_data"):
+    """Per-worker copy of the browser profile; Chromium locks a profile to one process"""
+    target = f"{base_dir}_shard{index}"
+    if not os.path.exists(target) and os.path.isdir(base_dir):
+        shutil.copytree(base_dir, target, ignore=shutil.ignore_patterns('Singleton*', 'lockfile', '*.lock'))
+    return os.path.abspath(target)
+
+
+class QueueWriter:
+    """Stands in for an exporter inside a worker: rows go to the coordinator instead of a file"""
+
+    def __init__(self, results, index):
+        self.results = results
+        self.index = index
+
+    def write(self, wine_data):
+        self.results.put(('row', self.index, wine_data))
+        return True
+
+    def close(self):
+        pass
+
+
+def run_shard(index, shards, urls, options, resume, logs_in, results, login_ready, stop_event):
+    """Worker process: scrape one shard with its own browser and report rows on `results`
+
+    Every worker reads the whole URL source itself and keeps its own shard, so no
+    process holds the full list.
+    """
+    # Imported here so the coordinator does not pay for Playwright until a worker starts
+    from robert_parker_scraper import RobertParkerScraper
+
+    def progress_callback(message):
+        results.put(('log', index, message))
+
+    async def run():
+        # One worker logs in with the browser it then scrapes with, saving the session;
+        # the others wait for it and reuse it
+        if logs_in:
+            scraper = RobertParkerScraper(**options, on_login=login_ready.set)
+        else:
+            await asyncio.get_running_loop().run_in_executor(None, login_ready.wait, 300)
+            scraper = RobertParkerScraper(**options)
+        return await scraper.run_pipeline(shard_urls(urls, index, shards), progress_callback, stop_event.is_set, resume=resume,
+                                          result_writer=QueueWriter(results, index))
+
+    options = dict(options, user_data_dir=prepare_user_data_dir(index, options.get('user_data_dir') or "browser_data"))
+    if options.get('metrics_file'):
+        # Percentiles are per worker, so each writes its own files
+        base, extension = os.path.splitext(options['metrics_file'])
+        options['metrics_file'] = f"{base}_shard{index}{extension}"
+    try:
+        summary = asyncio.run(run())
+        results.put(('done', index, {'total': summary['rows'], 'errors': summary['errors'],
+                                     'resumed': summary['resumed'], 'skipped': summary['skipped']}))
+    except Exception as e:
+        results.put(('failed', index, str(e)))
+    finally:
+        # Never leave the other workers waiting on a login that failed
+        login_ready.set()
+
+
+def run_sharded(urls, workers, writer, scraper_options=None, resume=False, progress_callback=None,
+                stop_flag=None, rate_limit_file="robert_parker_rate_limit.json"):
+    """Scrape urls with `workers` browser processes sharing one rate budget, merging rows into writer
+
+    max_concurrent (scraper default 5) is split across the workers, so there are
+    never more pages in flight than a single process would have; workers beyond
+    max_concurrent are not started. Rows are written in the order they complete. Returns a summary with the row count,
+    the ERROR/STOPPED rows, the resumed and skipped counts and any workers that failed outright.
+    """
+    context = multiprocessing.get_context('spawn')
+    # Bounded, so workers block instead of piling up rows the coordinator has not written yet
+    results = context.Queue(maxsize=1000)
+    login_ready = context.Event()
+    stop_event = context.Event()
+
+    # Start the shared token bucket from the configured rate rather than a previous run's state
+    if os.path.exists(rate_limit_file):
+        os.remove(rate_limit_file)
+    options = dict(scraper_options or {}, rate_limit_file=rate_limit_file)
+    max_concurrent = options.get('max_concurrent', 5)
+    if workers > max_concurrent:
+        if progress_callback:
+            progress_callback(f"Using {max_concurrent} workers, one per allowed concurrent request")
+        workers = max_concurrent
+
+    # Workers re-read a URL source from its file; other iterables are passed as a list of lines
+    if not isinstance(urls, UrlSource):
+        urls = UrlSource.from_lines(list(urls))
+    processes = {}
+    for index in range(workers):
+        process = context.Process(
+            target=run_shard,
+            args=(index, workers, urls, dict(options, max_concurrent=shard_concurrency(max_concurrent, index, workers)),
+                  resume, index == 0, results, login_ready, stop_event),
+            name=f"robert-parker-shard-{index}"
+        )
+        process.start()
+        processes[index] = process
+        if progress_callback:
+            progress_callback(f"Started worker {index} of {workers}")
+
+    summary = {'rows': 0, 'errors': [], 'resumed': 0, 'skipped': 0, 'failed': {}}
+    running = set(processes)
+
+    def handle(kind, index, payload):
+        if kind == 'row':
+            writer.write(payload)
+            summary['rows'] += 1
+        elif kind == 'log':
+            if progress_callback:
+                progress_callback(f"{payload} [worker {index}]")
+        elif kind == 'done':
+            running.discard(index)
+            summary['errors'].extend(payload['errors'])
+            summary['resumed'] += payload['resumed']
+            summary['skipped'] += payload['skipped']
+        elif kind == 'failed':
+            running.discard(index)
+            summary['failed'][index] = payload
+            if progress_callback:
+                progress_callback(f"Worker {index} failed: {payload}")
+
+    while running:
+        if stop_flag and stop_flag():
+            stop_event.set()
+        try:
+            handle(*results.get(timeout=0.5))
+            continue
+        except queue.Empty:
+            pass
+        exited = [index for index in running if not processes[index].is_alive()]
+        if not exited:
+            continue
+        # A worker that just exited may still have rows and its 'done' message in the
+        # queue; read everything it sent before deciding whether it failed
+        for index in exited:
+            processes[index].join()
+        while True:
+            try:
+                handle(*results.get(timeout=0.1))
+            except queue.Empty:
+                break
+        for index in exited:
+            if index in running:
+                running.discard(index)
+                summary['failed'][index] = f"exited with code {processes[index].exitcode}"
+                if progress_callback:
+                    progress_callback(f"Worker {index} {summary['failed'][index]}")
+
+    for process in processes.values():
+        process.join()
+    return summary
@@ -0,0 +1,111 @@
+import csv
+import hashlib
+import os
+import re
+
+WINE_URL_PATTERN = re.compile(r'robertparker\.com/wines/([A-Za-z0-9]+)')
+# A URL anywhere in a cell, with or without its scheme
+URL_IN_TEXT_PATTERN = re.compile(r'(?:https?://|www\.|robertparker\.com/)[^\s"\'<>,;]+', re.IGNORECASE)
+
+
+def wine_id_from_url(url):
+    """Return the wine ID from a wine URL (e.g. 'xiPRuQod7Qy2rC5bv'), or None"""
+    match = WINE_URL_PATTERN.search(url or '')
+    return match.group(1) if match else None
+
+
+def is_login_redirect(requested_url, landed_url):
+    """True when a page request ended up on a login page it did not ask for"""
+    landed = (landed_url or '').lower()
+    return ('login' in landed or 'signin' in landed) and landed != (requested_url or '').lower()
+
+
+def normalize_url(text):
+    """The URL in a line or cell, without surrounding text or fragment and with https:// added, or None"""
+    match = URL_IN_TEXT_PATTERN.search(str(text or ''))
+    if not match:
+        return None
+    url = match.group(0).split('#', 1)[0].rstrip('.)]')
+    if not url.lower().startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
+
+def iter_url_cells(path):
+    """Raw lines (txt) or cells (csv, xlsx) of a URL file, read lazily"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xlsx':
+        import openpyxl
+        wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for ws in wb.worksheets:
+                for row in ws.iter_rows(values_only=True):
+                    for value in row:
+                        if value is not None:
+                            yield value
+        finally:
+            wb.close()
+    elif extension == '.csv':
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            for row in csv.reader(f):
+                yield from row
+    else:
+        with open(path, encoding='utf-8-sig') as f:
+            yield from f
+
+
+class UrlSource:
+    """Normalised, deduplicated URLs streamed from a file (txt, csv or xlsx) or any iterable of lines
+
+    Each pass re-reads the input, so a 100k-line file is never held in memory; only
+    a set of wine IDs (or short digests for other URLs) is kept to drop duplicates.
+    """
+
+    def __init__(self, path=None, lines=None):
+        self.path = path
+        self.lines = lines
+        self.read = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self._count = None
+
+    @classmethod
+    def from_lines(cls, lines):
+        return cls(lines=lines)
+
+    @property
+    def name(self):
+        return os.path.basename(self.path) if self.path else "pasted URLs"
+
+    def cells(self):
+        return iter_url_cells(self.path) if self.path else iter(self.lines)
+
+    def __iter__(self):
+        seen = set()
+        self.read = self.duplicates = self.invalid = 0
+        for cell in self.cells():
+            text = str(cell).strip()
+            if not text or text.startswith('#'):
+                continue
+            self.read += 1
+            url = normalize_url(text)
+            if not url:
+                self.invalid += 1
+                continue
+            key = wine_id_from_url(url) or hashlib.blake2b(url.encode('utf-8'), digest_size=8).digest()
+            if key in seen:
+                self.duplicates += 1
+                continue
+            seen.add(key)
+            yield url
+
+    def count(self):
+        """Number of unique URLs, from one pass over the input (cached)"""
+        if self._count is None:
+            self._count = sum(1 for _ in self)
+        return self._count
+
+    def summary(self):
+        """e.g. 'urls.csv: 98,412 URLs (1,203 duplicates and 12 non-URL entries skipped)'"""
+        return (f"{self.name}: {self.count():,} URLs "
+                f"({self.duplicates:,} duplicates and {self.invalid:,} non-URL entries skipped)")
@@ -0,0 +1,170 @@
+# Consent banner buttons (Didomi first) and their button texts
+CONSENT_SELECTORS = [
+    '#didomi-notice-agree-button',
+    'button[data-testid="cookie-accept"]',
+    '.cookie-accept',
+    '.cookie-agree',
+    '[aria-label*="Accept" i]',
+    '[aria-label*="Agree" i]'
+]
+CONSENT_TEXTS = ['accept', 'accept all', 'agree', 'ok', 'i accept']
+
+# Close buttons of modals and other overlays
+CLOSE_SELECTORS = [
+    'button[data-testid="close-button"]',
+    '.modal-close',
+    '.popup-close',
+    '.close-button',
+    '[aria-label="Close"]',
+    '[aria-label="Dismiss"]',
+    '.close',
+    '.dismiss',
+    '.cancel',
+    'button[class*="close"]',
+    'button[class*="dismiss"]',
+    '[role="button"][aria-label*="close" i]',
+    '[role="button"][aria-label*="dismiss" i]'
+]
+CLOSE_TEXTS = ['close', 'x', '×']
+
+# Header elements that only exist for a logged-in user
+LOGGED_IN_SELECTORS = [
+    'a[href*="logout"]',
+    '.user-menu',
+    '.account-menu',
+    '[data-testid="user-menu"]',
+    '[data-testid="account-menu"]',
+    '.user-account',
+    '.user-profile',
+    '.logged-in'
+]
+# Looser success check, only used once the specific indicators have not shown up
+LOGIN_FALLBACK_SUCCESS_SELECTORS = ['[class*="user"]']
+LOGIN_ERROR_SELECTORS = [
+    '[class*="error"]',
+    '[class*="invalid"]',
+    '[class*="failed"]',
+    '.error',
+    '.alert',
+    '.message',
+    '[class*="alert"]'
+]
+# The form or dialog holding the password field
+LOGIN_FORM_SELECTOR = ':is(form, [role="dialog"], [class*="modal"]):has(input[type="password"])'
+# Only the error-specific classes end the wait for a login result early, and only inside
+# the login form: an error element elsewhere on the page may be there before submitting
+LOGIN_ERROR_WAIT_SELECTORS = [f'{LOGIN_FORM_SELECTOR} {selector}' for selector in LOGIN_ERROR_SELECTORS[:3]]
+
+LOGIN_BUTTON_SELECTORS = [
+    '//*[@id="root"]/header/div[1]/div/div/div[3]/div',
+    '//button[contains(text(), "Login")]',
+    '//a[contains(text(), "Login")]',
+    '//*[contains(@class, "login")]',
+    '//*[contains(@class, "signin")]',
+    '//*[contains(@class, "user")]',
+    '//*[contains(@class, "account")]'
+]
+EMAIL_INPUT_SELECTORS = [
+    '//*[@id="user_login"]',
+    'input[type="email"]',
+    'input[name="email"]',
+    'input[type="text"][name*="email"]',
+    'input[type="text"][name*="user"]',
+    'input[placeholder*="email" i]'
+]
+PASSWORD_INPUT_SELECTORS = [
+    '//*[@id="user_pass"]',
+    'input[type="password"]',
+    'input[name="password"]',
+    'input[name="pass"]',
+    'input[placeholder*="password" i]'
+]
+SUBMIT_BUTTON_SELECTORS = [
+    '//*[@id="submit-login"]',
+    'button[type="submit"]',
+    'input[type="submit"]',
+    'button:has-text("Login")',
+    'button:has-text("Sign In")',
+    'button:has-text("Submit")',
+    '[type="submit"]'
+]
+
+# Shared by the in-page scripts: XPath for selectors starting with '/' or '(',
+# CSS otherwise; invalid selectors never match
+_FIND_JS = """
+    const find = (selector) => {
+        try {
+            if (selector.startsWith('/') || selector.startsWith('(')) {
+                return document.evaluate(selector, document, null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            }
+            return document.querySelector(selector);
+        } catch (e) {
+            return null;
+        }
+    };
+    const visible = (el) => !!el && el.getClientRects().length > 0
+        && getComputedStyle(el).visibility !== 'hidden';
+"""
+
+# Resolves to the index of the first selector with a (visible) match
+_WAIT_ANY_JS = """
+({selectors, needVisible}) => {
+%s
+    for (let i = 0; i < selectors.length; i++) {
+        const el = find(selectors[i]);
+        if (el && (!needVisible || visible(el))) return {index: i};
+    }
+    return null;
+}
+""" % _FIND_JS
+
+# One round trip that clicks the consent button (optional) and every visible close button
+_DISMISS_JS = """
+({consent, consentSelectors, consentTexts, closeSelectors, closeTexts}) => {
+%s
+    const byText = (texts) => Array.from(document.querySelectorAll('button, [role="button"]')).find(
+        (el) => visible(el) && texts.includes((el.textContent || '').trim().toLowerCase()));
+    const result = {consent: null, closed: []};
+    if (consent) {
+        for (const selector of consentSelectors) {
+            const el = find(selector);
+            if (visible(el)) { el.click(); result.consent = selector; break; }
+        }
+        if (!result.consent) {
+            const el = byText(consentTexts);
+            if (el) { el.click(); result.consent = 'button "' + el.textContent.trim() + '"'; }
+        }
+    }
+    for (const selector of closeSelectors) {
+        const el = find(selector);
+        if (visible(el)) { el.click(); result.closed.push(selector); }
+    }
+    const el = byText(closeTexts);
+    if (el) { el.click(); result.closed.push('button "' + el.textContent.trim() + '"'); }
+    return result;
+}
+""" % _FIND_JS
+
+
+async def wait_for_any(page, selectors, timeout=10000, visible=True):
+    """Wait until one of `selectors` matches; returns that selector, or None on timeout"""
+    try:
+        handle = await page.wait_for_function(
+            _WAIT_ANY_JS, arg={'selectors': list(selectors), 'needVisible': visible}, timeout=timeout
+        )
+    except Exception:
+        return None
+    match = await handle.json_value()
+    return selectors[match['index']]
+
+
+async def dismiss_popups(page, consent=True):
+    """Click the consent button (if `consent`) and any open popup's close button in one evaluate"""
+    return await page.evaluate(_DISMISS_JS, {
+        'consent': consent,
+        'consentSelectors': CONSENT_SELECTORS,
+        'consentTexts': CONSENT_TEXTS,
+        'closeSelectors': CLOSE_SELECTORS,
+        'closeTexts': CLOSE_TEXTS
+    })
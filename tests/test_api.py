@@ -0,0 +1,119 @@
+import asyncio
+
+from robert_parker_api import ApiFieldMap, WineApiClient
+from robert_parker_benchmark import COLORS, LABELS, PRODUCERS, REGIONS, REVIEWERS, VARIETIES, wine_values
+from robert_parker_fields import WINE_FIELDS, apply_post_processors
+
+COUNTRIES = {
+    'FranceBurgundyPuligny-Montrachet': ('France', 'Burgundy', 'Puligny-Montrachet'),
+    'FranceBurgundyChassagne-Montrachet': ('France', 'Burgundy', 'Chassagne-Montrachet'),
+    'FranceBordeauxMargaux': ('France', 'Bordeaux', 'Margaux'),
+    'AustraliaSouth AustraliaBarossa Valley': ('Australia', 'South Australia', 'Barossa Valley'),
+    'USACaliforniaSanta Cruz Mountains': ('USA', 'California', 'Santa Cruz Mountains'),
+    'SpainCastilla y LeonRibera del Duero': ('Spain', 'Castilla y Leon', 'Ribera del Duero'),
+}
+NAMES = [spec.name for spec in WINE_FIELDS]
+
+
+def wine_id(index):
+    return f"bench{index:07d}"
+
+
+def wine_url(index):
+    return f"https://www.robertparker.com/wines/{wine_id(index)}/synthetic-wine-{index}"
+
+
+def endpoint(index):
+    return f"https://api.robertparker.com/v2/wines/{wine_id(index)}?include=review"
+
+
+def payload(index, producer_note=True):
+    """What the wine page's XHR returns: the values the page renders, but split up and unlabelled"""
+    i = index % len(PRODUCERS)
+    vintage = 1985 + index % 38
+    country, region, appellation = COUNTRIES[REGIONS[i]]
+    review = {
+        'id': 70000 + index,
+        'rating': 88 + index % 13,
+        'drinkFrom': vintage + 5,
+        'drinkTo': vintage + 25,
+        'reviewer': {'id': index % 3, 'name': REVIEWERS[index % len(REVIEWERS)]},
+        'note': wine_values(index)['Tasting Note'],
+        'maturity': 'Youthful',
+        'publishedAt': f"Jan {1 + index % 28}, 2024",
+    }
+    if producer_note:
+        review['producerNote'] = f"Synthetic producer note {index}."
+    return {'data': {
+        'id': wine_id(index),
+        'displayName': f"{PRODUCERS[i]} {LABELS[i]} {vintage}",
+        'name': LABELS[i],
+        'vintage': vintage,
+        'producer': {'id': i, 'name': PRODUCERS[i]},
+        'location': {'country': country, 'region': region, 'appellation': appellation},
+        'color': COLORS[i],
+        'grapes': [{'name': VARIETIES[i]}],
+        'releasePrice': f"${40 + (index * 7) % 400}",
+        'certification': 'Organic' if index % 4 == 0 else None,
+        'reviews': [review],
+    }}
+
+
+def dom_fields(index):
+    """The page script's result for the same wine"""
+    values = wine_values(index)
+    return {name: {'text': values.get(name) or None, 'index': 0} for name in NAMES}
+
+
+def learn(field_map, indexes, **payload_options):
+    for index in indexes:
+        field_map.responses[wine_id(index)] = [(endpoint(index), payload(index, **payload_options))]
+        field_map.observe(wine_url(index), dom_fields(index))
+
+
+class FakeClient(WineApiClient):
+    def __init__(self, field_map, **payload_options):
+        super().__init__(field_map, [])
+        self.payload_options = payload_options
+
+    async def fetch_json(self, url):
+        index = int(url.split('/wines/bench')[1][:7])
+        return payload(index, **self.payload_options)
+
+
+def test_labelled_and_joined_fields_are_learned_and_rebuilt_from_the_api():
+    field_map = ApiFieldMap(NAMES, map_file=None, required=('Full_Wine_Name',))
+    learn(field_map, range(3))
+    assert field_map.ready
+    assert field_map.dom_fields() == []
+    assert field_map.fields['Maturity']['prefix'] == "Maturity: "
+    assert field_map.fields['Certified']['prefix'] == "Certified "
+    assert field_map.fields['Wine Region']['separator'] == ""
+    assert field_map.fields['Drink Window']['separator'] == " - "
+    assert len(field_map.fields['Drink Date']['paths']) == 2
+
+    for index in (3, 4, 5, 8, 41):
+        raw = asyncio.run(FakeClient(field_map).fetch_raw_fields(wine_url(index)))
+        assert apply_post_processors(WINE_FIELDS, raw) == apply_post_processors(WINE_FIELDS, dom_fields(index))
+
+
+def test_fields_missing_from_the_payloads_are_left_to_the_page():
+    field_map = ApiFieldMap(NAMES, map_file=None, required=('Full_Wine_Name',))
+    learn(field_map, range(3), producer_note=False)
+    assert field_map.ready
+    assert field_map.dom_fields() == ['Producer Note']
+    raw = asyncio.run(FakeClient(field_map, producer_note=False).fetch_raw_fields(wine_url(7)))
+    assert raw['Producer Note']['text'] is None
+    assert raw['Full_Wine_Name']['text'] == wine_values(7)['Full_Wine_Name']
+
+
+def test_a_match_that_does_not_hold_on_the_next_page_is_dropped():
+    field_map = ApiFieldMap(['Score'], map_file=None, learning_pages=2)
+    first = {'data': {'rating': 95, 'reviewCount': 88}}
+    field_map.responses[wine_id(0)] = [(endpoint(0), first)]
+    field_map.observe(wine_url(0), {'Score': {'text': '88'}})
+    assert field_map.fields['Score']['path'] == ['data', 'reviewCount']
+    second = {'data': {'rating': 91, 'reviewCount': 3}}
+    field_map.responses[wine_id(1)] = [(endpoint(1), second)]
+    field_map.observe(wine_url(1), {'Score': {'text': '91'}})
+    assert field_map.fields['Score']['path'] == ['data', 'rating']
@@ -0,0 +1,25 @@
+from robert_parker_cache import ResponseCache
+
+URL = "https://www.robertparker.com/wines/abc123"
+
+
+def test_scrapers_sharing_a_cache_dir_do_not_see_each_others_records(tmp_path):
+    wine = ResponseCache(str(tmp_path), schema="wine", required=("Full_Wine_Name",))
+    playwright = ResponseCache(str(tmp_path), schema="playwright", required=("Wine Name",))
+    wine.put(URL, {'Full_Wine_Name': 'W 2015'}, "<html>")
+    assert playwright.get(URL) is None
+    assert wine.get(URL)['record'] == {'Full_Wine_Name': 'W 2015'}
+    playwright.put(URL, {'Wine Name': 'W'})
+    assert playwright.get(URL)['record'] == {'Wine Name': 'W'}
+    assert wine.get(URL)['record'] == {'Full_Wine_Name': 'W 2015'}
+
+
+def test_records_missing_a_required_key_or_past_the_ttl_are_misses(tmp_path):
+    cache = ResponseCache(str(tmp_path), schema="wine", required=("Full_Wine_Name",))
+    cache.put(URL, {'Producer': 'P'})
+    assert cache.get(URL) is None
+    cache.put(URL, {'Full_Wine_Name': 'W'})
+    assert cache.get(URL) is not None
+    cache.db.execute("UPDATE entries SET fetched_at = 0")
+    assert cache.get(URL) is None
+    assert (cache.hits, cache.misses) == (1, 2)
@@ -0,0 +1,90 @@
+import pytest
+
+from robert_parker_dedup import (
+    CHANGED, NEW, UNCHANGED, DedupIndex, content_hash, hash64, staged_exports, wine_key
+)
+from robert_parker_record import WineRecord
+
+
+def record(url, **columns):
+    return WineRecord.from_dict(dict(columns, URL=url, Full_Wine_Name='Wine 2001'))
+
+
+def test_hash64_fits_a_signed_64_bit_integer():
+    for text in ('', 'a', 'xiPRuQod7Qy2rC5bv', 'é' * 1000):
+        value = hash64(text)
+        assert -2 ** 63 <= value < 2 ** 63
+        assert hash64(text) == value
+    assert hash64('a') != hash64('b')
+
+
+def test_wine_key_uses_the_wine_id_not_the_url_form():
+    assert wine_key("https://www.robertparker.com/wines/abc123") == wine_key("robertparker.com/wines/abc123?x=1")
+    assert wine_key("https://www.robertparker.com/wines/abc123") != wine_key("https://www.robertparker.com/wines/abc124")
+    assert wine_key("https://example.com/a") == hash64("https://example.com/a")
+
+
+def test_content_hash_separates_columns_and_treats_none_as_blank():
+    assert content_hash(['ab', 'c']) != content_hash(['a', 'bc'])
+    assert content_hash([None, 'x']) == content_hash(['', 'x'])
+
+
+def publish(path, *records):
+    index = DedupIndex(path)
+    for item in records:
+        index.stage(item)
+    index.publish()
+    index.close()
+
+
+def test_index_tells_new_changed_and_unchanged_apart(tmp_path):
+    path = str(tmp_path / "seen.db")
+    url = "https://www.robertparker.com/wines/abc123"
+    index = DedupIndex(path)
+    assert index.check(record(url, Score='93')) == NEW
+    # check() writes nothing
+    assert index.check(record(url, Score='93')) == NEW
+    index.close()
+
+    publish(path, record(url, Score='93'))
+    index = DedupIndex(path)
+    assert index.check(record(url, Score='93')) == UNCHANGED
+    # Same wine under another URL form is still the same wine
+    assert index.check(record(url + "?ref=x", Score='93')) == UNCHANGED
+    assert index.check(record(url, Score='94')) == CHANGED
+    assert index.count() == 1
+    assert index.contains(url)
+    assert not index.contains("https://www.robertparker.com/wines/other")
+    index.close()
+
+
+def test_staged_wines_count_only_once_the_export_is_saved(tmp_path):
+    path = str(tmp_path / "seen.db")
+    url = "https://www.robertparker.com/wines/abc123"
+    with pytest.raises(OSError):
+        with staged_exports(path) as run_id:
+            index = DedupIndex(path, run_id=run_id)
+            index.stage(record(url, Score='93'))
+            index.close()
+            raise OSError("export could not be saved")
+    index = DedupIndex(path)
+    assert index.count() == 0
+    assert index.db.execute("SELECT COUNT(*) FROM staged").fetchone()[0] == 0
+    index.close()
+
+    with staged_exports(path) as run_id:
+        # Sharded workers each stage under the coordinator's run ID
+        for other in ("abc123", "def456"):
+            index = DedupIndex(path, run_id=run_id)
+            index.stage(record(f"https://www.robertparker.com/wines/{other}", Score='93'))
+            index.close()
+    index = DedupIndex(path)
+    assert index.count() == 2
+    assert index.check(record(url, Score='93')) == UNCHANGED
+    index.close()
+
+
+def test_incremental_scraper_needs_an_index_file():
+    from robert_parker_scraper import RobertParkerScraper
+    with pytest.raises(ValueError):
+        RobertParkerScraper("user", "password", incremental="new", dedup_file=None)
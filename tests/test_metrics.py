@@ -0,0 +1,47 @@
+import random
+
+from robert_parker_metrics import RunMetrics, StageHistogram
+
+
+def test_histogram_quantiles_stay_close_to_exact_ones():
+    rng = random.Random(7)
+    values = sorted(rng.lognormvariate(0, 1) for _ in range(10000))
+    histogram = StageHistogram()
+    for value in values:
+        histogram.add(value)
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * len(values)) - 1]
+        assert abs(histogram.quantile(q) - exact) / exact < 0.07
+    assert histogram.count == len(values)
+    assert abs(histogram.total - sum(values)) < 1e-6
+
+
+def test_histogram_size_does_not_grow_with_spans():
+    histogram = StageHistogram()
+    buckets = len(histogram.counts)
+    for index in range(100000):
+        histogram.add(index / 1000)
+    assert len(histogram.counts) == buckets
+
+
+def test_histogram_clamps_to_the_observed_range():
+    histogram = StageHistogram()
+    for value in (0.0, 2.5, 2e5):
+        histogram.add(value)
+    assert histogram.quantile(0.01) == 0.0
+    assert abs(histogram.quantile(0.5) - 2.5) / 2.5 < 0.07
+    assert histogram.quantile(1.0) == 2e5
+    assert StageHistogram().quantile(0.5) == 0.0
+
+
+def test_summary_per_stage():
+    metrics = RunMetrics()
+    for ms in (100, 200, 300, 400):
+        metrics.record('u', 'navigation', ms / 1000)
+    metrics.record('u', 'extract', 0.05)
+    summary = metrics.summary()
+    assert summary['navigation']['count'] == 4
+    assert abs(summary['navigation']['total'] - 1.0) < 1e-9
+    assert abs(summary['navigation']['p50'] - 0.2) / 0.2 < 0.07
+    assert summary['extract']['p99'] == 0.05
+    assert 'robert_parker_stage_seconds_count{stage="navigation"} 4' in metrics.prometheus_text()
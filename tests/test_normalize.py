@@ -0,0 +1,44 @@
+from robert_parker_normalize import normalize_records, split_wine_name, strip_values
+from robert_parker_record import WineRecord
+
+
+def test_split_wine_name():
+    assert split_wine_name("Château Margaux Pavillon Rouge 2015", "château margaux") == ('2015', 'Pavillon Rouge')
+    assert split_wine_name("Krug Grande Cuvée", "Krug") == ('', 'Grande Cuvée')
+    assert split_wine_name("Penfolds Grange 1998", "") == ('1998', 'Penfolds Grange')
+    assert split_wine_name(None) == ('', '')
+
+
+def test_strip_values():
+    assert strip_values({'a': '  x ', 'b': None, 'c': 3}) == {'a': 'x', 'b': '', 'c': 3}
+
+
+def test_normalize_records_parses_typed_columns():
+    rows = [
+        {'Vintage': '2015', 'Score': '(93-95)', 'Drink Window': '2025 - 2045', 'Release Price': '$1,250',
+         'Published Date': 'Jan 5, 2024'},
+        {'Vintage': 'NV', 'Score': '93+', 'Drink Window': '2030', 'Release Price': '45 EUR',
+         'Published Date': 'Published: 2023-10-15'},
+        {'Release Price': '€120.50'},
+        {'Score': '', 'Drink Window': 'Drink now', 'Published Date': 'soon'},
+    ]
+    typed = normalize_records(rows)
+    assert len(typed) == 4
+    assert typed['Vintage'].tolist()[0] == 2015
+    assert typed['Vintage'].isna().tolist() == [False, True, True, True]
+    assert (typed.loc[0, 'Score_Min'], typed.loc[0, 'Score_Max']) == (93, 95)
+    assert (typed.loc[1, 'Score_Min'], typed.loc[1, 'Score_Max']) == (93, 93)
+    assert (typed.loc[0, 'Drink_From'], typed.loc[0, 'Drink_To']) == (2025, 2045)
+    assert (typed.loc[1, 'Drink_From'], typed.loc[1, 'Drink_To']) == (2030, 2030)
+    assert typed['Release_Price_Amount'].tolist()[:3] == [1250.0, 45.0, 120.5]
+    assert typed['Release_Price_Currency'].tolist()[:3] == ['USD', 'EUR', 'EUR']
+    assert str(typed.loc[0, 'Published_Date'].date()) == '2024-01-05'
+    assert str(typed.loc[1, 'Published_Date'].date()) == '2023-10-15'
+    assert typed.loc[3, ['Score_Min', 'Drink_From', 'Published_Date']].isna().all()
+
+
+def test_normalize_records_reads_wine_records():
+    record = WineRecord.from_dict({'URL': 'u', 'Full_Wine_Name': 'W 2001', 'Vintage': '2001', 'Score': '90'})
+    typed = normalize_records([record, WineRecord.failed('v', 'boom')])
+    assert typed['Vintage'].tolist()[0] == 2001
+    assert typed['Score_Min'].isna().tolist() == [False, True]
@@ -0,0 +1,22 @@
+from robert_parker_benchmark import wine_page_body, wine_values
+from robert_parker_offline import archive_html, extract_archive, read_archive
+from robert_parker_record import ERROR
+
+
+def page(index):
+    return f"<html><body>{wine_page_body(index)}</body></html>"
+
+
+def test_archive_round_trip_keeps_urls_and_order(tmp_path):
+    # Only the comment's closing '-->' is cut, not a trailing '-' of the URL
+    urls = [f"https://www.robertparker.com/wines/bench{index:07d}/synthetic-wine-{index}-" for index in range(7)]
+    for index, url in enumerate(urls):
+        archive_html(str(tmp_path), url, page(index))
+    (tmp_path / "notes.txt").write_text("not a page")
+    (tmp_path / "unlabelled.html").write_text("<html><body><p>no wine here</p></body></html>")
+
+    assert [url for url, _ in read_archive(str(tmp_path))] == urls + ['']
+    rows = extract_archive(str(tmp_path), max_workers=2)
+    assert [row['URL'] for row in rows] == urls + ['']
+    assert [row['Full_Wine_Name'] for row in rows[:-1]] == [wine_values(index)['Full_Wine_Name'] for index in range(7)]
+    assert rows[-1].status == ERROR
@@ -0,0 +1,166 @@
+import asyncio
+
+from robert_parker_rate_limit import FileTokenBucket, TokenBucket
+
+
+class FakeClock:
+    """Simulated time: sleep() advances the clock instead of waiting
+
+    Sleeps longer than `block_after` seconds never finish on their own, so a
+    test can check that something else (set_rate) wakes the sleeper.
+    """
+
+    def __init__(self, start=1000.0, block_after=None):
+        self.now = start
+        self.block_after = block_after
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        self.sleeps.append(delay)
+        if self.block_after is not None and delay > self.block_after:
+            await asyncio.Event().wait()
+        self.now += delay
+        await asyncio.sleep(0)
+
+
+async def acquire_all(bucket, clock, count):
+    """Start count acquires in order; returns [(caller, time granted)] in grant order"""
+    granted = []
+
+    async def acquire(caller):
+        await bucket.acquire()
+        granted.append((caller, clock.now))
+
+    tasks = [asyncio.create_task(acquire(caller)) for caller in range(count)]
+    await asyncio.gather(*tasks)
+    return granted
+
+
+def test_burst_is_granted_at_once_then_steady_rate():
+    clock = FakeClock()
+
+    async def run():
+        bucket = TokenBucket(60, burst=3, clock=clock, sleep=clock.sleep)
+        return await acquire_all(bucket, clock, 5)
+
+    granted = asyncio.run(run())
+    times = [round(when - 1000.0, 6) for _, when in granted]
+    assert times == [0, 0, 0, 1, 2]
+
+
+def test_waiters_are_served_in_arrival_order():
+    clock = FakeClock()
+
+    async def run():
+        bucket = TokenBucket(120, burst=1, clock=clock, sleep=clock.sleep)
+        return await acquire_all(bucket, clock, 6)
+
+    granted = asyncio.run(run())
+    assert [caller for caller, _ in granted] == list(range(6))
+    assert [round(when - 1000.0, 6) for _, when in granted] == [0, 0.5, 1, 1.5, 2, 2.5]
+
+
+def test_set_rate_wakes_a_sleeping_waiter():
+    # At 1 request/min the second caller would sleep ~60s, which this clock never finishes
+    clock = FakeClock(block_after=10)
+
+    async def run():
+        bucket = TokenBucket(1, burst=1, clock=clock, sleep=clock.sleep)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        clock.now += 1
+        bucket.set_rate(6000)
+        await asyncio.wait_for(waiter, timeout=1)
+
+    asyncio.run(run())
+    assert clock.sleeps[0] > 10
+    assert all(delay < 1 for delay in clock.sleeps[1:])
+
+
+def test_set_rate_lowers_burst():
+    clock = FakeClock()
+
+    async def run():
+        bucket = TokenBucket(60, burst=5, clock=clock, sleep=clock.sleep)
+        bucket.set_rate(60, burst=2)
+        return await acquire_all(bucket, clock, 3)
+
+    granted = asyncio.run(run())
+    assert [round(when - 1000.0, 6) for _, when in granted] == [0, 0, 1]
+
+
+def test_file_bucket_shares_burst_between_instances(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "rate.json")
+
+    async def run():
+        # Two buckets on one file stand in for two worker processes
+        first = FileTokenBucket(path, 60, burst=2, clock=clock, sleep=clock.sleep)
+        second = FileTokenBucket(path, 60, burst=2, clock=clock, sleep=clock.sleep)
+        await first.acquire()
+        await second.acquire()
+        start = clock.now
+        await first.acquire()
+        return clock.now - start
+
+    assert round(asyncio.run(run()), 6) == 1
+
+
+def test_file_bucket_serves_waiters_in_order(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "rate.json")
+
+    async def run():
+        bucket = FileTokenBucket(path, 60, burst=2, clock=clock, sleep=clock.sleep)
+        return await acquire_all(bucket, clock, 5)
+
+    granted = asyncio.run(run())
+    assert [caller for caller, _ in granted] == list(range(5))
+    assert [round(when - 1000.0, 6) for _, when in granted] == [0, 0, 1, 2, 3]
+
+
+def test_file_bucket_set_rate_wakes_sleepers(tmp_path):
+    clock = FakeClock(block_after=10)
+    path = str(tmp_path / "rate.json")
+
+    async def run():
+        bucket = FileTokenBucket(path, 1, burst=1, clock=clock, sleep=clock.sleep)
+        other = FileTokenBucket(path, 1, burst=1, clock=clock, sleep=clock.sleep)
+        await bucket.acquire()
+        waiter = asyncio.create_task(bucket.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        clock.now += 1
+        other.set_rate(6000)
+        bucket.set_rate(6000)
+        await asyncio.wait_for(waiter, timeout=1)
+        await other.acquire()
+        return bucket.rate, other.rate
+
+    assert asyncio.run(run()) == (100, 100)
+
+
+def test_file_buckets_share_the_lowest_rate_until_it_goes_stale(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "rate.json")
+
+    async def run():
+        fast = FileTokenBucket(path, 120, burst=1, clock=clock, sleep=clock.sleep, rate_ttl=60)
+        slow = FileTokenBucket(path, 120, burst=1, clock=clock, sleep=clock.sleep, rate_ttl=60)
+        # The slow worker's controller backs off; the fast one must follow, not overwrite it
+        slow.set_rate(30)
+        await slow.acquire()
+        fast.set_rate(240)
+        await fast.acquire()
+        shared = fast.requests_per_minute
+        # The slow worker stops taking tokens (it exited); its rate expires
+        clock.now += 120
+        await fast.acquire()
+        return shared, fast.requests_per_minute
+
+    assert asyncio.run(run()) == (30, 240)
@@ -0,0 +1,59 @@
+import pytest
+
+from robert_parker_resources import default_profiles
+
+WINE_URL = "https://www.robertparker.com/wines/abc123/some-wine"
+ASSET_URL = "https://www.robertparker.com/static/site.css"
+
+
+def test_wine_profile_keeps_stylesheets_but_drops_heavy_assets_and_trackers():
+    wine = default_profiles()['wine']
+    assert not wine.should_block(WINE_URL, 'document')
+    assert not wine.should_block(ASSET_URL, 'stylesheet')
+    assert not wine.should_block(WINE_URL, 'xhr')
+    for resource_type in ('image', 'media', 'font'):
+        assert wine.should_block(ASSET_URL, resource_type)
+    assert wine.should_block("https://www.googletagmanager.com/gtm.js", 'script')
+
+
+def test_login_profile_lets_the_consent_banner_through():
+    login = default_profiles()['login']
+    assert not login.should_block("https://sdk.privacy-center.org/loader.js", 'script')
+    assert login.should_block("https://www.google-analytics.com/analytics.js", 'script')
+
+
+class ListWriter:
+    def __init__(self):
+        self.rows = []
+
+    def write(self, wine_data):
+        self.rows.append(wine_data)
+        return True
+
+    def close(self):
+        pass
+
+
+def chromium_available():
+    try:
+        from playwright.sync_api import sync_playwright
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+        return True
+    except Exception:
+        return False
+
+
+@pytest.mark.skipif(not chromium_available(), reason="needs Playwright's Chromium")
+def test_blocking_resources_does_not_change_extraction():
+    from robert_parker_benchmark import run_benchmark
+
+    def scrape(block_resources):
+        writer = ListWriter()
+        result = run_benchmark(url_count=8, scraper_options={'block_resources': block_resources}, writer=writer)
+        assert result['errors'] == 0
+        return sorted(writer.rows, key=lambda row: row['URL'])
+
+    blocked, unblocked = scrape(True), scrape(False)
+    assert len(blocked) == 8
+    assert blocked == unblocked
@@ -0,0 +1,119 @@
+import asyncio
+
+from robert_parker_pipeline import iterate
+from robert_parker_retry import (
+    AUTH_LOST, FRAME_DETACHED, NAVIGATION_TIMEOUT, NOT_FOUND, OTHER, THROTTLED, RetryScheduler, ScrapeError,
+    classify_error, map_with_retries
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_classify_error():
+    assert classify_error(ScrapeError(THROTTLED, "HTTP 429")) == THROTTLED
+    assert classify_error(Exception("Timeout 10000ms exceeded.")) == NAVIGATION_TIMEOUT
+    assert classify_error(asyncio.TimeoutError()) == NAVIGATION_TIMEOUT
+    assert classify_error(Exception("page.goto: net::ERR_ABORTED at https://x")) == NAVIGATION_TIMEOUT
+    assert classify_error(Exception("Frame was detached")) == FRAME_DETACHED
+    assert classify_error(Exception("Target closed")) == FRAME_DETACHED
+    assert classify_error(ValueError("boom")) == OTHER
+
+
+def test_backoff_is_exponential_capped_and_scaled_by_kind():
+    scheduler = RetryScheduler(base_delay=2.0, max_delay=60.0, jitter=0.0)
+    assert [scheduler.backoff(attempt) for attempt in (1, 2, 3, 10)] == [2.0, 4.0, 8.0, 60.0]
+    assert scheduler.backoff(1, THROTTLED) == 4.0
+    assert scheduler.backoff(1, AUTH_LOST) == 1.0
+
+
+def test_jitter_spreads_the_delay_both_ways():
+    low = RetryScheduler(base_delay=2.0, jitter=0.5, rng=lambda: 0.0)
+    high = RetryScheduler(base_delay=2.0, jitter=0.5, rng=lambda: 1.0)
+    assert low.backoff(1) == 1.0
+    assert high.backoff(1) == 3.0
+
+
+def test_schedule_respects_kind_and_max_attempts():
+    scheduler = RetryScheduler(max_attempts=3, jitter=0.0, clock=FakeClock())
+    scheduler.started()
+    assert scheduler.schedule('u', 'u', NOT_FOUND, 1) is None
+    assert scheduler.schedule('u', 'u', OTHER, 1) == 2.0
+    assert scheduler.next_attempt('u') == 2
+    assert scheduler.schedule('u', 'u', OTHER, 3) is None
+    assert scheduler.failures == {NOT_FOUND: 1, OTHER: 2}
+
+
+def test_retry_budget_is_min_budget_plus_ratio_of_started():
+    scheduler = RetryScheduler(budget_ratio=0.2, min_budget=2, jitter=0.0, clock=FakeClock())
+    for _ in range(10):
+        scheduler.started()
+    assert scheduler.budget_left() == 4
+    delays = [scheduler.schedule(f"u{i}", f"u{i}", OTHER, 1) for i in range(6)]
+    assert delays.count(None) == 2
+    assert scheduler.retries == 4
+    assert scheduler.over_budget == 2
+    assert "2 refused by the retry budget" in scheduler.summary()
+
+
+def test_due_returns_items_once_their_backoff_has_passed():
+    clock = FakeClock()
+    scheduler = RetryScheduler(base_delay=2.0, jitter=0.0, clock=clock)
+    scheduler.schedule('a', 'a', OTHER, 1)
+    scheduler.schedule('b', 'b', OTHER, 2)
+    assert scheduler.due() == []
+    clock.now = 2.0
+    assert scheduler.due() == ['a']
+    assert scheduler.due(flush=True) == ['b']
+
+
+def test_map_with_retries_requeues_until_success_or_give_up():
+    calls = []
+
+    async def func(item, attempt):
+        calls.append((item, attempt))
+        if item == 'flaky' and attempt < 2:
+            raise Exception("Timeout 10000ms exceeded.")
+        if item == 'gone':
+            raise ScrapeError(NOT_FOUND, "HTTP 404")
+        if item == 'broken':
+            raise ValueError("boom")
+        return item.upper()
+
+    async def run():
+        scheduler = RetryScheduler(max_attempts=3, base_delay=0.001, jitter=0.0)
+        results = {}
+        async for item, result in map_with_retries(iterate(['ok', 'flaky', 'gone', 'broken']), func, scheduler, 2):
+            results[item] = result
+        return results, scheduler
+
+    results, scheduler = asyncio.run(run())
+    assert results['ok'] == 'OK'
+    assert results['flaky'] == 'FLAKY'
+    assert isinstance(results['gone'], ScrapeError) and results['gone'].attempts == 1
+    assert results['broken'].kind == OTHER and results['broken'].attempts == 3
+    assert calls.count(('gone', 1)) == 1
+    assert scheduler.outstanding == 0
+
+
+def test_only_dispatched_items_grow_the_retry_budget():
+    async def func(item, attempt):
+        return item
+
+    async def run():
+        scheduler = RetryScheduler(budget_ratio=0.5, min_budget=0)
+        items = [('resumed', 'row')] * 6 + [('new', None)] * 4
+        async for _ in map_with_retries(iterate(items), func, scheduler, 2, key=lambda item: item[0],
+                                        dispatched=lambda item: item[1] is None):
+            pass
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    assert scheduler.started_count == 4
+    assert scheduler.budget_left() == 2
+    assert scheduler.outstanding == 0
@@ -0,0 +1,48 @@
+import json
+import threading
+
+from robert_parker_fields import FieldSpec
+from robert_parker_selectors import SelectorStats
+
+SPEC = FieldSpec('Color', ['a', 'b', 'c'])
+
+
+def record_pages(stats, index, pages=30):
+    for _ in range(pages):
+        stats.record([SPEC], {'Color': {'text': 'x', 'index': index}})
+
+
+def test_cascade_is_reordered_and_pruned_after_enough_pages(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = SelectorStats(path, rng=lambda: 1.0)
+    record_pages(stats, 1)
+    stats.save()
+    assert SelectorStats(path, rng=lambda: 1.0).ordered(SPEC).selectors == ['b']
+
+
+def test_exploring_run_keeps_pruned_selectors_last(tmp_path):
+    path = str(tmp_path / "stats.json")
+    stats = SelectorStats(path, rng=lambda: 1.0)
+    record_pages(stats, 1)
+    stats.save()
+    exploring = SelectorStats(path, rng=lambda: 0.0)
+    assert exploring.exploring
+    assert exploring.ordered(SPEC).selectors == ['b', 'a', 'c']
+    # A pruned selector that matches again is no longer pruned
+    record_pages(exploring, 2, pages=5)
+    exploring.save()
+    assert SelectorStats(path, rng=lambda: 1.0).ordered(SPEC).selectors == ['b', 'c']
+
+
+def test_concurrent_saves_keep_every_count(tmp_path):
+    path = str(tmp_path / "stats.json")
+    workers = [SelectorStats(path, rng=lambda: 1.0) for _ in range(8)]
+    for stats in workers:
+        record_pages(stats, 0, pages=10)
+    threads = [threading.Thread(target=stats.save) for stats in workers]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['fields']['Color']['pages'] == 80
@@ -0,0 +1,27 @@
+import asyncio
+import json
+import os
+
+from robert_parker_session import SessionStore
+
+
+class FakeContext:
+    def __init__(self, name):
+        self.name = name
+
+    async def storage_state(self):
+        await asyncio.sleep(0)
+        return {'cookies': [{'name': self.name, 'value': 'x' * 10000, 'expires': -1}], 'origins': []}
+
+
+def test_concurrent_saves_leave_one_whole_file_and_no_temp_files(tmp_path):
+    path = str(tmp_path / "session.json")
+
+    async def save_all():
+        await asyncio.gather(*[SessionStore(path).save(FakeContext(f"worker{i}")) for i in range(8)])
+
+    asyncio.run(save_all())
+    assert os.listdir(tmp_path) == ["session.json"]
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['cookies'][0]['name'].startswith("worker")
+    assert SessionStore(path).load() is not None
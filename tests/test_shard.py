@@ -0,0 +1,15 @@
+from robert_parker_shard import shard_concurrency, shard_index, shard_urls
+
+URLS = [f"https://www.robertparker.com/wines/wine{index:04d}/some-wine" for index in range(200)]
+
+
+def test_every_url_lands_in_exactly_one_shard():
+    shards = [list(shard_urls(URLS, index, 3)) for index in range(3)]
+    assert sorted(sum(shards, [])) == sorted(URLS)
+    assert all(shard_index(url, 3) == index for index, shard in enumerate(shards) for url in shard)
+
+
+def test_concurrency_is_split_so_the_workers_add_up_to_the_limit():
+    assert [shard_concurrency(5, index, 2) for index in range(2)] == [3, 2]
+    assert [shard_concurrency(8, index, 4) for index in range(4)] == [2, 2, 2, 2]
+    assert sum(shard_concurrency(7, index, 3) for index in range(3)) == 7